@@ -1,16 +1,129 @@
 import argparse
-from editor import render_video
+import json
+import sys
+
+from editor import render_many, render_presets, render_video
+from video_auto.batch import write_summary
+from video_auto.compact import format_summary
+from video_auto.profiling import profile
+from video_auto.watch import DEFAULT_INTERVAL, watch_manifest
 
 
 def main() -> None:
     parser = argparse.ArgumentParser(description="Video Auto Editor CLI")
-    parser.add_argument("--manifest", required=True, help="manifest.json 路径")
-    parser.add_argument("--preset", default=None, help="预设名称，可选")
-    parser.add_argument("--output", default=None, help="输出目录，可选")
+    source = parser.add_mutually_exclusive_group(required=True)
+    source.add_argument("--manifest", help="manifest.json 路径")
+    source.add_argument("--batch", help="批量模式：manifest 目录或 glob 模式")
+    parser.add_argument(
+        "--preset",
+        action="append",
+        default=None,
+        help="预设名称，可选；可重复，多个预设时一次渲染出各预设的草稿（<源草稿名>_<预设名>）",
+    )
+    parser.add_argument("--output", default=None, help="输出目录，可选：给出时不修改源草稿，渲染结果写入该目录")
+    parser.add_argument("--workers", type=int, default=None, help="批量模式或多预设渲染的并行进程数，默认 CPU 核数")
+    parser.add_argument("--reindex", action="store_true", help="强制重建草稿位置索引")
+    parser.add_argument("--watch", action="store_true", help="常驻监听 manifest、素材与草稿，变化后自动增量同步")
+    parser.add_argument("--watch-interval", type=float, default=DEFAULT_INTERVAL, help="监听模式的轮询间隔（秒）")
+    parser.add_argument("--seed", type=int, default=None, help="随机种子：固定后相同输入产出逐字节相同的草稿")
+    parser.add_argument(
+        "--compact", action="store_true", default=None, help="压缩输出：共享动画素材、删除无效关键帧、省略默认字段"
+    )
+    parser.add_argument("--summary", default=None, help="批量模式汇总 JSON 输出路径，默认打印到标准输出")
+    parser.add_argument("--profile", action="store_true", help="打印各阶段耗时表（批量模式写入汇总）")
+    parser.add_argument("--profile-json", default=None, help="各阶段性能数据 JSON 输出路径")
+    parser.add_argument("--profile-memory", action="store_true", help="性能分析时额外记录各阶段内存峰值（较慢）")
     args = parser.parse_args()
+    if args.watch and args.batch:
+        parser.error("--watch 只能与 --manifest 一起使用")
+    presets = args.preset or []
+    if args.watch and len(presets) > 1:
+        parser.error("--watch 只支持一个 --preset")
+    # 单个预设沿用原有行为；多个预设时改为多预设渲染
+    preset_name = presets[0] if len(presets) == 1 else None
+    fan_out = presets if len(presets) > 1 else None
+
+    profiling = None
+    if args.profile or args.profile_json or args.profile_memory:
+        profiling = "memory" if args.profile_memory else "time"
+
+    if args.batch:
+        summary = render_many(
+            args.batch,
+            workers=args.workers,
+            preset_name=preset_name,
+            output_dir=args.output,
+            reindex=args.reindex,
+            profiling=profiling,
+            seed=args.seed,
+            compact=args.compact,
+            presets=fan_out,
+        )
+        if args.profile_json:
+            profiles = {r["manifest"]: r.get("profile", []) for r in summary["results"]}
+            with open(args.profile_json, "w", encoding="utf-8") as f:
+                json.dump({"trace_memory": profiling == "memory", "manifests": profiles}, f, ensure_ascii=False, indent=2)
+        if args.summary:
+            write_summary(summary, args.summary)
+            print(f"批量完成：成功 {summary['succeeded']}，失败 {summary['failed']}，汇总已写入 {args.summary}")
+        else:
+            print(json.dumps(summary, ensure_ascii=False, indent=2))
+        sys.exit(1 if summary["failed"] else 0)
+
+    def run() -> None:
+        if args.watch:
+            watch_manifest(
+                args.manifest,
+                preset_name=preset_name,
+                reindex=args.reindex,
+                seed=args.seed,
+                interval=args.watch_interval,
+                compact=args.compact,
+                output_dir=args.output,
+            )
+            return
+        if fan_out:
+            reports: dict = {}
+            render_presets(
+                args.manifest,
+                fan_out,
+                output_dir=args.output,
+                reindex=args.reindex,
+                seed=args.seed,
+                compact=args.compact,
+                workers=args.workers,
+                stats=reports,
+            )
+        else:
+            report: dict = {}
+            render_video(
+                args.manifest,
+                preset_name=preset_name,
+                output_dir=args.output,
+                reindex=args.reindex,
+                seed=args.seed,
+                compact=args.compact,
+                stats=report,
+            )
+            reports = {preset_name: report}
+        for report in reports.values():
+            print(f"已更新草稿: {report['draft_folder']}")
+            if "compact" in report:
+                print(format_summary(report["compact"], report["draft_bytes"]))
+
+    if profiling is None:
+        run()
+        return
 
-    folder = render_video(args.manifest, preset_name=args.preset, output_dir=args.output)
-    print(f"已更新草稿: {folder}")
+    # 监听模式下统计覆盖整个会话，退出（Ctrl+C）时输出
+    with profile(trace_memory=profiling == "memory") as prof:
+        try:
+            run()
+        finally:
+            if args.profile_json:
+                prof.write_json(args.profile_json)
+            if args.profile or args.profile_memory:
+                print(prof.format_table(), file=sys.stderr)
 
 
 if __name__ == "__main__":
@@ -0,0 +1,202 @@
+import json
+import os
+import random
+import struct
+import uuid
+import zlib
+from typing import Any, Dict, List, Optional
+
+MICROSECONDS = 1_000_000
+
+
+def _png_bytes(width: int, height: int) -> bytes:
+    def chunk(tag: bytes, data: bytes) -> bytes:
+        return struct.pack(">I", len(data)) + tag + data + struct.pack(">I", zlib.crc32(tag + data) & 0xFFFFFFFF)
+
+    raw = b"".join(b"\x00" + b"\x80" * (width * 3) for _ in range(height))
+    return (
+        b"\x89PNG\r\n\x1a\n"
+        + chunk(b"IHDR", struct.pack(">IIBBBBB", width, height, 8, 2, 0, 0, 0))
+        + chunk(b"IDAT", zlib.compress(raw))
+        + chunk(b"IEND", b"")
+    )
+
+
+def generate_images(folder: str, count: int, seed: int = 0) -> List[str]:
+    """生成 count 张小尺寸 PNG（文件头真实，宽高随机横/竖版）。"""
+    rng = random.Random(seed)
+    os.makedirs(folder, exist_ok=True)
+    paths: List[str] = []
+    for i in range(count):
+        landscape = rng.random() < 0.5
+        width, height = (64, 36) if landscape else (36, 64)
+        path = os.path.join(folder, f"img_{i:05d}.png")
+        with open(path, "wb") as f:
+            f.write(_png_bytes(width, height))
+        paths.append(path)
+    return paths
+
+
+def _text_material(rng: random.Random, text_id: str) -> Dict[str, Any]:
+    text = "".join(rng.choice("的一是在不了有和人这中大为上个国我以要他时来用们生到作地于出就分对成会可主发年动同工") for _ in range(rng.randint(8, 30)))
+    content = {"styles": [{"fill": {"content": {"solid": {"color": [1, 1, 1]}}}, "range": [0, len(text)], "size": 8}], "text": text}
+    return {
+        "add_type": 0,
+        "alignment": 1,
+        "content": json.dumps(content, ensure_ascii=False),
+        "font_path": "",
+        "id": text_id,
+        "type": "subtitle",
+        "words": {"end_time": [], "start_time": [], "text": []},
+    }
+
+
+def _video_material(index: int) -> Dict[str, Any]:
+    return {
+        "crop": {"lower_left_x": 0.0, "lower_left_y": 1.0, "lower_right_x": 1.0, "lower_right_y": 1.0},
+        "duration": 10_800_000_000,
+        "height": 1080,
+        "id": str(uuid.UUID(int=index + 1)),
+        "material_name": f"clip_{index:05d}.mp4",
+        "path": f"/synthetic/resources/clip_{index:05d}.mp4",
+        "type": "video",
+        "width": 1920,
+    }
+
+
+def _segment(material_id: str, start: int, duration: int, seg_id: str) -> Dict[str, Any]:
+    return {
+        "clip": {"alpha": 1.0, "scale": {"x": 1.0, "y": 1.0}, "transform": {"x": 0.0, "y": 0.0}},
+        "extra_material_refs": [],
+        "id": seg_id,
+        "material_id": material_id,
+        "source_timerange": {"duration": duration, "start": 0},
+        "target_timerange": {"duration": duration, "start": start},
+        "visible": True,
+        "volume": 1.0,
+    }
+
+
+def build_draft(
+    subtitles: int = 1000,
+    tracks: int = 2,
+    materials: int = 200,
+    target_size_mb: Optional[float] = None,
+    seed: int = 0,
+) -> Dict[str, Any]:
+    """构造一个结构接近真实剪映草稿的 dict。
+
+    subtitles：字幕片段数；tracks：除字幕轨外的附加视频/音频轨数；materials：materials.videos 数量；
+    target_size_mb：若给出，则追加素材直到序列化后的大小接近该值。
+    """
+    rng = random.Random(seed)
+    texts = []
+    subtitle_segments = []
+    start = 0
+    for i in range(subtitles):
+        text_id = str(uuid.UUID(int=(1 << 64) + i))
+        texts.append(_text_material(rng, text_id))
+        duration = rng.randint(1, 6) * MICROSECONDS + rng.randint(0, 999) * 1000
+        seg = _segment(text_id, start, duration, str(uuid.UUID(int=(2 << 64) + i)))
+        seg["text"] = True
+        subtitle_segments.append(seg)
+        start += duration + rng.randint(0, 500) * 1000
+    total = max(start, MICROSECONDS)
+
+    videos = [_video_material(i) for i in range(materials)]
+    draft: Dict[str, Any] = {
+        "canvas_config": {"height": 1080, "ratio": "original", "width": 1920},
+        "duration": total,
+        "fps": 30.0,
+        "id": str(uuid.UUID(int=seed)),
+        "materials": {
+            "audios": [],
+            "material_animations": [],
+            "texts": texts,
+            "videos": videos,
+        },
+        "tracks": [{"attribute": 0, "flag": 0, "id": str(uuid.UUID(int=3 << 64)), "segments": subtitle_segments, "type": "text"}],
+        "update_time": 0,
+        "version": 360000,
+    }
+
+    for t in range(tracks):
+        ttype = "video" if t % 2 == 0 else "audio"
+        segs = []
+        pos = 0
+        per = max(1, materials)
+        k = 0
+        while pos < total and videos:
+            duration = min(rng.randint(3, 20) * MICROSECONDS, total - pos)
+            segs.append(_segment(videos[k % per]["id"], pos, duration, str(uuid.UUID(int=((4 + t) << 64) + k))))
+            pos += duration
+            k += 1
+        draft["tracks"].append({"attribute": 0, "flag": 0, "id": str(uuid.UUID(int=(100 + t) << 64)), "segments": segs, "type": ttype})
+
+    if target_size_mb:
+        target = int(target_size_mb * 1024 * 1024)
+        size = len(json.dumps(draft, ensure_ascii=False).encode("utf-8"))
+        per_item = len(json.dumps(_video_material(0)).encode("utf-8")) + 1
+        for i in range(materials, materials + max(0, (target - size) // per_item)):
+            videos.append(_video_material(i))
+    return draft
+
+
+def write_draft(folder: str, draft: Dict[str, Any]) -> str:
+    os.makedirs(folder, exist_ok=True)
+    path = os.path.join(folder, "draft_content.json")
+    with open(path, "w", encoding="utf-8") as f:
+        f.write(json.dumps(draft, ensure_ascii=False))
+    return path
+
+
+def generate_draft_root(root: str, projects: int, draft: Dict[str, Any], resource_depth: int = 3) -> List[str]:
+    """生成含 projects 个工程目录的草稿根目录（每个工程带若干层资源子目录）。"""
+    data = json.dumps(draft, ensure_ascii=False)
+    paths = []
+    for i in range(projects):
+        project = os.path.join(root, f"project_{i:05d}")
+        resources = os.path.join(project, *[f"Resources_{d}" for d in range(resource_depth)])
+        os.makedirs(resources, exist_ok=True)
+        with open(os.path.join(resources, "cache.bin"), "wb") as f:
+            f.write(b"\x00" * 128)
+        path = os.path.join(project, "draft_content.json")
+        with open(path, "w", encoding="utf-8") as f:
+            f.write(data)
+        paths.append(path)
+    return paths
+
+
+def generate_manifest(path: str, images: List[str], draft_path: str, backup_location: Optional[str] = None) -> str:
+    manifest: Dict[str, Any] = {
+        "project_name": "benchmark",
+        "assets": {"images": images},
+        "draft_settings": {"draft_path": draft_path},
+    }
+    if backup_location:
+        manifest["draft_settings"]["backup"] = {"enable": True, "location": backup_location}
+    os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+    with open(path, "w", encoding="utf-8") as f:
+        json.dump(manifest, f, ensure_ascii=False, indent=2)
+    return path
+
+
+if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser(description="生成用于基准测试的合成草稿/图片/manifest")
+    parser.add_argument("out", help="输出目录")
+    parser.add_argument("--subtitles", type=int, default=1000)
+    parser.add_argument("--tracks", type=int, default=2)
+    parser.add_argument("--materials", type=int, default=200)
+    parser.add_argument("--size-mb", type=float, default=None, help="目标草稿大小（MB），最大约 100")
+    parser.add_argument("--images", type=int, default=50)
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    draft = build_draft(args.subtitles, args.tracks, args.materials, args.size_mb, args.seed)
+    draft_path = write_draft(os.path.join(args.out, "draft"), draft)
+    images = generate_images(os.path.join(args.out, "images"), args.images, args.seed)
+    manifest = generate_manifest(os.path.join(args.out, "manifest.json"), images, os.path.dirname(draft_path))
+    print(f"草稿: {draft_path} ({os.path.getsize(draft_path) / 1024 / 1024:.1f} MB)")
+    print(f"manifest: {manifest}")
@@ -0,0 +1,226 @@
+import argparse
+import copy
+import gc
+import json
+import os
+import platform
+import shutil
+import sys
+import tempfile
+import time
+import tracemalloc
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+import generate  # noqa: E402
+
+# 各规模的合成数据参数
+SCALES: Dict[str, Dict[str, Any]] = {
+    "small": {"subtitles": 500, "tracks": 2, "materials": 100, "size_mb": None, "images": 20, "projects": 50},
+    "medium": {"subtitles": 5000, "tracks": 3, "materials": 1000, "size_mb": None, "images": 100, "projects": 500},
+    "large": {"subtitles": 15000, "tracks": 4, "materials": 5000, "size_mb": 100, "images": 500, "projects": 3000},
+}
+DEFAULT_SCALES = ["small", "medium"]
+DEFAULT_BASELINE = os.path.join(os.path.dirname(os.path.abspath(__file__)), "baseline.json")
+DEFAULT_TOLERANCE = 0.5
+# 毫秒级的小项噪声较大：绝对增幅不超过该值（秒）时不视为回归
+MIN_ABSOLUTE_SLACK = 0.005
+# 短耗时项在 repeat 次之后继续重复，直到累计计时达到该值（秒）或达到 MAX_RUNS 次，再取最小值
+MIN_MEASURE_SECONDS = 1.0
+MAX_RUNS = 100
+# 超出容差的项重新测量的轮数（与首次结果一起取最小值），排除持续数百毫秒的环境性慢时段
+RECHECK_ROUNDS = 2
+
+
+def _measure(fn: Callable[[], Any], setup: Optional[Callable[[], Any]], repeat: int, memory: bool) -> Dict[str, Any]:
+    """最优耗时取多次运行中的最小值；内存峰值在单独一次 tracemalloc 运行中测量，不影响计时。
+
+    至少运行 repeat 次；毫秒级的项继续重复到累计 MIN_MEASURE_SECONDS（最多 MAX_RUNS 次），
+    单次抖动（磁盘刷写、调度）不会进入最小值，基线因而可以使用较紧的容差。
+    """
+    times: List[float] = []
+    while len(times) < repeat or (sum(times) < MIN_MEASURE_SECONDS and len(times) < MAX_RUNS):
+        if setup:
+            setup()
+        gc.collect()
+        # 与 timeit 相同，计时期间关闭循环 GC：否则分代回收何时触发、遍历多少存活对象
+        # 取决于此前的分配历史，同一项在不同进程间可相差一倍
+        gc.disable()
+        try:
+            started = time.perf_counter()
+            fn()
+            times.append(time.perf_counter() - started)
+        finally:
+            gc.enable()
+    result: Dict[str, Any] = {"seconds": min(times), "runs": len(times)}
+    if memory:
+        if setup:
+            setup()
+        gc.collect()
+        tracemalloc.start()
+        try:
+            fn()
+            result["peak_bytes"] = tracemalloc.get_traced_memory()[1]
+        finally:
+            tracemalloc.stop()
+    return result
+
+
+def run_scale(
+    scale: str, workdir: str, repeat: int, memory: bool, rerun: Dict[str, Callable[[], float]]
+) -> Dict[str, Dict[str, Any]]:
+    """运行某规模的全部基准项；rerun 中登记各项的重新计时函数（不测内存），供回归复核使用。"""
+    from video_auto import draftio, sync
+    from video_auto.api import render_video
+    from video_auto.backup import backup_draft
+    from video_auto.paths import find_draft_content_json
+    from video_auto.snapshots import snapshot_draft
+    from video_auto.validate import validate_draft
+
+    params = SCALES[scale]
+    base = os.path.join(workdir, scale)
+    draft = generate.build_draft(params["subtitles"], params["tracks"], params["materials"], params["size_mb"])
+    pristine = generate.write_draft(os.path.join(base, "pristine"), draft)
+    draft_dir = os.path.join(base, "draft")
+    draft_path = os.path.join(draft_dir, "draft_content.json")
+    images = generate.generate_images(os.path.join(base, "images"), params["images"])
+    manifest = generate.generate_manifest(os.path.join(base, "manifest.json"), images, draft_dir)
+    draft_root = os.path.join(base, "drafts_root")
+    generate.generate_draft_root(draft_root, params["projects"], {"tracks": [], "materials": {}})
+
+    def fresh_copy() -> None:
+        os.makedirs(draft_dir, exist_ok=True)
+        shutil.copyfile(pristine, draft_path)
+
+    def no_target() -> None:
+        # 目标内容相同时 save_draft 会跳过写入，测写入耗时需先移除目标文件
+        if os.path.exists(draft_path):
+            os.remove(draft_path)
+
+    fresh_copy()
+    raw = open(pristine, "rb").read()
+    loaded = json.loads(raw)
+    results: Dict[str, Dict[str, Any]] = {}
+
+    def bench(name: str, fn: Callable[[], Any], setup: Optional[Callable[[], Any]] = None) -> None:
+        res = _measure(fn, setup, repeat, memory)
+        results[f"{scale}/{name}"] = res
+        rerun[f"{scale}/{name}"] = lambda: _measure(fn, setup, repeat, False)["seconds"]
+        peak = f"  peak {res['peak_bytes'] / 1024 / 1024:.1f} MB" if "peak_bytes" in res else ""
+        print(f"  {scale}/{name:<32} {res['seconds'] * 1000:10.1f} ms{peak}", flush=True)
+
+    print(f"[{scale}] 草稿 {len(raw) / 1024 / 1024:.1f} MB，字幕 {params['subtitles']}，图片 {params['images']}")
+    bench("json_load", lambda: json.loads(raw))
+    bench("json_dump", lambda: draftio.save_draft(draft_path, loaded), no_target)
+    images_dir = os.path.join(base, "images")
+    holder: Dict[str, Any] = {}
+    bench(
+        "sync_images_with_subtitles",
+        lambda: sync.sync_images_with_subtitles_in_draft(holder["draft"], images_dir),
+        lambda: holder.__setitem__("draft", copy.deepcopy(loaded)),
+    )
+    bench("render_video", lambda: render_video(manifest), fresh_copy)
+    bench("find_draft_content_json", lambda: find_draft_content_json(draft_root))
+    bench("find_draft_content_json_reindex", lambda: find_draft_content_json(draft_root, reindex=True))
+    bench("validate_draft", lambda: validate_draft(draft_dir), fresh_copy)
+    zip_dir = os.path.join(base, "zip_backups")
+    bench("backup_draft_zip", lambda: backup_draft(draft_dir, zip_dir), lambda: shutil.rmtree(zip_dir, ignore_errors=True))
+    snap_dir = os.path.join(base, "snapshots")
+    bench("snapshot_draft_cold", lambda: snapshot_draft(draft_dir, snap_dir), lambda: shutil.rmtree(snap_dir, ignore_errors=True))
+    bench("snapshot_draft_warm", lambda: snapshot_draft(draft_dir, snap_dir))
+    return results
+
+
+def compare(results: Dict[str, Dict[str, Any]], baseline: Dict[str, Any]) -> List[Tuple[str, float, float, float]]:
+    """返回超出容差的回归项：(名称, 基线秒, 当前秒, 容差)。"""
+    tolerances = baseline.get("tolerances", {})
+    default = float(tolerances.get("default", DEFAULT_TOLERANCE))
+    regressions = []
+    for name, ref in (baseline.get("results") or {}).items():
+        cur = results.get(name)
+        if not cur:
+            continue
+        bench_name = name.split("/", 1)[-1]
+        tol = float(tolerances.get(name, tolerances.get(bench_name, default)))
+        if cur["seconds"] > max(ref["seconds"] * (1 + tol), ref["seconds"] + MIN_ABSOLUTE_SLACK):
+            regressions.append((name, ref["seconds"], cur["seconds"], tol))
+        if "peak_bytes" in cur and "peak_bytes" in ref and cur["peak_bytes"] > ref["peak_bytes"] * (1 + tol):
+            regressions.append((name + "#peak_bytes", ref["peak_bytes"], cur["peak_bytes"], tol))
+    return regressions
+
+
+def recheck(
+    results: Dict[str, Dict[str, Any]], baseline: Dict[str, Any], rerun: Dict[str, Callable[[], float]]
+) -> List[Tuple[str, float, float, float]]:
+    """对超出容差的耗时项重新测量 RECHECK_ROUNDS 轮并取最小值，仍超出的才报告为回归。"""
+    for _ in range(RECHECK_ROUNDS):
+        suspects = [name for name, *_ in compare(results, baseline) if name in rerun]
+        if not suspects:
+            break
+        for name in suspects:
+            seconds = rerun[name]()
+            print(f"  复核 {name:<38} {seconds * 1000:10.1f} ms", flush=True)
+            results[name]["seconds"] = min(results[name]["seconds"], seconds)
+    return compare(results, baseline)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="video_auto 热点路径基准测试")
+    parser.add_argument("--scale", action="append", choices=sorted(SCALES), help="可重复；默认 small + medium")
+    parser.add_argument("--repeat", type=int, default=3, help="每项最少重复次数（取最小耗时；短耗时项会自动追加）")
+    parser.add_argument("--no-memory", action="store_true", help="跳过 tracemalloc 峰值内存测量")
+    parser.add_argument("--output", default=None, help="结果 JSON 输出路径")
+    parser.add_argument("--baseline", default=DEFAULT_BASELINE, help="基线文件（含各项容差）")
+    parser.add_argument("--update-baseline", action="store_true", help="用本次结果覆盖基线中的 results（保留容差）")
+    parser.add_argument("--workdir", default=None, help="合成数据目录，默认临时目录（结束后删除）")
+    args = parser.parse_args()
+
+    workdir = args.workdir or tempfile.mkdtemp(prefix="video_auto_bench_")
+    # 缓存与索引写入工作目录，不污染用户缓存
+    os.environ["VIDEO_AUTO_CACHE_DIR"] = os.path.join(workdir, "cache")
+    baseline: Dict[str, Any] = {}
+    if os.path.exists(args.baseline):
+        with open(args.baseline, "r", encoding="utf-8") as f:
+            baseline = json.load(f)
+
+    results: Dict[str, Dict[str, Any]] = {}
+    rerun: Dict[str, Callable[[], float]] = {}
+    regressions: List[Tuple[str, float, float, float]] = []
+    try:
+        for scale in args.scale or DEFAULT_SCALES:
+            results.update(run_scale(scale, workdir, args.repeat, not args.no_memory, rerun))
+        if not args.update_baseline:
+            regressions = recheck(results, baseline, rerun)
+    finally:
+        if not args.workdir:
+            shutil.rmtree(workdir, ignore_errors=True)
+
+    report = {
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "results": results,
+    }
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            json.dump(report, f, ensure_ascii=False, indent=2)
+
+    if args.update_baseline:
+        baseline["results"] = dict(baseline.get("results") or {}, **results)
+        baseline.setdefault("tolerances", {"default": DEFAULT_TOLERANCE})
+        with open(args.baseline, "w", encoding="utf-8") as f:
+            json.dump(baseline, f, ensure_ascii=False, indent=2)
+        print(f"基线已更新: {args.baseline}")
+        return
+
+    if regressions:
+        print("性能回归：")
+        for name, ref, cur, tol in regressions:
+            print(f"- {name}: 基线 {ref:.4g} → 当前 {cur:.4g}（容差 {tol:.0%}）")
+        sys.exit(1)
+    print("未发现超出容差的回归" if baseline.get("results") else "无基线可比较（可用 --update-baseline 生成）")
+
+
+if __name__ == "__main__":
+    main()
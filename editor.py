@@ -1 +1,2 @@
-from video_auto.api import render_video  # noqa: F401
+from video_auto.api import render_presets, render_video  # noqa: F401
+from video_auto.batch import render_many  # noqa: F401
@@ -1,70 +1,44 @@
-import json
 import os
-from typing import Dict, List
+import sys
 
-MICROSECONDS = 1_000_000
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 
-
-def _track_end_time(track: Dict) -> int:
-    end = 0
-    for seg in track.get("segments") or []:
-        tt = seg.get("target_timerange") or {}
-        start = int(tt.get("start") or 0)
-        duration = int(tt.get("duration") or 0)
-        end = max(end, start + duration)
-    return end
-
-
-def _duration_seconds(us: int) -> float:
-    return us / MICROSECONDS
-
-
-def validate_draft(draft_path: str) -> List[str]:
-    errors: List[str] = []
-    draft_content = os.path.join(draft_path, "draft_content.json")
-    if not os.path.exists(draft_content):
-        errors.append("缺少 draft_content.json")
-        return errors
-
-    with open(draft_content, "r", encoding="utf-8") as f:
-        draft = json.load(f)
-
-    tracks = draft.get("tracks") or []
-    if len(tracks) < 2:
-        errors.append("轨道数量过少，期望至少包含视频与音频/文本")
-
-    # 估算视频轨与音频/文本轨的时长一致性
-    video_like = [t for t in tracks if str(t.get("type")).lower() in {"video", "sticker"}]
-    audio_like = [t for t in tracks if str(t.get("type")).lower() in {"audio", "text", "subtitle"}]
-
-    if video_like:
-        video_end = max(_track_end_time(t) for t in video_like)
-    else:
-        video_end = 0
-
-    if audio_like:
-        audio_end = max(_track_end_time(t) for t in audio_like)
-    else:
-        audio_end = 0
-
-    if video_end and audio_end:
-        if abs(_duration_seconds(video_end - audio_end)) > 0.5:
-            errors.append("音画时长差异超过 0.5 秒，请检查时间线对齐")
-
-    return errors
+# 校验逻辑位于 video_auto.validate（常驻服务与基准测试同样使用）；这里只保留命令行入口
+from video_auto.validate import (  # noqa: E402,F401
+    collect_drafts,
+    inspect_draft,
+    validate_draft,
+    validate_many,
+    write_report,
+)
 
 
 if __name__ == "__main__":
     import argparse
 
     parser = argparse.ArgumentParser(description="Validate CapCut draft")
-    parser.add_argument("path", help="draft 文件夹路径")
+    parser.add_argument("path", help="draft 文件夹路径，或包含多个草稿的草稿根目录")
+    parser.add_argument("--workers", type=int, default=None, help="并行进程数，默认 CPU 核数")
+    parser.add_argument("--report", default=None, help="报告输出路径（.json 或 .csv）")
+    parser.add_argument("--reindex", action="store_true", help="强制重建草稿位置索引")
     args = parser.parse_args()
 
-    errs = validate_draft(args.path)
-    if errs:
-        print("验证失败：")
-        for e in errs:
-            print("- ", e)
+    reports = validate_many(collect_drafts(args.path, reindex=args.reindex), workers=args.workers)
+    if args.report:
+        write_report(reports, args.report)
+
+    failed = [r for r in reports if not r["ok"]]
+    if len(reports) == 1 and not args.report:
+        if failed:
+            print("验证失败：")
+            for e in failed[0]["errors"]:
+                print("- ", e)
+        else:
+            print("验证通过")
     else:
-        print("验证通过")
+        for r in failed:
+            print(f"验证失败: {r['path']}")
+            for e in r["errors"]:
+                print("- ", e)
+        print(f"共 {len(reports)} 个草稿，通过 {len(reports) - len(failed)}，失败 {len(failed)}")
+    sys.exit(1 if failed or not reports else 0)
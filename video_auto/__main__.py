@@ -1,13 +1,93 @@
-from .sync import process_draft_automatically
+import argparse
+import os
+from contextlib import nullcontext
+
+from .compact import format_summary
+from .profiling import profile
+from .shard import shard_draft, shard_source
+from .sync import MICROSECONDS, format_duration, get_latest_draft_folder, process_draft_automatically
+from .watch import DEFAULT_INTERVAL, watch_images
 
 
 def main() -> None:
-    # 直接处理最新草稿，图片目录使用默认配置
-    try:
-        process_draft_automatically()
-    except Exception as e:
-        # 避免栈信息打爆日志，打印简洁错误
-        print(f"处理草稿时出错: {e}")
+    parser = argparse.ArgumentParser(prog="python -m video_auto", description="处理最新的剪映草稿")
+    parser.add_argument("--images", default=None, help="图片目录，默认使用内置路径")
+    parser.add_argument("--recursive", action="store_true", help="递归搜索图片目录的子目录")
+    parser.add_argument("--include", action="append", default=None, help="只导入匹配该 fnmatch 模式的图片，可重复")
+    parser.add_argument("--exclude", action="append", default=None, help="跳过匹配该 fnmatch 模式的图片/子目录，可重复")
+    parser.add_argument("--subtitles", default=None, help="字幕文件（SRT/VTT/ASS），作为时间基准替代草稿内字幕")
+    parser.add_argument("--text-track", action="store_true", help="同时根据字幕文件生成字幕轨道")
+    parser.add_argument("--reindex", action="store_true", help="强制重建草稿位置索引")
+    parser.add_argument("--profile", action="store_true", help="打印各阶段耗时表")
+    parser.add_argument("--watch", action="store_true", help="常驻监听图片目录与草稿，变化后自动增量同步")
+    parser.add_argument("--watch-interval", type=float, default=DEFAULT_INTERVAL, help="监听模式的轮询间隔（秒）")
+    parser.add_argument("--seed", type=int, default=None, help="随机种子：固定后相同输入不会改写草稿")
+    parser.add_argument("--compact", action="store_true", help="压缩输出：共享动画素材、删除无效关键帧、省略默认字段")
+    parser.add_argument("--shard-max-duration", type=float, default=None, help="分片：每个草稿的最长时长（秒）")
+    parser.add_argument("--shard-max-segments", type=int, default=None, help="分片：每个草稿最多包含的字幕条数")
+    parser.add_argument("--workers", type=int, default=None, help="分片模式的并行进程数，默认 CPU 核数")
+    args = parser.parse_args()
+    sharding = bool(args.shard_max_duration or args.shard_max_segments)
+    if sharding and args.watch:
+        parser.error("--watch 不能与分片参数一起使用")
+
+    # 直接处理最新草稿
+    with (profile() if args.profile else nullcontext()) as prof:
+        try:
+            if args.watch:
+                watch_images(
+                    args.images,
+                    reindex=args.reindex,
+                    seed=args.seed,
+                    interval=args.watch_interval,
+                    subtitle_file=args.subtitles,
+                    text_track=args.text_track,
+                    compact=args.compact,
+                    recursive=args.recursive,
+                    include=args.include,
+                    exclude=args.exclude,
+                )
+            elif sharding:
+                # 源草稿保持不变，分片写入相邻的 <草稿名>_partNN 文件夹
+                source = shard_source(get_latest_draft_folder(reindex=args.reindex))
+                draft_content = os.path.join(source, "draft_content.json")
+                index = shard_draft(
+                    draft_content,
+                    args.images,
+                    max_duration=int(args.shard_max_duration * MICROSECONDS) if args.shard_max_duration else None,
+                    max_segments=args.shard_max_segments,
+                    subtitle_file=args.subtitles,
+                    text_track=args.text_track,
+                    seed=args.seed,
+                    workers=args.workers,
+                    compact=args.compact,
+                    recursive=args.recursive,
+                    include=args.include,
+                    exclude=args.exclude,
+                )
+                for part in index["shards"]:
+                    print(f"分片 {part['index']}: {part['folder']}（起点 {format_duration(part['offset'])}）")
+                    if "compact" in part:
+                        print(f"  {format_summary(part['compact'], part['draft_bytes'])}")
+            else:
+                result = process_draft_automatically(
+                    images_dir=args.images,
+                    reindex=args.reindex,
+                    seed=args.seed,
+                    subtitle_file=args.subtitles,
+                    text_track=args.text_track,
+                    compact=args.compact,
+                    recursive=args.recursive,
+                    include=args.include,
+                    exclude=args.exclude,
+                )
+                if "compact" in result:
+                    print(format_summary(result["compact"], result["draft_bytes"]))
+        except Exception as e:
+            # 避免栈信息打爆日志，打印简洁错误
+            print(f"处理草稿时出错: {e}")
+    if prof is not None:
+        print(prof.format_table())
 
 
 if __name__ == "__main__":
@@ -1,98 +1,381 @@
 import json
 import os
-from typing import List, Optional
+import uuid
+from concurrent.futures import ProcessPoolExecutor
+from typing import Any, Dict, List, Optional, Sequence, Tuple
 
-from .config import load_manifest
+from .audioprobe import probe_audios
+from .beats import analyze_beats, beat_sync_settings, snap_points
+from .config import Manifest, load_manifest
+from .draftindex import DraftIndex
+from .ids import ID_NAMESPACE, IdAllocator
+from .imageprobe import probe_images
+from .locator import DRAFT_FILE
+from .materials import MaterialIndex
 from .paths import find_draft_content_json
-from .backup import backup_draft
-from . import sync
+from .backup import run_backup
+from .lock import draft_lock
+from .model import compile_templates
+from .presets import resolve_preset_name
+from .profiling import span
+from .shard import SHARD_INDEX_NAME
+from .subtitles import Cue
+from . import draftcache, draftio, sync
 
+# 派生草稿（--output 或多预设输出）中记录源草稿的文件
+RENDER_SOURCE_NAME = "render_source.json"
 
-def _compute_end_time(segments: List[dict]) -> int:
-    end = 0
-    for seg in segments or []:
-        tt = seg.get("target_timerange") or {}
-        start = int(tt.get("start") or 0)
-        duration = int(tt.get("duration") or 0)
-        end = max(end, start + duration)
-    return end
 
+def apply_manifest(
+    mf: Manifest,
+    draft: dict,
+    preset_name: Optional[str],
+    ids: IdAllocator,
+    compact: Optional[bool] = None,
+    cues: Optional[List[Cue]] = None,
+) -> Dict[str, Any]:
+    """把 manifest 的素材同步进已加载的草稿（就地修改）；render_video、监听模式与渲染服务共用。
 
-def _ensure_effect_track(draft: dict) -> None:
-    if "tracks" not in draft:
-        draft["tracks"] = []
-    # 避免重复添加，占位一次
-    if not any(t.get("type") == "effect" for t in draft["tracks"]):
-        effect_track = sync.add_effect_track(draft, [])
-        draft["tracks"].append(effect_track)
+    各轨道按已有片段比对，只重建变化的部分。返回 {"rewritten": 是否改动了已有字段（此时不能增量拼接写回）,
+    "compact": 压缩统计（见 compact.compact_draft，未压缩时为 None）}。
+    compact 为 None 时取 manifest 的 draft_settings.compact。cues 为预先解析好的字幕文件条目
+    （多预设渲染时只解析一次），为 None 时按 manifest 读取。
+    """
+    assets = mf.get_assets()
+    image_files: List[str] = assets.get("images", [])
+    audio_files: List[str] = assets.get("audio", [])
+    bgm = mf.get_bgm()
+    subtitles = mf.get_subtitles()
+    templates = compile_templates(preset_name)
+
+    sync.ensure_materials(draft)
+    sync.ensure_tracks(draft)
+    # 一次遍历建立索引：轨道/素材查找与时间线终点都经由它，不再逐个扫描
+    index = DraftIndex(draft)
+    # 显式指定预设时同步画布尺寸与帧率
+    rewritten = bool(preset_name) and sync.apply_canvas_config(draft, templates)
+
+    # 字幕文件：可选生成字幕轨道；没有旁白时作为时间基准
+    if cues is None:
+        cues = sync.load_subtitle_cues(subtitles["path"]) if subtitles else []
+    if subtitles and subtitles["text_track"]:
+        sync.upsert_text_track(draft, cues, templates, ids, index)
+
+    # 旁白音频按实际时长首尾相接，作为时间线基准；没有旁白时按字幕文件或草稿内字幕切分
+    timing_segments: List[Any] = []
+    timeline_end: Optional[int] = None
+    audio_materials: List[dict] = []
+    if audio_files:
+        audio_materials = sync.import_audios_to_draft(draft, audio_files, templates, index)
+    if audio_materials:
+        narration = sync.upsert_narration_track(draft, audio_materials, templates, ids, index)
+        timing_segments = narration["segments"]
+        timeline_end = index.timeline(narration).end()
+    else:
+        # manifest 中去掉了旁白（或都读不出时长）：移除上次生成的旁白轨道
+        rewritten = sync.remove_owned_track(draft, sync.NARRATION_TRACK_ID) or rewritten
+
+    if not timing_segments and (image_files or bgm):
+        timing_segments = cues or sync.get_subtitle_segments_from_draft(draft, index)
+
+    if image_files:
+        image_materials = sync.import_images_to_draft(draft, image_files, templates=templates, draft_index=index)
+        # beat_sync：图片切换点吸附到 BGM 节拍；既无旁白也无字幕时按节拍铺满整首 BGM
+        beat_sync = beat_sync_settings(bgm["beat_sync"] if bgm else None)
+        beats: List[int] = []
+        image_end = timeline_end
+        if bgm and beat_sync["enabled"]:
+            beats = snap_points(analyze_beats(bgm["path"]))
+            if beats and not timing_segments and image_end is None:
+                image_end = probe_audios([bgm["path"]]).get(bgm["path"])
+        sync.upsert_image_track(
+            draft,
+            image_materials,
+            timing_segments,
+            templates,
+            image_end,
+            ids,
+            index,
+            beats=beats,
+            beat_tolerance=int(beat_sync["tolerance_ms"]) * 1000,
+        )
+        sync.ensure_effect_track(draft, draft_index=index)
+
+    # BGM 铺满整条时间线，并对解说（旁白或字幕）区间做 ducking
+    bgm_materials: List[dict] = []
+    if bgm:
+        bgm_materials = sync.import_audios_to_draft(draft, [bgm["path"]], templates, index)
+    if bgm_materials:
+        total = timeline_end or index.end_time(exclude=(sync.BGM_TRACK_ID,))
+        sync.upsert_bgm_track(
+            draft, bgm_materials[0], total, timing_segments, bgm["volume"], bgm["ducking"], templates, ids, index
+        )
+    else:
+        rewritten = sync.remove_owned_track(draft, sync.BGM_TRACK_ID) or rewritten
+    # 被替换或移除的旁白/BGM 音频素材与图片素材一样清理，其他来源的音频不受影响
+    rewritten = sync.prune_owned_audios(draft) or rewritten
+
+    compacted = None
+    if mf.get_draft_settings()["compact"] if compact is None else compact:
+        compacted = sync.compact_generated(draft)
+        rewritten = True
+    return {"rewritten": rewritten, "compact": compacted}
+
+
+def write_rendered_draft(draft_content: str, draft: dict, mark: Optional[draftio.AppendMark]) -> int:
+    """写回 apply_manifest 处理过的草稿（见 draftio.write_draft），返回写入字节数，内容未变化时为 0。
+
+    写回后把内存中的草稿登记到解析缓存，随后的校验/统计无需再解析 JSON。
+    """
+    with span("write_draft") as sp:
+        # 内容与现有文件相同（固定 seed 且输入未变）时不重写
+        written = draftio.write_draft(draft_content, draft, mark)
+        if not written:
+            sp.count("skipped")
+        sp.count("bytes", os.path.getsize(draft_content))
+    draftcache.remember(draft_content, draft)
+    return written
+
+
+def _render_into_draft(
+    mf: Manifest,
+    ds: dict,
+    draft_folder: str,
+    draft_content: str,
+    preset_name: Optional[str],
+    ids: IdAllocator,
+    compact: Optional[bool] = None,
+    cues: Optional[List[Cue]] = None,
+) -> Dict[str, Any]:
+    if ds.get("backup", {}).get("enable") and ds.get("backup", {}).get("location"):
+        run_backup(draft_folder, ds["backup"])
+
+    with span("load_draft") as sp:
+        draft = draftcache.load_draft(draft_content)
+        sp.count("bytes", os.path.getsize(draft_content))
+        # 重复运行会就地改写已有轨道，只有首次运行可以走增量拼接
+        mark = None if sync.has_owned_tracks(draft) else draftio.AppendMark(draft_content, draft)
+
+    applied = apply_manifest(mf, draft, preset_name, ids, compact, cues)
+    if applied["rewritten"]:
+        mark = None
+    written = write_rendered_draft(draft_content, draft, mark)
+    return _render_report(draft_folder, draft_content, written, applied)
+
+
+def _render_report(folder: str, draft_content: str, written: int, applied: Dict[str, Any]) -> Dict[str, Any]:
+    """单个草稿的渲染结果：目录、写入字节数、写回后的文件大小，以及压缩统计（仅压缩时）。"""
+    report = {"draft_folder": folder, "bytes_written": written, "draft_bytes": os.path.getsize(draft_content)}
+    if applied["compact"] is not None:
+        report["compact"] = applied["compact"]
+    return report
+
+
+def render_source(folder: str) -> str:
+    """若 folder 是派生草稿（见 _render_derived），返回其源草稿文件夹，否则原样返回。
 
+    派生草稿刚写出时往往是“最新草稿”，据此回到源草稿，避免对派生草稿再派生。
+    """
+    try:
+        with open(os.path.join(folder, RENDER_SOURCE_NAME), "r", encoding="utf-8") as f:
+            source = json.load(f).get("source")
+    except (OSError, ValueError, AttributeError):
+        return folder
+    return source if isinstance(source, str) and os.path.isfile(os.path.join(source, DRAFT_FILE)) else folder
 
-def render_video(manifest_path: str, preset_name: Optional[str] = None, output_dir: Optional[str] = None) -> str:
-    mf = load_manifest(manifest_path)
-    ds = mf.get_draft_settings()
 
-    draft_content = find_draft_content_json(ds.get("draft_path"))
+def preset_folder_name(source_folder: str, preset_name: str, output_dir: Optional[str] = None) -> str:
+    """多预设渲染的输出草稿：<output_dir 或源草稿所在目录>/<源草稿名>_<预设名>。"""
+    source_folder = os.path.abspath(source_folder)
+    base = os.path.abspath(output_dir) if output_dir else os.path.dirname(source_folder)
+    return os.path.join(base, f"{os.path.basename(source_folder)}_{resolve_preset_name(preset_name)}")
+
+
+def _locate_source(ds: dict, reindex: bool) -> str:
+    """定位要渲染的草稿文件夹；自动选中的“最新草稿”是派生草稿时回到其源草稿，显式指定的草稿原样使用。"""
+    draft_content = find_draft_content_json(ds.get("draft_path"), reindex=reindex)
     if not draft_content:
         raise FileNotFoundError("未找到 draft_content.json，请检查 draft_path 或默认草稿目录")
+    folder = os.path.dirname(os.path.abspath(draft_content))
+    explicit = ds.get("draft_path") and os.path.abspath(ds["draft_path"]) in (folder, os.path.abspath(draft_content))
+    return folder if explicit else render_source(folder)
 
-    draft_folder = os.path.dirname(draft_content)
 
-    if ds.get("backup", {}).get("enable") and ds.get("backup", {}).get("location"):
-        backup_draft(draft_folder, ds["backup"]["location"])
+def render_target(ds: dict, reindex: bool = False, output_dir: Optional[str] = None) -> Tuple[str, str]:
+    """返回 (源草稿文件夹, 要写入的草稿文件夹)；render_video、监听模式与渲染服务共用。
+
+    源草稿的定位见 _locate_source。给出 output_dir 时写入 <output_dir>/<源草稿名>（不存在时由
+    derive_draft 从源草稿派生），否则两者相同、直接写入源草稿。
+    """
+    source_folder = _locate_source(ds, reindex)
+    if output_dir:
+        folder = os.path.join(os.path.abspath(output_dir), os.path.basename(source_folder))
+        if folder != source_folder:
+            return source_folder, folder
+    return source_folder, source_folder
+
+
+def derive_draft(source_folder: str, folder: str, preset_name: Optional[str]) -> dict:
+    """首次派生：把源草稿文件夹复制为 folder 并返回改写了 id 的草稿（尚未写入 draft_content.json）。
 
-    with open(draft_content, "r", encoding="utf-8") as f:
-        draft = json.load(f)
+    封面、meta 等一并复制，meta 中的 id/名称/路径改写为新草稿，并写入记录源草稿的 render_source.json。
+    调用方需持有 folder 的草稿锁。
+    """
+    draft_id = str(uuid.uuid5(ID_NAMESPACE, f"derived:{os.path.abspath(folder)}"))
+    with span("load_draft"):
+        draft = draftcache.load_draft(os.path.join(source_folder, DRAFT_FILE))
+    if "id" in draft:
+        draft["id"] = draft_id
+    draftio.prepare_draft_folder(source_folder, folder, draft_id, skip=(RENDER_SOURCE_NAME, SHARD_INDEX_NAME))
+    with open(os.path.join(folder, RENDER_SOURCE_NAME), "w", encoding="utf-8") as f:
+        json.dump({"source": source_folder, "preset": resolve_preset_name(preset_name)}, f, ensure_ascii=False, indent=2)
+    return draft
 
+
+def _prepare_assets(mf: Manifest) -> Optional[List[Cue]]:
+    """预先完成与预设无关的工作，返回解析好的字幕条目（manifest 未配置字幕文件时为 None）。
+
+    图片内容哈希与尺寸、音频时长探测与 BGM 节拍分析结果写入共享缓存，随后各预设的渲染只需 stat 即可命中。
+    """
     assets = mf.get_assets()
-    image_files: List[str] = assets.get("images", [])
+    images = assets.get("images", [])
+    if images:
+        MaterialIndex({}).hash_files(images)
+        probe_images(images)
+    audio = list(assets.get("audio", []))
+    bgm = mf.get_bgm()
+    if bgm:
+        audio.append(bgm["path"])
+        if images and beat_sync_settings(bgm["beat_sync"])["enabled"]:
+            analyze_beats(bgm["path"])
+    if audio:
+        probe_audios(audio)
+    subtitles = mf.get_subtitles()
+    return sync.load_subtitle_cues(subtitles["path"]) if subtitles else None
 
-    sync.ensure_materials(draft)
-    sync.ensure_tracks(draft)
 
-    if image_files:
-        image_materials = sync.import_images_to_draft(draft, image_files)
-        subtitle_segments = sync.get_subtitle_segments_from_draft(draft)
-
-        image_track = {
-            "attribute": 0,
-            "flag": 0,
-            "id": os.urandom(8).hex(),
-            "segments": [],
-            "type": "video",
-        }
-
-        created_segments: List[dict] = []
-        last_end_time = 0
-
-        if not subtitle_segments:
-            duration = sync.MIN_IMAGE_DURATION_SECONDS * sync.MICROSECONDS
-            mat = image_materials[0]
-            seg = sync.build_image_segment(mat["id"], last_end_time, duration, 0)
-            seg["common_keyframes"] = sync.create_common_keyframes(last_end_time, duration)
-            anim = sync.get_random_animation()
-            draft["materials"]["material_animations"].append(anim)
-            seg["extra_material_refs"].append(anim["id"])
-            image_track["segments"].append(seg)
-            created_segments.append(seg)
+def _render_derived(
+    mf: Manifest,
+    ds: dict,
+    source_folder: str,
+    folder: str,
+    preset_name: Optional[str],
+    ids: IdAllocator,
+    compact: Optional[bool] = None,
+    cues: Optional[List[Cue]] = None,
+) -> Dict[str, Any]:
+    """把 manifest 渲染进由源草稿派生的草稿文件夹，返回渲染结果（见 _render_report）；源草稿不会被修改。
+
+    首次渲染时由 derive_draft 复制源草稿，之后在派生草稿的基础上增量更新，用户在其中所做的修改得以保留。
+    """
+    draft_content = os.path.join(folder, DRAFT_FILE)
+    with draft_lock(folder):
+        if os.path.isfile(draft_content):
+            return _render_into_draft(mf, ds, folder, draft_content, preset_name, ids, compact, cues)
+        draft = derive_draft(source_folder, folder, preset_name)
+        applied = apply_manifest(mf, draft, preset_name, ids, compact, cues)
+        written = write_rendered_draft(draft_content, draft, None)
+    return _render_report(folder, draft_content, written, applied)
+
+
+def _render_preset(
+    mf: Manifest,
+    ds: dict,
+    source_folder: str,
+    folder: str,
+    preset_name: str,
+    seed: Optional[int],
+    scope: str,
+    compact: Optional[bool],
+    cues: Optional[List[Cue]],
+) -> Dict[str, Any]:
+    """子进程中生成单个预设的草稿，返回渲染结果（见 _render_report）。"""
+    ids = IdAllocator(seed, scope=scope)
+    return _render_derived(mf, ds, source_folder, folder, preset_name, ids, compact, cues)
+
+
+def render_presets(
+    manifest_path: str,
+    presets: Sequence[str],
+    output_dir: Optional[str] = None,
+    reindex: bool = False,
+    seed: Optional[int] = None,
+    compact: Optional[bool] = None,
+    workers: Optional[int] = None,
+    stats: Optional[Dict[str, Dict[str, Any]]] = None,
+) -> Dict[str, str]:
+    """把同一个 manifest 按多个预设渲染为各自独立的草稿，返回 {预设名: 草稿目录}（按 presets 顺序）。
+
+    manifest 解析、素材探测（内容哈希、图片尺寸、音频时长）与字幕解析只做一次；各预设的草稿
+    （画布尺寸、图片缩放、关键帧幅度，见 presets.PRESETS）随后在进程池中并行生成，
+    写入 preset_folder_name 给出的文件夹。源草稿不会被修改。
+    给出 stats 时按预设名填入各草稿的渲染结果（见 render_video 的 stats）。
+    """
+    names = list(dict.fromkeys(resolve_preset_name(p) for p in presets))
+    if not names:
+        raise ValueError("presets 不能为空")
+    scope = os.path.abspath(manifest_path)
+    with span("render_presets"):
+        with span("load_manifest"):
+            mf = load_manifest(manifest_path)
+            ds = mf.get_draft_settings()
+            for name in names:
+                compile_templates(name)
+        source_folder = _locate_source(ds, reindex)
+        with span("prepare_assets"):
+            cues = _prepare_assets(mf)
+
+        folders = {name: preset_folder_name(source_folder, name, output_dir) for name in names}
+        # 各预设的 id 互不相同：scope 中带上预设名
+        jobs = [(mf, ds, source_folder, folders[n], n, seed, f"{scope}#{n}", compact, cues) for n in names]
+        with span("render_preset_drafts") as sp:
+            if len(jobs) == 1 or workers == 1:
+                reports = [_render_preset(*job) for job in jobs]
+            else:
+                with ProcessPoolExecutor(max_workers=min(workers or len(jobs), len(jobs))) as pool:
+                    reports = [fut.result() for fut in [pool.submit(_render_preset, *job) for job in jobs]]
+            sp.count("presets", len(jobs))
+    if stats is not None:
+        stats.update(zip(names, reports))
+    return folders
+
+
+def render_video(
+    manifest_path: str,
+    preset_name: Optional[str] = None,
+    output_dir: Optional[str] = None,
+    reindex: bool = False,
+    seed: Optional[int] = None,
+    compact: Optional[bool] = None,
+    stats: Optional[Dict[str, Any]] = None,
+) -> str:
+    """把 manifest 渲染进剪映草稿，返回草稿目录。
+
+    给定 seed 时片段 id、关键帧、动画选择等均由 (seed, manifest, 素材, 片段序号) 派生，
+    输入不变的重复渲染产出逐字节相同的草稿，并跳过写回。
+    compact=True 时压缩生成的内容（共享动画素材、删除无效关键帧、省略默认字段）；
+    为 None 时取 manifest 的 draft_settings.compact。
+    给出 output_dir 时不修改源草稿，而是渲染进 <output_dir>/<源草稿名>（首次从源草稿复制）。
+    多预设渲染请使用 render_presets（返回 {预设名: 草稿目录}）。
+    给出 stats（字典）时填入本次渲染的结果：draft_folder、bytes_written（写入字节数，内容未变化时为 0）、
+    draft_bytes（写回后草稿文件的大小）以及压缩时的 compact（见 compact.compact_draft）。
+    """
+    ids = IdAllocator(seed, scope=os.path.abspath(manifest_path))
+    with span("render_video"):
+        with span("load_manifest"):
+            mf = load_manifest(manifest_path)
+            ds = mf.get_draft_settings()
+            # 尽早校验预设名称
+            compile_templates(preset_name)
+
+        draft_folder, folder = render_target(ds, reindex, output_dir)
+        if folder != draft_folder:
+            report = _render_derived(mf, ds, draft_folder, folder, preset_name, ids, compact)
         else:
-            for i, _ in enumerate(subtitle_segments):
-                start_time = last_end_time
-                end_time = sync.find_next_subtitle_time(subtitle_segments, start_time)
-                duration = end_time - start_time
-                mat = image_materials[i % len(image_materials)]
-                seg = sync.build_image_segment(mat["id"], start_time, duration, i)
-                seg["common_keyframes"] = sync.create_common_keyframes(start_time, duration)
-                anim = sync.get_random_animation()
-                draft["materials"]["material_animations"].append(anim)
-                seg["extra_material_refs"].append(anim["id"])
-                image_track["segments"].append(seg)
-                created_segments.append(seg)
-                last_end_time = end_time
-
-        draft["tracks"].append(image_track)
-        _ensure_effect_track(draft)
-
-    with open(draft_content, "w", encoding="utf-8") as f:
-        json.dump(draft, f, ensure_ascii=False)
-
-    return draft_folder
+            with draft_lock(draft_folder):
+                draft_content = os.path.join(draft_folder, DRAFT_FILE)
+                report = _render_into_draft(mf, ds, draft_folder, draft_content, preset_name, ids, compact)
+
+    if stats is not None:
+        stats.update(report)
+    return report["draft_folder"]
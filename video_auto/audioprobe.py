@@ -0,0 +1,272 @@
+import os
+import struct
+from concurrent.futures import ThreadPoolExecutor
+from typing import BinaryIO, Dict, Iterable, List, NamedTuple, Optional, Set
+
+from .statcache import StatCache, shared_cache
+
+MICROSECONDS = 1_000_000
+DEFAULT_PROBE_WORKERS = 8
+
+# MPEG 版本位 → 采样率表（版本位 1 为保留值）
+_MP3_SAMPLE_RATES = {
+    3: (44100, 48000, 32000),  # MPEG-1
+    2: (22050, 24000, 16000),  # MPEG-2
+    0: (11025, 12000, 8000),  # MPEG-2.5
+}
+# Layer III 比特率表（kbps）
+_MP3_BITRATES_V1 = (0, 32, 40, 48, 56, 64, 80, 96, 112, 128, 160, 192, 224, 256, 320)
+_MP3_BITRATES_V2 = (0, 8, 16, 24, 32, 40, 48, 56, 64, 80, 96, 112, 128, 144, 160)
+# 查找首帧同步时读取的字节数
+_MP3_SCAN_SIZE = 64 * 1024
+# 无 Xing/VBRI 头时在开头、中部与末尾各检查的帧数：比特率全部一致则按 CBR 估算，否则逐帧遍历
+_CBR_CHECK_FRAMES = 16
+# 中部与末尾抽样读取的字节数（足以容纳 _CBR_CHECK_FRAMES 个最长的帧）
+_CBR_SAMPLE_SIZE = 32 * 1024
+# 需要进入解析的 MP4 容器 box
+_MP4_CONTAINERS = {b"moov", b"trak", b"mdia"}
+
+
+class _FrameHeader(NamedTuple):
+    mpeg1: bool
+    mono: bool
+    sample_rate: int
+    bitrate: int
+    length: int
+    samples: int
+
+
+class WavFormat(NamedTuple):
+    format_tag: int
+    channels: int
+    sample_rate: int
+    byte_rate: int
+    block_align: int
+    bits: int
+    data_offset: int
+    data_size: int
+
+
+def read_wav_format(f: BinaryIO) -> Optional[WavFormat]:
+    """解析 RIFF/WAVE 的 fmt 与 data 块（f 已读过 12 字节文件头），返回采样格式与数据区位置。
+
+    WAVE_FORMAT_EXTENSIBLE 取 SubFormat 的格式码；data 块缺失或出现在 fmt 之前时返回 None。
+    """
+    f.seek(12)
+    fields: Optional[tuple] = None
+    while True:
+        header = f.read(8)
+        if len(header) < 8:
+            return None
+        chunk_id, size = struct.unpack("<4sI", header)
+        if chunk_id == b"fmt ":
+            body = f.read(size)
+            fields = struct.unpack("<HHIIHH", body[:16])
+            if fields[0] == 0xFFFE and len(body) >= 26:
+                fields = struct.unpack("<H", body[24:26]) + fields[1:]
+            f.seek(size % 2, os.SEEK_CUR)
+        elif chunk_id == b"data":
+            if fields is None:
+                return None
+            offset = f.tell()
+            # 录制中断的文件 data 长度可能超出实际大小
+            remaining = os.fstat(f.fileno()).st_size - offset
+            return WavFormat(*fields, offset, min(size, remaining))
+        else:
+            f.seek(size + size % 2, os.SEEK_CUR)
+
+
+def _probe_wav(f: BinaryIO) -> Optional[int]:
+    fmt = read_wav_format(f)
+    if fmt is None or not fmt.byte_rate:
+        return None
+    return fmt.data_size * MICROSECONDS // fmt.byte_rate
+
+
+def _mp3_header(data: bytes, pos: int = 0) -> Optional[_FrameHeader]:
+    """解析 pos 处的 MPEG Layer III 帧头，非法时返回 None。"""
+    if pos + 4 > len(data) or data[pos] != 0xFF or (data[pos + 1] & 0xE0) != 0xE0:
+        return None
+    b1, b2, b3 = data[pos + 1], data[pos + 2], data[pos + 3]
+    version = (b1 >> 3) & 0x03
+    layer = (b1 >> 1) & 0x03
+    bitrate_index = b2 >> 4
+    rate_index = (b2 >> 2) & 0x03
+    if version == 1 or layer != 1 or bitrate_index in (0, 15) or rate_index == 3:
+        return None
+    mpeg1 = version == 3
+    sample_rate = _MP3_SAMPLE_RATES[version][rate_index]
+    bitrate = (_MP3_BITRATES_V1 if mpeg1 else _MP3_BITRATES_V2)[bitrate_index] * 1000
+    samples = 1152 if mpeg1 else 576
+    length = samples // 8 * bitrate // sample_rate + ((b2 >> 1) & 0x01)
+    return _FrameHeader(mpeg1, b3 >> 6 == 3, sample_rate, bitrate, length, samples)
+
+
+def _find_sync(data: bytes) -> Optional[int]:
+    """data 中第一个可信的帧同步：紧随其后的位置也必须是合法帧头（或已到 data 末尾）。"""
+    for pos in range(len(data) - 3):
+        hdr = _mp3_header(data, pos)
+        if hdr and (pos + hdr.length + 4 > len(data) or _mp3_header(data, pos + hdr.length)):
+            return pos
+    return None
+
+
+def _frame_bitrates(data: bytes, pos: int) -> Set[int]:
+    """从 pos 起连续最多 _CBR_CHECK_FRAMES 帧的比特率。"""
+    bitrates: Set[int] = set()
+    for _ in range(_CBR_CHECK_FRAMES):
+        frame = _mp3_header(data, pos)
+        if frame is None:
+            break
+        bitrates.add(frame.bitrate)
+        pos += frame.length
+    return bitrates
+
+
+def _sample_bitrates(f: BinaryIO, offset: int, end: int) -> Set[int]:
+    """读取 offset 起的一小段，返回其中连续帧的比特率；找不到帧同步时为空集合。"""
+    f.seek(offset)
+    data = f.read(min(_CBR_SAMPLE_SIZE, end - offset))
+    pos = _find_sync(data)
+    return set() if pos is None else _frame_bitrates(data, pos)
+
+
+def _probe_mp3(f: BinaryIO) -> Optional[int]:
+    size = os.fstat(f.fileno()).st_size
+    head = f.read(10)
+    start = 0
+    if len(head) == 10 and head[:3] == b"ID3":
+        tag_size = (head[6] << 21) | (head[7] << 14) | (head[8] << 7) | head[9]
+        start = 10 + tag_size + (10 if head[5] & 0x10 else 0)
+    end = size
+    if size >= 128:
+        f.seek(size - 128)
+        if f.read(3) == b"TAG":
+            end -= 128
+
+    f.seek(start)
+    data = f.read(_MP3_SCAN_SIZE)
+    first = _find_sync(data)
+    if first is None:
+        return None
+    hdr = _mp3_header(data, first)
+
+    # Xing/Info 头位于 side info 之后，VBRI 头固定在帧头后 32 字节
+    side_info = (17 if hdr.mono else 32) if hdr.mpeg1 else (9 if hdr.mono else 17)
+    xing = first + 4 + side_info
+    if data[xing:xing + 4] in (b"Xing", b"Info") and len(data) >= xing + 12:
+        if struct.unpack(">I", data[xing + 4:xing + 8])[0] & 0x01:
+            frames = struct.unpack(">I", data[xing + 8:xing + 12])[0]
+            return frames * hdr.samples * MICROSECONDS // hdr.sample_rate
+    vbri = first + 4 + 32
+    if data[vbri:vbri + 4] == b"VBRI" and len(data) >= vbri + 18:
+        frames = struct.unpack(">I", data[vbri + 14:vbri + 18])[0]
+        return frames * hdr.samples * MICROSECONDS // hdr.sample_rate
+
+    # 开头几帧比特率一致还不够（有的 VBR 文件开头是静音、比特率恒定）：中部与末尾也抽样一致才按 CBR 估算
+    audio_start = start + first
+    if _frame_bitrates(data, first) == {hdr.bitrate}:
+        middle = audio_start + (end - audio_start) // 2
+        tail = max(audio_start, end - _CBR_SAMPLE_SIZE)
+        if all(_sample_bitrates(f, offset, end) == {hdr.bitrate} for offset in (middle, tail)):
+            return (end - audio_start) * 8 * MICROSECONDS // hdr.bitrate
+
+    # 无头 VBR：只读取每帧 4 字节帧头并按帧长跳转，不解码音频数据
+    frames = 0
+    offset = audio_start
+    while offset + 4 <= end:
+        f.seek(offset)
+        frame = _mp3_header(f.read(4))
+        if frame is None:
+            break
+        frames += 1
+        offset += frame.length
+    return frames * hdr.samples * MICROSECONDS // hdr.sample_rate
+
+
+def _mp4_duration(f: BinaryIO, body: int) -> Optional[int]:
+    """解析 mvhd/mdhd 的 timescale 与 duration：version 0 为 32 位字段，version 1 为 64 位。"""
+    f.seek(body)
+    data = f.read(32)
+    if not data:
+        return None
+    if data[0] == 1:
+        timescale, duration = struct.unpack(">IQ", data[20:32])
+    else:
+        timescale, duration = struct.unpack(">II", data[12:20])
+    if not timescale or duration in (0, 0xFFFFFFFF, 0xFFFFFFFFFFFFFFFF):
+        return None
+    return duration * MICROSECONDS // timescale
+
+
+def _walk_mp4(f: BinaryIO, start: int, end: int, found: Dict[bytes, int]) -> None:
+    pos = start
+    while pos + 8 <= end and b"mvhd" not in found:
+        f.seek(pos)
+        header = f.read(8)
+        if len(header) < 8:
+            return
+        size, kind = struct.unpack(">I4s", header)
+        body = pos + 8
+        if size == 1:
+            size = struct.unpack(">Q", f.read(8))[0]
+            body += 8
+        elif size == 0:
+            size = end - pos
+        if size < body - pos:
+            return
+        if kind in (b"mvhd", b"mdhd") and kind not in found:
+            duration = _mp4_duration(f, body)
+            if duration:
+                found[kind] = duration
+        elif kind in _MP4_CONTAINERS:
+            _walk_mp4(f, body, min(pos + size, end), found)
+        # mdat 等大块直接跳过，不读取内容
+        pos += size
+
+
+def _probe_mp4(f: BinaryIO) -> Optional[int]:
+    found: Dict[bytes, int] = {}
+    _walk_mp4(f, 0, os.fstat(f.fileno()).st_size, found)
+    return found.get(b"mvhd") or found.get(b"mdhd")
+
+
+def probe_audio_file(path: str) -> Optional[int]:
+    """只读取文件头/帧头获取音频时长（微秒），不解码采样。支持 WAV、MP3、M4A/MP4；无法识别返回 None。"""
+    try:
+        with open(path, "rb") as f:
+            head = f.read(12)
+            if head[:4] == b"RIFF" and head[8:12] == b"WAVE":
+                return _probe_wav(f)
+            if head[4:8] == b"ftyp":
+                return _probe_mp4(f)
+            f.seek(0)
+            if head[:3] == b"ID3" or _mp3_header(head) or path.lower().endswith(".mp3"):
+                return _probe_mp3(f)
+    except (OSError, struct.error, IndexError):
+        return None
+    return None
+
+
+def probe_audios(
+    audio_files: Iterable[str], workers: int = DEFAULT_PROBE_WORKERS, cache: Optional[StatCache] = None
+) -> Dict[str, Optional[int]]:
+    """批量探测音频时长：命中缓存（路径 + 大小 + mtime）直接返回，未命中的用线程池并行探测。"""
+    cache = cache if cache is not None else shared_cache("audio_probe")
+    results: Dict[str, Optional[int]] = {}
+    pending: List[str] = []
+    for path in audio_files:
+        if path in results:
+            continue
+        hit, value = cache.lookup(path)
+        results[path] = value if hit else None
+        if not hit:
+            pending.append(path)
+
+    if pending:
+        with ThreadPoolExecutor(max_workers=workers) as pool:
+            for path, duration in zip(pending, pool.map(probe_audio_file, pending)):
+                results[path] = duration
+                cache.put(path, duration)
+        cache.save()
+    return results
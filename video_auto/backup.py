@@ -1,6 +1,10 @@
 import os
 import shutil
 from datetime import datetime
+from typing import Any, Dict
+
+from .profiling import span
+from .snapshots import prune_snapshots, snapshot_draft
 
 
 def backup_draft(src: str, dest_dir: str) -> str:
@@ -10,3 +14,22 @@ def backup_draft(src: str, dest_dir: str) -> str:
     base = os.path.join(dest_dir, f"backup_{timestamp}")
     archive_path = shutil.make_archive(base, "zip", src)
     return archive_path
+
+
+def run_backup(src: str, backup: Dict[str, Any]) -> str:
+    """按 manifest 中 draft_settings.backup 的配置备份草稿。
+
+    mode 为 "snapshot"（默认）时写入增量快照仓库并按 keep/keep_days 清理旧快照，返回快照 id；
+    mode 为 "zip" 时沿用整目录 zip 归档，返回归档路径。
+    """
+    location = backup["location"]
+    if backup.get("mode") == "zip":
+        with span("backup_zip"):
+            return backup_draft(src, location)
+    with span("backup_snapshot"):
+        snapshot_id = snapshot_draft(src, location)
+    if backup.get("keep") is not None or backup.get("keep_days") is not None:
+        with span("backup_prune") as sp:
+            removed = prune_snapshots(location, keep_last=backup.get("keep"), keep_days=backup.get("keep_days"), source=src)
+            sp.count("removed", len(removed))
+    return snapshot_id
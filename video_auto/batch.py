@@ -0,0 +1,147 @@
+import json
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from glob import glob
+from typing import Any, Dict, Iterable, List, Optional, Sequence, Union
+
+from .api import render_presets, render_video
+from .config import load_manifest
+from .locator import DraftLocator
+from .paths import get_default_draft_root
+from .profiling import profile
+
+
+def collect_manifests(spec: str) -> List[str]:
+    """解析 --batch 参数：目录则取其中的 *.json，否则按 glob 模式匹配。结果按路径排序。"""
+    if os.path.isdir(spec):
+        pattern = os.path.join(spec, "*.json")
+    else:
+        pattern = os.path.expanduser(spec)
+    return sorted(os.path.abspath(p) for p in glob(pattern, recursive=True) if os.path.isfile(p))
+
+
+def _reindex_roots(manifest_paths: List[str]) -> None:
+    """在父进程中为各草稿根目录各重建一次位置索引，避免每个子进程重复全量扫描。"""
+    roots = {get_default_draft_root()}
+    for path in manifest_paths:
+        try:
+            draft_path = load_manifest(path).get_draft_settings().get("draft_path")
+        except Exception:
+            continue
+        if draft_path and os.path.isdir(draft_path):
+            roots.add(os.path.abspath(draft_path))
+    for root in sorted(roots):
+        DraftLocator(root).refresh(reindex=True)
+
+
+def _render_one(
+    manifest_path: str,
+    preset_name: Optional[str],
+    output_dir: Optional[str],
+    profiling: Optional[str] = None,
+    seed: Optional[int] = None,
+    compact: Optional[bool] = None,
+    presets: Optional[Sequence[str]] = None,
+) -> Dict[str, Any]:
+    """子进程中渲染单个 manifest，异常转为结果记录，避免单个失败中断整批。
+
+    profiling 为 "time" 或 "memory" 时在结果中附带各阶段性能数据（"memory" 额外记录内存峰值）。
+    给出 presets 时各预设在本进程内依次渲染（整批已按 manifest 并行），结果另含 draft_folders。
+    """
+    if profiling:
+        with profile(trace_memory=profiling == "memory") as prof:
+            result = _render_one(manifest_path, preset_name, output_dir, seed=seed, compact=compact, presets=presets)
+        result["profile"] = prof.to_json()
+        return result
+
+    started = time.perf_counter()
+    result: Dict[str, Any] = {
+        "manifest": manifest_path,
+        "status": "ok",
+        "draft_folder": None,
+        "wall_time_s": 0.0,
+        "bytes_written": 0,
+        "error": None,
+    }
+    try:
+        if presets:
+            rendered = render_presets(
+                manifest_path, presets, output_dir=output_dir, seed=seed, compact=compact, workers=1
+            )
+            folders = list(rendered.values())
+            result["draft_folders"] = folders
+        else:
+            folder = render_video(
+                manifest_path, preset_name=preset_name, output_dir=output_dir, seed=seed, compact=compact
+            )
+            folders = [folder]
+        result["draft_folder"] = folders[0]
+        result["bytes_written"] = sum(os.path.getsize(os.path.join(f, "draft_content.json")) for f in folders)
+    except Exception as e:
+        result["status"] = "error"
+        result["error"] = f"{type(e).__name__}: {e}"
+    result["wall_time_s"] = round(time.perf_counter() - started, 3)
+    return result
+
+
+def render_many(
+    manifests: Union[str, Iterable[str]],
+    workers: Optional[int] = None,
+    preset_name: Optional[str] = None,
+    output_dir: Optional[str] = None,
+    reindex: bool = False,
+    profiling: Optional[str] = None,
+    seed: Optional[int] = None,
+    compact: Optional[bool] = None,
+    presets: Optional[Sequence[str]] = None,
+) -> Dict[str, Any]:
+    """批量渲染：manifests 可为目录/glob 字符串或路径列表，通过进程池并行处理。
+
+    同一草稿的写入由 render_video 内部的草稿锁串行化。返回机器可读的汇总：
+    每个 manifest 的状态、耗时与写入字节数，以及总计；profiling 见 _render_one。
+    seed 对每个 manifest 分别生效（id 按 manifest 路径区分），结果与并行调度顺序无关。
+    presets 给出多个预设时每个 manifest 渲染出各预设的草稿（见 api.render_presets）。
+    """
+    paths = collect_manifests(manifests) if isinstance(manifests, str) else [os.path.abspath(p) for p in manifests]
+    if reindex:
+        _reindex_roots(paths)
+
+    started = time.perf_counter()
+    results: List[Dict[str, Any]] = []
+    if paths:
+        with ProcessPoolExecutor(max_workers=workers) as pool:
+            futures = {
+                pool.submit(_render_one, p, preset_name, output_dir, profiling, seed, compact, presets): p for p in paths
+            }
+            for fut in as_completed(futures):
+                try:
+                    results.append(fut.result())
+                except Exception as e:
+                    # 子进程异常退出（如被杀死）时同样记录为失败
+                    results.append(
+                        {
+                            "manifest": futures[fut],
+                            "status": "error",
+                            "draft_folder": None,
+                            "wall_time_s": 0.0,
+                            "bytes_written": 0,
+                            "error": f"{type(e).__name__}: {e}",
+                        }
+                    )
+    results.sort(key=lambda r: r["manifest"])
+
+    failed = sum(1 for r in results if r["status"] != "ok")
+    return {
+        "total": len(results),
+        "succeeded": len(results) - failed,
+        "failed": failed,
+        "wall_time_s": round(time.perf_counter() - started, 3),
+        "bytes_written": sum(r["bytes_written"] for r in results),
+        "results": results,
+    }
+
+
+def write_summary(summary: Dict[str, Any], path: str) -> None:
+    with open(path, "w", encoding="utf-8") as f:
+        json.dump(summary, f, ensure_ascii=False, indent=2)
@@ -0,0 +1,298 @@
+import math
+import mmap
+import struct
+from operator import mul
+from typing import Any, Dict, List, NamedTuple, Optional
+
+from .audioprobe import MICROSECONDS, WavFormat, read_wav_format
+from .profiling import span
+from .statcache import StatCache, shared_cache
+
+try:
+    import numpy as np
+except ImportError:  # 未安装 numpy 时退回标准库实现（仅能量差分，且不支持 24 位 PCM）
+    np = None
+
+DEFAULT_BEAT_SYNC: Dict[str, Any] = {
+    "enabled": False,
+    # 图片切换点与节拍相距不超过该值时吸附到节拍
+    "tolerance_ms": 250,
+}
+# 分析前把采样率降到约 11 kHz（按整数步长抽取），节拍检测用不到更高的频率
+ANALYSIS_RATE = 11025
+# 帧长与帧移（降采样后的采样点数）：约 46 ms 窗口、23 ms 分辨率
+FRAME_SIZE = 512
+HOP_SIZE = 256
+# 节拍速度搜索范围与先验中心（BPM）
+MIN_BPM = 60.0
+MAX_BPM = 200.0
+PRIOR_BPM = 120.0
+# 逐拍跟踪时在预测位置前后搜索包络峰值的范围（节拍周期的比例）
+TRACK_WINDOW = 0.15
+# 起音检测：包络高于 均值 + ONSET_THRESHOLD × 标准差 的局部极大值
+ONSET_THRESHOLD = 1.0
+# 相邻起音的最小间隔（秒）
+ONSET_SPACING = 0.05
+# 细化节拍周期时使用的倍数：在 REFINE_MULTIPLE 个周期处找自相关峰值，精度提高同样倍数
+REFINE_MULTIPLE = 8
+# 缓存内容格式版本；分析算法或参数变化时递增，使旧缓存失效
+_CACHE_VERSION = 1
+# 每次 FFT 处理的帧数，限制长音频的峰值内存
+_FFT_BLOCK = 4096
+# PCM 格式码
+_FORMAT_PCM = 1
+_FORMAT_FLOAT = 3
+
+
+class BeatAnalysis(NamedTuple):
+    tempo: float
+    beats: List[int]
+    onsets: List[int]
+
+
+def _decimation(fmt: WavFormat) -> int:
+    return max(1, round(fmt.sample_rate / ANALYSIS_RATE))
+
+
+def _numpy_samples(mm: mmap.mmap, fmt: WavFormat) -> Optional[Any]:
+    """数据区的 (帧, 声道) 视图，直接引用映射内存，不复制；24 位取高 16 位。"""
+    width = fmt.bits // 8
+    frames = fmt.data_size // fmt.block_align if fmt.block_align else 0
+    if not frames or fmt.block_align < width * fmt.channels:
+        return None
+    offset = fmt.data_offset
+    if fmt.format_tag == _FORMAT_FLOAT and width in (4, 8):
+        dtype = "<f%d" % width
+    elif fmt.format_tag != _FORMAT_PCM:
+        return None
+    elif width == 3:
+        dtype, offset = "<i2", offset + 1
+    elif width in (1, 2, 4):
+        dtype = "u1" if width == 1 else "<i%d" % width
+    else:
+        return None
+    return np.ndarray(
+        (frames, fmt.channels), dtype=dtype, buffer=mm, offset=offset, strides=(fmt.block_align, width)
+    )
+
+
+def _envelope_numpy(mm: mmap.mmap, fmt: WavFormat) -> Optional[List[float]]:
+    """谱通量起音强度：抽取后的单声道信号按帧加窗做 FFT，相邻帧对数幅度谱的正向增量之和。"""
+    samples = _numpy_samples(mm, fmt)
+    if samples is None:
+        return None
+    # 逐声道累加到 float32（对整个二维步长视图求和明显更慢）
+    decimated = samples[:: _decimation(fmt)]
+    x = decimated[:, 0].astype(np.float32)
+    for channel in range(1, fmt.channels):
+        x += decimated[:, channel]
+    del samples, decimated
+    if fmt.bits == 8:
+        x -= 128.0 * fmt.channels
+    peak = float(np.abs(x).max()) if len(x) else 0.0
+    if len(x) < FRAME_SIZE or not peak:
+        return []
+    x /= peak
+    # 分帧用步长视图（不复制采样），按块做 FFT
+    frames = np.lib.stride_tricks.sliding_window_view(x, FRAME_SIZE)[::HOP_SIZE]
+    window = np.hanning(FRAME_SIZE).astype(np.float32)
+    flux = np.zeros(len(frames), dtype=np.float32)
+    previous = None
+    for lo in range(0, len(frames), _FFT_BLOCK):
+        spectrum = np.log1p(100.0 * np.abs(np.fft.rfft(frames[lo : lo + _FFT_BLOCK] * window, axis=1)))
+        if previous is not None:
+            spectrum = np.vstack((previous, spectrum))
+        diff = np.diff(spectrum, axis=0)
+        flux[lo + (previous is None) : lo + _FFT_BLOCK] = np.maximum(diff, 0).sum(axis=1)
+        previous = spectrum[-1:]
+    return flux.tolist()
+
+
+def _hop_energies(x: memoryview, unsigned: bool) -> List[float]:
+    """每 HOP_SIZE 个采样的平均能量；乘加在 map/sum 中完成，不逐采样执行 Python 代码。"""
+    energies: List[float] = []
+    for i in range(len(x) // HOP_SIZE):
+        chunk = x[i * HOP_SIZE : (i + 1) * HOP_SIZE]
+        energy = float(sum(map(mul, chunk, chunk)))
+        if unsigned:
+            # 8 位 PCM 为无符号，以 128 为零点
+            energy += 128.0 * 128.0 * HOP_SIZE - 256.0 * sum(chunk)
+        energies.append(energy / HOP_SIZE)
+    return energies
+
+
+def _envelope_stdlib(mm: mmap.mmap, fmt: WavFormat) -> Optional[List[float]]:
+    """无 numpy 时的起音强度：按帧移计算第一声道的能量（RMS²），取对数能量的正向差分。"""
+    width = fmt.bits // 8
+    if fmt.format_tag == _FORMAT_FLOAT:
+        code = {4: "f", 8: "d"}.get(width)
+    elif fmt.format_tag == _FORMAT_PCM:
+        code = {1: "B", 2: "h", 4: "i"}.get(width)
+    else:
+        code = None
+    if code is None or not fmt.block_align or fmt.block_align != width * fmt.channels:
+        return None
+    size = fmt.data_size - fmt.data_size % fmt.block_align
+    view = memoryview(mm)[fmt.data_offset : fmt.data_offset + size]
+    try:
+        energies = _hop_energies(view.cast(code)[:: fmt.channels * _decimation(fmt)], code == "B")
+    finally:
+        view.release()
+    peak = max(energies, default=0.0)
+    if not peak:
+        return []
+    levels = [math.log1p(1000.0 * e / peak) for e in energies]
+    return [0.0] + [max(b - a, 0.0) for a, b in zip(levels, levels[1:])]
+
+
+def _autocorrelation(env: List[float], lag: int) -> float:
+    return sum(map(mul, env, env[lag:])) / (len(env) - lag)
+
+
+def _peak_lag(scores: Dict[int, float], lag: int) -> float:
+    """抛物线插值到小数帧。"""
+    a, b, c = scores[lag - 1], scores[lag], scores[lag + 1]
+    denom = a - 2 * b + c
+    return lag + (max(-0.5, min(0.5, 0.5 * (a - c) / denom)) if denom < 0 else 0.0)
+
+
+def _estimate_period(env: List[float], frame_rate: float) -> Optional[float]:
+    """节拍周期（帧）：包络自相关在速度范围内的峰值（以 PRIOR_BPM 为中心的对数高斯先验加权），
+    再在其若干倍处重新找峰值，把周期精确到远小于一帧，长音频上的网格才不会逐渐漂移。
+    """
+    n = len(env)
+    lo = max(2, int(frame_rate * 60.0 / MAX_BPM))
+    hi = min(n // 2, int(math.ceil(frame_rate * 60.0 / MIN_BPM)))
+    if hi - lo < 2:
+        return None
+    scores = {lag: _autocorrelation(env, lag) for lag in range(lo - 1, hi + 2)}
+    best, best_score = None, 0.0
+    for lag in range(lo, hi + 1):
+        bpm = 60.0 * frame_rate / lag
+        weighted = scores[lag] * math.exp(-0.5 * math.log2(bpm / PRIOR_BPM) ** 2)
+        if weighted > best_score:
+            best, best_score = lag, weighted
+    if best is None:
+        return None
+    period = _peak_lag(scores, best)
+    multiple = min(REFINE_MULTIPLE, int((n // 2 - 1) / period))
+    if multiple < 2:
+        return period
+    center = round(period * multiple)
+    radius = multiple // 2 + 1
+    scores = {lag: _autocorrelation(env, lag) for lag in range(center - radius - 1, center + radius + 2)}
+    lag = max(range(center - radius, center + radius + 1), key=scores.__getitem__)
+    return _peak_lag(scores, lag) / multiple
+
+
+def _track_beats(env: List[float], period: float) -> List[int]:
+    """选出与节拍网格最吻合的相位，再逐拍在预测位置附近对齐到包络峰值（跟随轻微的速度漂移）。"""
+    n = len(env)
+
+    def alignment(offset: int) -> float:
+        return sum(env[round(offset + k * period)] for k in range(int((n - 1 - offset) / period) + 1))
+
+    phase = max(range(int(period)), key=alignment)
+    radius = max(1, int(period * TRACK_WINDOW))
+    beats: List[int] = []
+    pos = float(phase)
+    while round(pos) < n:
+        center = round(pos)
+        lo, hi = max(0, center - radius), min(n, center + radius + 1)
+        peak = max(range(lo, hi), key=env.__getitem__)
+        beats.append(peak)
+        pos = peak + period
+    return beats
+
+
+def _pick_onsets(env: List[float], radius: int) -> List[int]:
+    n = len(env)
+    if not n:
+        return []
+    mean = sum(env) / n
+    std = math.sqrt(sum((v - mean) ** 2 for v in env) / n)
+    threshold = mean + ONSET_THRESHOLD * std
+    onsets: List[int] = []
+    for i, v in enumerate(env):
+        if v > threshold and v == max(env[max(0, i - radius) : i + radius + 1]):
+            if not onsets or i - onsets[-1] > radius:
+                onsets.append(i)
+    return onsets
+
+
+def _analyze_envelope(env: List[float], frame_rate: float, latency: float = 0.0) -> BeatAnalysis:
+    """latency：包络第 0 帧对应的时刻（秒）。"""
+
+    def to_us(frame: int) -> int:
+        return round((frame / frame_rate + latency) * MICROSECONDS)
+
+    onsets = [to_us(i) for i in _pick_onsets(env, max(1, int(frame_rate * ONSET_SPACING)))]
+    if len(env) < 4 or not any(env):
+        return BeatAnalysis(0.0, [], onsets)
+    mean = sum(env) / len(env)
+    # 估计周期前做 [1/4, 1/2, 1/4] 平滑：周期不是整帧时，尖峰不会分散到相邻的两个延迟上
+    centered = [v - mean for v in env]
+    smoothed = [0.5 * b + 0.25 * (a + c) for a, b, c in zip(centered, centered[1:], centered[2:])]
+    period = _estimate_period(smoothed, frame_rate)
+    if period is None:
+        return BeatAnalysis(0.0, [], onsets)
+    beats = [to_us(i) for i in _track_beats(env, period)]
+    return BeatAnalysis(round(60.0 * frame_rate / period, 2), beats, onsets)
+
+
+def analyze_wav(path: str) -> Optional[BeatAnalysis]:
+    """内存映射 PCM/浮点 WAV，计算起音强度包络、节拍速度、节拍时刻与起音时刻（微秒）。
+
+    有 numpy 时用谱通量（步长视图分帧 + 分块 FFT），否则退回标准库的能量差分；
+    非 WAV 或不支持的采样格式返回 None。
+    """
+    try:
+        with open(path, "rb") as f:
+            head = f.read(12)
+            if head[:4] != b"RIFF" or head[8:12] != b"WAVE":
+                return None
+            fmt = read_wav_format(f)
+            if fmt is None or not fmt.data_size or not fmt.channels:
+                return None
+            mm = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+    except (OSError, ValueError, struct.error):
+        return None
+    try:
+        env = (_envelope_numpy if np is not None else _envelope_stdlib)(mm, fmt)
+    finally:
+        mm.close()
+    if env is None:
+        return None
+    rate = fmt.sample_rate / _decimation(fmt)
+    # 谱通量第 i 帧比上一帧新增的是窗口末尾的 HOP_SIZE 个采样；能量差分则对应第 i 个帧移区间的中点
+    latency = (FRAME_SIZE - HOP_SIZE if np is not None else HOP_SIZE / 2) / rate
+    return _analyze_envelope(env, rate / HOP_SIZE, latency)
+
+
+def analyze_beats(path: str, cache: Optional[StatCache] = None) -> Optional[BeatAnalysis]:
+    """带缓存的节拍分析：按 路径 + 大小 + mtime 命中时不再读取音频。"""
+    cache = cache if cache is not None else shared_cache("beat_analysis")
+    value = cache.get(path)
+    if isinstance(value, list) and len(value) == 4 and value[0] == _CACHE_VERSION:
+        return BeatAnalysis(*value[1:])
+    with span("analyze_beats") as sp:
+        result = analyze_wav(path)
+        sp.count("beats", len(result.beats) if result else 0)
+    # 无法分析（非 WAV、格式不支持）的结果不缓存：判断只需读取文件头，且安装 numpy 后可能变为可分析
+    if result is not None:
+        cache.put(path, [_CACHE_VERSION, *result])
+        cache.save()
+    return result
+
+
+def beat_sync_settings(conf: Optional[Dict[str, Any]]) -> Dict[str, Any]:
+    settings = dict(DEFAULT_BEAT_SYNC)
+    settings.update({k: v for k, v in (conf or {}).items() if v is not None})
+    return settings
+
+
+def snap_points(analysis: Optional[BeatAnalysis]) -> List[int]:
+    """用于吸附图片切换点的时刻：优先节拍网格，检测不到稳定速度时用起音时刻。"""
+    if analysis is None:
+        return []
+    return list(analysis.beats or analysis.onsets)
@@ -0,0 +1,150 @@
+import json
+import uuid
+from typing import Any, Collection, Dict, Iterable, List, Mapping, Optional, Tuple
+
+from .ids import ID_NAMESPACE
+from .model import omit_defaults
+from .profiling import span
+
+# 轨道 id -> (片段模板, 片段引用的素材所在列表, 素材模板)
+TrackKinds = Mapping[str, Tuple[str, str, str]]
+
+# 关键帧属性 -> 片段 clip 中对应的静态取值路径；恒等于该值的关键帧不产生任何效果
+_STATIC_VALUES = {
+    "KFTypePositionX": ("transform", "x"),
+    "KFTypePositionY": ("transform", "y"),
+    "KFTypeRotation": ("rotation",),
+    "KFTypeAlpha": ("alpha",),
+}
+
+
+def shared_animation_id(resource_id: str) -> str:
+    """同一种入场动画在所有片段间共享的素材 id。"""
+    return str(uuid.uuid5(ID_NAMESPACE, f"animation:{resource_id}"))
+
+
+def _encoded_size(objects: Iterable[Any]) -> int:
+    return sum(len(json.dumps(o, ensure_ascii=False).encode("utf-8")) for o in objects)
+
+
+def _static_value(clip: Any, path: tuple) -> Any:
+    node = clip
+    for key in path:
+        if not isinstance(node, dict):
+            return None
+        node = node.get(key)
+    return node
+
+
+def elide_constant_keyframes(seg: Dict[str, Any]) -> int:
+    """删除取值恒定且等于片段静态属性的关键帧组（如不移动的那一轴的 0→0），返回删除的组数。"""
+    groups = seg.get("common_keyframes") or []
+    kept = []
+    for group in groups:
+        path = _STATIC_VALUES.get(group.get("property_type"))
+        values = {tuple(kf.get("values") or ()) for kf in group.get("keyframe_list") or []}
+        if path is not None and len(values) == 1:
+            (value,) = values
+            static = _static_value(seg.get("clip"), path)
+            if len(value) == 1 and static is not None and value[0] == static:
+                continue
+        kept.append(group)
+    if len(kept) != len(groups):
+        seg["common_keyframes"] = kept
+    return len(groups) - len(kept)
+
+
+def _intern_animations(draft: Dict[str, Any], segments: List[Dict[str, Any]]) -> int:
+    """图片片段引用的入场动画按 resource_id 合并为共享素材，返回被合并掉的素材数。"""
+    materials = draft["materials"]
+    refs = {ref for seg in segments for ref in seg.get("extra_material_refs") or []}
+    if not refs:
+        return 0
+    mapping: Dict[str, str] = {}
+    shared: Dict[str, Dict[str, Any]] = {}
+    kept: List[Dict[str, Any]] = []
+    for anim in materials.get("material_animations") or []:
+        aid = anim.get("id")
+        items = anim.get("animations") or []
+        if aid not in refs or len(items) != 1:
+            kept.append(anim)
+            continue
+        resource_id = items[0].get("resource_id") or items[0].get("id") or ""
+        sid = shared_animation_id(resource_id)
+        mapping[aid] = sid
+        if aid == sid:
+            shared[sid] = anim
+            kept.append(anim)
+        elif sid not in shared:
+            item = dict(items[0], request_id="")
+            omit_defaults(item, "animation_item")
+            shared[sid] = {"animations": [item], "id": sid, "type": anim.get("type", "sticker_animation")}
+    # 已存在的共享素材留在原位，新出现的追加到末尾，重复压缩结果不变
+    present = {a.get("id") for a in kept}
+    kept.extend(a for sid, a in shared.items() if sid not in present)
+    merged = len(materials["material_animations"]) - len(kept)
+    materials["material_animations"] = kept
+    for seg in segments:
+        seg_refs = seg.get("extra_material_refs")
+        if seg_refs:
+            seg["extra_material_refs"] = [mapping.get(r, r) for r in seg_refs]
+    return merged
+
+
+def compact_draft(draft: Dict[str, Any], owned_tracks: TrackKinds, animated_tracks: Collection[str]) -> Dict[str, int]:
+    """压缩 owned_tracks 中的轨道及其引用的素材（就地修改），返回统计信息。
+
+    bytes_before / bytes_after 只统计被压缩的这部分内容（本工具的轨道、其引用的素材与入场动画）
+    各自序列化后的字节数，不是整个草稿文件的大小；后者由写回草稿的调用方给出（见 format_summary）。
+
+    - animated_tracks 中片段的入场动画按种类合并为共享素材，片段按 id 引用；
+    - 删除不产生效果的恒定关键帧；
+    - 省略取剪映默认值的可选字段（见 model.OMITTABLE_FIELDS）。
+    其余轨道与素材（用户在剪映中添加的内容）保持原样。会改动已有对象，调用方需整体写回。
+    """
+    materials = draft.get("materials") or {}
+    owned: List[tuple] = []
+    for track in draft.get("tracks") or []:
+        kinds = owned_tracks.get(track.get("id"))
+        if kinds:
+            owned.append((track, kinds))
+
+    def touched() -> List[Any]:
+        objs: List[Any] = [materials.get("material_animations") or []]
+        for track, (_, list_key, _) in owned:
+            ids = {seg.get("material_id") for seg in track.get("segments") or []}
+            objs.append(track.get("segments") or [])
+            objs.append([m for m in materials.get(list_key) or [] if m.get("id") in ids])
+        return objs
+
+    stats = {"animations_merged": 0, "keyframes_elided": 0, "fields_omitted": 0}
+    with span("compact") as sp:
+        bytes_before = _encoded_size(touched())
+        for track, (seg_template, list_key, material_template) in owned:
+            segments = track.get("segments") or []
+            if track.get("id") in animated_tracks:
+                stats["animations_merged"] += _intern_animations(draft, segments)
+                for seg in segments:
+                    stats["keyframes_elided"] += elide_constant_keyframes(seg)
+            ids = set()
+            for seg in segments:
+                stats["fields_omitted"] += omit_defaults(seg, seg_template)
+                ids.add(seg.get("material_id"))
+            for material in materials.get(list_key) or []:
+                if material.get("id") in ids:
+                    stats["fields_omitted"] += omit_defaults(material, material_template)
+        stats["bytes_before"] = bytes_before
+        stats["bytes_after"] = _encoded_size(touched())
+        for key, value in stats.items():
+            sp.count(key, value)
+    return stats
+
+
+def format_summary(stats: Mapping[str, int], draft_bytes: Optional[int] = None) -> str:
+    """命令行输出的压缩摘要；draft_bytes 为写回后草稿文件的实际大小。"""
+    before, after = stats.get("bytes_before", 0), stats.get("bytes_after", 0)
+    ratio = (before - after) / before if before else 0.0
+    summary = f"压缩生成内容: {before} -> {after} 字节（减少 {ratio:.1%}）"
+    if draft_bytes is not None:
+        summary += f"，草稿文件 {draft_bytes} 字节"
+    return summary
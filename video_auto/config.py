@@ -32,18 +32,49 @@ class Manifest:
             "bgm": [bgm_path] if bgm_path else [],
         }
 
+    def get_bgm(self) -> Optional[Dict[str, Any]]:
+        """背景音乐配置：路径取 project.bgm.path 或 assets.bgm，音量、ducking 与 beat_sync 取 project.bgm。"""
+        project = self.data.get("project", {}) or {}
+        conf = project.get("bgm", {}) or {}
+        path = conf.get("path") or (self.data.get("assets", {}) or {}).get("bgm")
+        if not isinstance(path, str) or not path:
+            return None
+        volume = conf.get("volume")
+        return {
+            "path": self.resolve_path(path),
+            "volume": float(volume) if volume is not None else 0.3,
+            "ducking": conf.get("ducking", {}) or {},
+            "beat_sync": conf.get("beat_sync", {}) or {},
+        }
+
+    def get_subtitles(self) -> Optional[Dict[str, Any]]:
+        """字幕文件配置：路径取 project.subtitles.path 或 assets.subtitles，text_track 取 project.subtitles。"""
+        project = self.data.get("project", {}) or {}
+        conf = project.get("subtitles", {}) or {}
+        path = conf.get("path") or (self.data.get("assets", {}) or {}).get("subtitles")
+        if not isinstance(path, str) or not path:
+            return None
+        return {"path": self.resolve_path(path), "text_track": bool(conf.get("text_track", False))}
+
     def get_draft_settings(self) -> Dict[str, Any]:
         ds = self.data.get("draft_settings", {}) or {}
         draft_path = self.resolve_path(ds.get("draft_path")) if ds.get("draft_path") else None
         backup_conf = ds.get("backup", {}) or {}
         backup_enable = bool(backup_conf.get("enable", False))
         backup_location = self.resolve_path(backup_conf.get("location")) if backup_conf.get("location") else None
+        backup_mode = str(backup_conf.get("mode") or "snapshot")
+        keep = backup_conf.get("keep")
+        keep_days = backup_conf.get("keep_days")
         return {
             "draft_path": draft_path,
             "backup": {
                 "enable": backup_enable,
                 "location": backup_location,
+                "mode": backup_mode,
+                "keep": int(keep) if keep is not None else None,
+                "keep_days": int(keep_days) if keep_days is not None else None,
             },
+            "compact": bool(ds.get("compact", False)),
         }
 
 
@@ -65,8 +96,8 @@ def validate_manifest_basic(data: Dict[str, Any]) -> List[str]:
         errors.append("缺少 assets 对象")
     else:
         assets = data["assets"]
-        if "images" not in assets and "audio" not in assets and "bgm" not in assets:
-            errors.append("assets 至少包含 images/audio/bgm 之一")
+        if not any(key in assets for key in ("images", "audio", "bgm", "subtitles")):
+            errors.append("assets 至少包含 images/audio/bgm/subtitles 之一")
         for key in ("images", "audio", "fonts"):
             if key in assets and not isinstance(assets[key], list):
                 errors.append(f"assets.{key} 必须是数组")
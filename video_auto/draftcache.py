@@ -0,0 +1,193 @@
+import gc
+import hashlib
+import json
+import marshal
+import os
+import struct
+import sys
+from contextlib import contextmanager
+from typing import Any, Dict, Iterator, Optional, Tuple
+
+from . import paths
+from .draftio import atomic_write
+from .profiling import span
+
+# 缓存文件头：魔数 + 源文件 (大小, mtime_ns, inode) + 解释器版本（marshal 格式随版本变化）
+_MAGIC = b"VADC1"
+_HEADER = struct.Struct("<5sQqQBB")
+_PY_VERSION = sys.version_info[:2]
+
+DEFAULT_MAX_MB = 1024
+
+Identity = Tuple[int, int, int]
+
+
+def draft_identity(path: str) -> Optional[Identity]:
+    """(大小, mtime_ns, inode)；原子替换写回会换 inode，即使大小与 mtime 恰好相同也能发现。"""
+    try:
+        st = os.stat(path)
+    except OSError:
+        return None
+    return st.st_size, st.st_mtime_ns, st.st_ino
+
+
+def _max_bytes() -> int:
+    # VIDEO_AUTO_DRAFT_CACHE_MB=0 可关闭缓存
+    value = os.environ.get("VIDEO_AUTO_DRAFT_CACHE_MB")
+    try:
+        return int(value) << 20 if value is not None else DEFAULT_MAX_MB << 20
+    except ValueError:
+        return DEFAULT_MAX_MB << 20
+
+
+@contextmanager
+def _gc_paused() -> Iterator[None]:
+    # 解析大草稿会创建数百万个容器对象，期间的分代 GC 只是白白遍历，暂停后解析快约一倍
+    enabled = gc.isenabled()
+    gc.disable()
+    try:
+        yield
+    finally:
+        if enabled:
+            gc.enable()
+
+
+class ParsedDraftCache:
+    """已解析草稿的磁盘缓存：以 marshal 二进制保存解析结果，按源文件身份校验。
+
+    条目文件名由草稿路径推导，文件头记录源文件的 (大小, mtime_ns, inode)；不一致、
+    解释器版本不同或文件损坏时一律回退为 JSON 解析。总大小超过上限时按最近使用时间
+    （命中时刷新条目 mtime）淘汰最旧的条目。
+    """
+
+    def __init__(self, cache_dir: Optional[str] = None, max_bytes: Optional[int] = None) -> None:
+        self.folder = os.path.join(cache_dir or paths.get_cache_dir(), "parsed_drafts")
+        self.max_bytes = _max_bytes() if max_bytes is None else max_bytes
+
+    def _entry_path(self, path: str) -> str:
+        key = hashlib.sha1(os.path.normcase(os.path.abspath(path)).encode("utf-8")).hexdigest()
+        return os.path.join(self.folder, f"{key}.bin")
+
+    def _header_matches(self, header: bytes, ident: Identity) -> bool:
+        try:
+            magic, size, mtime_ns, ino, major, minor = _HEADER.unpack_from(header)
+        except struct.error:
+            return False
+        return magic == _MAGIC and (size, mtime_ns, ino) == ident and (major, minor) == _PY_VERSION
+
+    def contains(self, path: str, ident: Optional[Identity] = None) -> bool:
+        """只读文件头判断是否已有对应当前文件的条目。"""
+        ident = ident or draft_identity(path)
+        if ident is None:
+            return False
+        try:
+            with open(self._entry_path(path), "rb") as f:
+                return self._header_matches(f.read(_HEADER.size), ident)
+        except OSError:
+            return False
+
+    def get(self, path: str, ident: Optional[Identity] = None) -> Optional[Dict[str, Any]]:
+        """命中时返回新解析出的草稿（调用方可随意修改），否则返回 None。"""
+        ident = ident or draft_identity(path)
+        if ident is None or self.max_bytes <= 0:
+            return None
+        entry = self._entry_path(path)
+        try:
+            with open(entry, "rb") as f:
+                data = f.read()
+        except OSError:
+            return None
+        if not self._header_matches(data, ident):
+            return None
+        try:
+            with _gc_paused():
+                draft = marshal.loads(memoryview(data)[_HEADER.size :])
+        except (EOFError, ValueError, TypeError):
+            return None
+        try:
+            os.utime(entry)
+        except OSError:
+            pass
+        return draft if isinstance(draft, dict) else None
+
+    def put(self, path: str, draft: Dict[str, Any], ident: Optional[Identity] = None) -> None:
+        """登记与磁盘文件内容一致的草稿（刚读入或刚写回的）。"""
+        ident = ident or draft_identity(path)
+        if ident is None or self.max_bytes <= 0:
+            return
+        try:
+            payload = marshal.dumps(draft)
+        except ValueError:
+            # 含非 JSON 类型的对象无法 marshal，不缓存
+            return
+        header = _HEADER.pack(_MAGIC, ident[0], ident[1], ident[2], *_PY_VERSION)
+        try:
+            os.makedirs(self.folder, exist_ok=True)
+            atomic_write(self._entry_path(path), [header, payload])
+        except OSError:
+            return
+        self.evict()
+
+    def discard(self, path: str) -> None:
+        try:
+            os.remove(self._entry_path(path))
+        except OSError:
+            pass
+
+    def evict(self) -> int:
+        """总大小超过上限时删除最久未使用的条目，返回删除的条目数。"""
+        entries = []
+        try:
+            with os.scandir(self.folder) as it:
+                for e in it:
+                    if e.name.endswith(".bin"):
+                        st = e.stat()
+                        entries.append((st.st_mtime_ns, st.st_size, e.path))
+        except OSError:
+            return 0
+        total = sum(size for _, size, _ in entries)
+        removed = 0
+        for _, size, entry in sorted(entries):
+            if total <= self.max_bytes:
+                break
+            try:
+                os.remove(entry)
+            except OSError:
+                continue
+            total -= size
+            removed += 1
+        return removed
+
+
+def load_draft(path: str, populate: bool = True, cache: Optional[ParsedDraftCache] = None) -> Dict[str, Any]:
+    """读取草稿：命中解析缓存时直接载入二进制形式，否则解析 JSON（populate=True 时写入缓存）。
+
+    每次返回独立的新对象。所有读取草稿的入口（渲染、监听、服务、分片、校验）都经由这里。
+    """
+    cache = cache or ParsedDraftCache()
+    with span("parsed_cache") as sp:
+        ident = draft_identity(path)
+        draft = cache.get(path, ident)
+        if draft is not None:
+            sp.count("hits")
+            return draft
+        sp.count("misses")
+        with open(path, "rb") as f:
+            data = f.read()
+        with _gc_paused():
+            draft = json.loads(data)
+        # 读取期间文件被替换时身份已变，不缓存这份可能过期的结果
+        if populate and ident is not None and draft_identity(path) == ident:
+            cache.put(path, draft, ident)
+    return draft
+
+
+def remember(path: str, draft: Dict[str, Any], cache: Optional[ParsedDraftCache] = None) -> None:
+    """写回草稿后登记内存中的结果，随后的校验/统计读取可直接命中。
+
+    draft 必须与文件内容一致；内容未变化（写回被跳过）且已有条目时不重复写缓存。
+    """
+    cache = cache or ParsedDraftCache()
+    ident = draft_identity(path)
+    if ident is not None and not cache.contains(path, ident):
+        cache.put(path, draft, ident)
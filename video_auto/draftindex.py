@@ -0,0 +1,276 @@
+from bisect import bisect_left, bisect_right
+from heapq import merge
+from itertools import accumulate
+from operator import itemgetter
+from typing import Any, Collection, Dict, Iterable, Iterator, List, Optional, Set, Tuple, Union
+
+Segment = Dict[str, Any]
+Track = Dict[str, Any]
+
+
+def segment_bounds(seg: Segment) -> Tuple[int, int]:
+    """片段在时间线上的 (开始, 结束)；优先 target_timerange，起点缺失时兜底 source_timerange.start。"""
+    tt = seg.get("target_timerange")
+    if not isinstance(tt, dict):
+        tt = {}
+    if "start" in tt:
+        start = int(tt.get("start") or 0)
+    else:
+        st = seg.get("source_timerange")
+        start = int(st.get("start") or 0) if isinstance(st, dict) else 0
+    return start, start + int(tt.get("duration") or 0)
+
+
+def track_type(track: Track) -> str:
+    return str(track.get("type") or track.get("track_type") or "").lower()
+
+
+class TrackIndex:
+    """单个轨道的有序区间索引：片段按开始时间排序，另存结束时间的前缀最大值。
+
+    查询某时刻 / 某区间内的片段为 O(log n + k)，轨道终点为 O(1)。
+    每次查询前对照 segments 列表（对象与长度）：只追加了片段时增量插入，列表被替换或
+    缩短时重建；直接修改已有片段的时间需调用 refresh()。
+    """
+
+    __slots__ = ("track", "_source", "_count", "starts", "ends", "segments", "max_ends")
+
+    def __init__(self, track: Track) -> None:
+        self.track = track
+        self.refresh()
+
+    def refresh(self) -> None:
+        self._source: Optional[List[Segment]] = None
+        self._count = 0
+        self.starts: List[int] = []
+        self.ends: List[int] = []
+        self.segments: List[Segment] = []
+        self.max_ends: List[int] = []
+        self._sync()
+
+    def _sync(self) -> None:
+        segs = self.track.get("segments")
+        if not isinstance(segs, list):
+            segs = []
+        if segs is self._source and len(segs) == self._count:
+            return
+        if segs is not self._source or len(segs) < self._count:
+            self._source, self._count = segs, len(segs)
+            self.segments = [s for s in segs if isinstance(s, dict)]
+            starts: List[int] = []
+            ends: List[int] = []
+            for seg in self.segments:
+                tt = seg.get("target_timerange")
+                # 常见结构就地展开，省去逐片段的函数调用
+                if type(tt) is dict and "start" in tt:
+                    start = int(tt["start"] or 0)
+                    end = start + int(tt.get("duration") or 0)
+                else:
+                    start, end = segment_bounds(seg)
+                starts.append(start)
+                ends.append(end)
+            # 生成的轨道通常已按时间排列，只有乱序时才重排（稳定排序：开始时间相同的按原有先后）
+            if starts != sorted(starts):
+                order = sorted(range(len(starts)), key=starts.__getitem__)
+                self.segments = [self.segments[i] for i in order]
+                starts = [starts[i] for i in order]
+                ends = [ends[i] for i in order]
+            self.starts, self.ends = starts, ends
+            self.max_ends = list(accumulate(self.ends, max))
+            return
+        for seg in segs[self._count :]:
+            if isinstance(seg, dict):
+                self._insert(seg)
+        self._count = len(segs)
+
+    def _insert(self, seg: Segment) -> None:
+        start, end = segment_bounds(seg)
+        pos = bisect_right(self.starts, start)
+        self.starts.insert(pos, start)
+        self.ends.insert(pos, end)
+        self.segments.insert(pos, seg)
+        if pos == len(self.max_ends):
+            # 常见情况：按时间顺序追加
+            self.max_ends.append(max(end, self.max_ends[-1]) if self.max_ends else end)
+            return
+        self.max_ends.insert(pos, 0)
+        running = self.max_ends[pos - 1] if pos else end
+        for i in range(pos, len(self.max_ends)):
+            running = max(running, self.ends[i])
+            self.max_ends[i] = running
+
+    def __len__(self) -> int:
+        self._sync()
+        return len(self.segments)
+
+    def ordered(self) -> List[Segment]:
+        """按开始时间排序的片段（开始时间相同的保持原有先后）。"""
+        self._sync()
+        return list(self.segments)
+
+    def spans(self) -> List[Tuple[int, int, Segment]]:
+        """按开始时间排序的 (开始, 结束, 片段)。"""
+        self._sync()
+        return list(zip(self.starts, self.ends, self.segments))
+
+    def end(self) -> int:
+        """轨道终点：所有片段结束时间的最大值，空轨道为 0。"""
+        self._sync()
+        return self.max_ends[-1] if self.max_ends else 0
+
+    def overlapping(self, start: int, end: int) -> List[Segment]:
+        """与 [start, end) 相交的片段，按开始时间排序。"""
+        self._sync()
+        hi = bisect_left(self.starts, end)
+        # max_ends 单调不减：之前的片段都在 start 之前结束
+        lo = bisect_right(self.max_ends, start, 0, hi)
+        return [self.segments[i] for i in range(lo, hi) if self.ends[i] > start]
+
+    def at(self, t: int) -> List[Segment]:
+        """时刻 t 正在播放的片段（start <= t < end）。"""
+        return self.overlapping(t, t + 1)
+
+
+class DraftIndex:
+    """一次遍历建立的草稿索引：素材 id/路径映射、按类型分组的轨道与各轨道的区间索引。
+
+    与 TrackIndex 相同，查询前对照 tracks 与各素材数组（对象与长度）自动跟上追加；
+    数组被整体替换时只重建受影响的部分。
+    """
+
+    def __init__(self, draft: Dict[str, Any]) -> None:
+        self.draft = draft
+        self._tracks_source: Optional[List[Track]] = None
+        self._tracks_count = 0
+        self._by_id: Dict[Any, Track] = {}
+        self._by_type: Dict[str, List[Track]] = {}
+        self._timelines: Dict[int, TrackIndex] = {}
+        # 素材数组名 -> (数组对象, 已索引长度, id 映射, path 映射)
+        self._materials: Dict[str, Tuple[List[Any], int, Dict[Any, Any], Dict[str, Any]]] = {}
+        self._sync_tracks()
+        self._sync_materials()
+
+    # 轨道
+    def _sync_tracks(self) -> None:
+        tracks = self.draft.get("tracks")
+        if not isinstance(tracks, list):
+            tracks = []
+        if tracks is self._tracks_source and len(tracks) == self._tracks_count:
+            return
+        if tracks is not self._tracks_source or len(tracks) < self._tracks_count:
+            self._tracks_source, self._tracks_count = tracks, 0
+            self._by_id, self._by_type = {}, {}
+            live = {id(t) for t in tracks}
+            self._timelines = {k: v for k, v in self._timelines.items() if k in live}
+        for track in tracks[self._tracks_count :]:
+            if isinstance(track, dict):
+                self._by_id.setdefault(track.get("id"), track)
+                self._by_type.setdefault(track_type(track), []).append(track)
+        self._tracks_count = len(tracks)
+
+    def track(self, track_id: Any) -> Optional[Track]:
+        self._sync_tracks()
+        return self._by_id.get(track_id)
+
+    def tracks_of_type(self, *types: str) -> List[Track]:
+        """指定类型（不区分大小写）的轨道，保持草稿中的顺序。"""
+        self._sync_tracks()
+        if len(types) == 1:
+            return list(self._by_type.get(types[0].lower(), []))
+        wanted = {t.lower() for t in types}
+        return [t for t in self._tracks_source or [] if isinstance(t, dict) and track_type(t) in wanted]
+
+    def timeline(self, track: Union[Track, Any]) -> Optional[TrackIndex]:
+        """轨道（对象或 id）的区间索引，首次查询时建立。"""
+        if not isinstance(track, dict):
+            track = self.track(track)
+            if track is None:
+                return None
+        index = self._timelines.get(id(track))
+        if index is None or index.track is not track:
+            index = self._timelines[id(track)] = TrackIndex(track)
+        return index
+
+    def segments_by_start(self, tracks: Iterable[Track]) -> Iterator[Segment]:
+        """多个轨道的片段按开始时间归并（各轨道已有序，无需整体排序）。"""
+        # 开始时间相同时 merge 先取排在前面的轨道，与整体稳定排序的结果一致
+        timelines = [tl for tl in (self.timeline(t) for t in tracks) if tl is not None and len(tl)]
+        if len(timelines) == 1:
+            yield from timelines[0].ordered()
+            return
+        for _, _, seg in merge(*(tl.spans() for tl in timelines), key=itemgetter(0)):
+            yield seg
+
+    def end_time(self, exclude: Collection[Any] = ()) -> int:
+        """所有轨道（exclude 中的轨道 id 除外）的最晚结束时间。"""
+        self._sync_tracks()
+        return max(
+            (
+                self.timeline(t).end()
+                for t in self._tracks_source or []
+                if isinstance(t, dict) and t.get("id") not in exclude
+            ),
+            default=0,
+        )
+
+    # 素材
+    def _sync_materials(self, kind: Optional[str] = None) -> None:
+        materials = self.draft.get("materials")
+        if not isinstance(materials, dict):
+            materials = {}
+        if kind is None:
+            for stale in [k for k in self._materials if k not in materials]:
+                del self._materials[stale]
+            kinds: Iterable[str] = list(materials)
+        else:
+            kinds = (kind,)
+        for name in kinds:
+            items = materials.get(name)
+            if not isinstance(items, list):
+                self._materials.pop(name, None)
+                continue
+            entry = self._materials.get(name)
+            if entry is not None and entry[0] is items and entry[1] == len(items):
+                continue
+            if entry is None or entry[0] is not items or entry[1] > len(items):
+                by_id: Dict[Any, Any] = {}
+                by_path: Dict[str, Any] = {}
+                start = 0
+            else:
+                _, start, by_id, by_path = entry
+            for m in items[start:]:
+                if isinstance(m, dict):
+                    by_id.setdefault(m.get("id"), m)
+                    if m.get("path"):
+                        by_path.setdefault(m["path"], m)
+            self._materials[name] = (items, len(items), by_id, by_path)
+
+    def material(self, material_id: Any, kind: Optional[str] = None) -> Optional[Dict[str, Any]]:
+        """按 id 查找素材；给出 kind（如 "videos"）时只查（并只同步）该数组。"""
+        self._sync_materials(kind)
+        if kind is not None:
+            entry = self._materials.get(kind)
+            return entry[2].get(material_id) if entry else None
+        for _, _, by_id, _ in self._materials.values():
+            found = by_id.get(material_id)
+            if found is not None:
+                return found
+        return None
+
+    def material_by_path(self, path: str, kind: Optional[str] = None) -> Optional[Dict[str, Any]]:
+        self._sync_materials(kind)
+        entries = [self._materials.get(kind)] if kind is not None else list(self._materials.values())
+        for entry in entries:
+            if entry:
+                found = entry[3].get(path)
+                if found is not None:
+                    return found
+        return None
+
+    def material_ids(self) -> Set[Any]:
+        """所有素材数组（视频、音频、文本、动画、特效……）的 id 集合。"""
+        self._sync_materials()
+        ids: Set[Any] = set()
+        for _, _, by_id, _ in self._materials.values():
+            ids.update(k for k in by_id if k)
+        return ids
@@ -0,0 +1,287 @@
+import json
+import mmap
+import os
+import re
+import shutil
+import tempfile
+from typing import Any, Dict, Iterable, List, Optional, Tuple, Union
+
+# 本工具只会向这些数组追加元素
+APPEND_PATHS: Tuple[Tuple[str, ...], ...] = (
+    ("tracks",),
+    ("materials", "videos"),
+    ("materials", "audios"),
+    ("materials", "texts"),
+    ("materials", "material_animations"),
+)
+
+META_INFO_NAME = "draft_meta_info.json"
+
+_WS = b" \t\r\n"
+_MAX_PROBE_WINDOW = 16 * 1024 * 1024
+
+
+def _read_umask() -> int:
+    mask = os.umask(0)
+    os.umask(mask)
+    return mask
+
+
+# 导入时（尚无其他线程）读取一次：os.umask 只能先设置再恢复，运行中读取会与其他线程竞争
+_UMASK = _read_umask()
+
+
+def _get_path(draft: Dict[str, Any], path: Tuple[str, ...]) -> Optional[List[Any]]:
+    node: Any = draft
+    for key in path:
+        if not isinstance(node, dict) or key not in node:
+            return None
+        node = node[key]
+    return node if isinstance(node, list) else None
+
+
+def _file_stat(path: str) -> Tuple[int, int]:
+    st = os.stat(path)
+    return st.st_size, st.st_mtime_ns
+
+
+def _write_temp(path: str, chunks: Iterable[Union[bytes, memoryview]]) -> Tuple[str, int]:
+    folder = os.path.dirname(os.path.abspath(path))
+    fd, tmp = tempfile.mkstemp(prefix=".draft_", suffix=".tmp", dir=folder)
+    written = 0
+    try:
+        with os.fdopen(fd, "wb") as f:
+            for chunk in chunks:
+                f.write(chunk)
+                written += len(chunk)
+            f.flush()
+            os.fsync(f.fileno())
+        # mkstemp 以 0600 创建：沿用原文件的权限，新文件与 open() 创建时一样按 umask 取权限，
+        # 避免保存后草稿的访问权限被收紧
+        try:
+            shutil.copymode(path, tmp)
+        except FileNotFoundError:
+            os.chmod(tmp, 0o666 & ~_UMASK)
+    except BaseException:
+        os.remove(tmp)
+        raise
+    return tmp, written
+
+
+def atomic_write(path: str, chunks: Iterable[Union[bytes, memoryview]]) -> int:
+    """先写入同目录临时文件再原子替换（保留原文件权限），崩溃时不会留下写了一半的草稿。返回写入字节数。"""
+    tmp, written = _write_temp(path, chunks)
+    os.replace(tmp, path)
+    return written
+
+
+def load_draft(path: str) -> Dict[str, Any]:
+    with open(path, "r", encoding="utf-8") as f:
+        return json.load(f)
+
+
+def _same_content(path: str, data: bytes) -> bool:
+    """已有文件与 data 逐字节相同（先比大小，大小一致才读取比较）。"""
+    try:
+        if os.path.getsize(path) != len(data):
+            return False
+        with open(path, "rb") as f:
+            return f.read() == data
+    except OSError:
+        return False
+
+
+def save_draft(path: str, draft: Dict[str, Any]) -> int:
+    """整体序列化并原子写回，返回写入字节数。
+
+    使用 json.dumps（C 编码器）而非 json.dump（逐块的纯 Python 编码器），大草稿快数倍。
+    序列化结果与现有文件完全相同时不重写（保留 mtime，返回 0）。
+    """
+    data = json.dumps(draft, ensure_ascii=False).encode("utf-8")
+    if _same_content(path, data):
+        return 0
+    return atomic_write(path, [data])
+
+
+def prepare_draft_folder(source_folder: str, folder: str, draft_id: str, skip: Iterable[str] = ()) -> None:
+    """由源草稿派生新的草稿文件夹：复制顶层文件（封面、meta 等，已存在的不覆盖），并改写 meta 中的 id/名称/路径。
+
+    draft_content.json 与 skip 中的文件不复制，由调用方另行写出。
+    """
+    skipped = {"draft_content.json", *skip}
+    os.makedirs(folder, exist_ok=True)
+    with os.scandir(source_folder) as it:
+        for entry in it:
+            if entry.is_file() and entry.name not in skipped:
+                target = os.path.join(folder, entry.name)
+                if not os.path.exists(target):
+                    shutil.copy2(entry.path, target)
+    meta_path = os.path.join(folder, META_INFO_NAME)
+    if os.path.isfile(meta_path):
+        meta = load_draft(meta_path)
+        meta.update(draft_id=draft_id, draft_name=os.path.basename(folder), draft_fold_path=folder.replace("\\", "/"))
+        save_draft(meta_path, meta)
+
+
+class AppendMark:
+    """读取草稿后记录的基线：文件状态、顶层键顺序与可追加数组的原长度。"""
+
+    def __init__(self, path: str, draft: Dict[str, Any]) -> None:
+        self.path = path
+        self.stat = _file_stat(path)
+        self.keys = list(draft.keys())
+        self.lengths: Dict[Tuple[str, ...], Optional[int]] = {}
+        self.firsts: Dict[Tuple[str, ...], Any] = {}
+        for p in APPEND_PATHS:
+            arr = _get_path(draft, p)
+            self.lengths[p] = None if arr is None else len(arr)
+            if arr:
+                self.firsts[p] = arr[0]
+
+
+def _rskip_ws(mm: mmap.mmap, end: int) -> int:
+    while end > 0 and mm[end - 1] in _WS:
+        end -= 1
+    return end
+
+
+def _find_tracks_end(mm: mmap.mmap, draft: Dict[str, Any], mark: AppendMark) -> Optional[int]:
+    """从文件末尾反向定位顶层 tracks 数组的右方括号。
+
+    tracks 之后的顶层键（通常只有 update_time/version 等小字段）用 rfind 定位，
+    再把尾部解析回来与内存中的值比对，确认命中的是顶层键而非字符串内容。
+    """
+    end = _rskip_ws(mm, len(mm))
+    if end == 0 or mm[end - 1] != ord("}"):
+        return None
+    end -= 1
+
+    trailing_keys = mark.keys[mark.keys.index("tracks") + 1:]
+    if trailing_keys:
+        expected = {k: draft[k] for k in trailing_keys}
+        needle = json.dumps(trailing_keys[0], ensure_ascii=False).encode("utf-8")
+        q = mm.rfind(needle, 0, end)
+        while q != -1:
+            try:
+                matched = json.loads(b"{" + mm[q:end] + b"}") == expected
+            except ValueError:
+                matched = False
+            if matched:
+                break
+            q = mm.rfind(needle, 0, q)
+        if q == -1:
+            return None
+        end = _rskip_ws(mm, q)
+        if end == 0 or mm[end - 1] != ord(","):
+            return None
+        end -= 1
+
+    end = _rskip_ws(mm, end)
+    if end == 0 or mm[end - 1] != ord("]"):
+        return None
+    return end - 1
+
+
+def _decode_first_element(mm: mmap.mmap, pos: int) -> Any:
+    decoder = json.JSONDecoder()
+    window = 64 * 1024
+    while True:
+        text = mm[pos:pos + window].decode("utf-8", errors="ignore").lstrip()
+        try:
+            return decoder.raw_decode(text)[0]
+        except ValueError:
+            if pos + window >= len(mm) or window >= _MAX_PROBE_WINDOW:
+                raise
+            window *= 2
+
+
+def _find_array_start(mm: mmap.mmap, key: str, first: Any, empty: bool) -> Optional[int]:
+    """定位 "key": [ 的左方括号之后的位置；以数组首元素（或空数组）校验，要求唯一命中。"""
+    pattern = re.compile(b'"' + re.escape(key.encode("utf-8")) + rb'"\s*:\s*\[')
+    hits: List[int] = []
+    for m in pattern.finditer(mm):
+        pos = m.end()
+        if empty:
+            ok = re.match(rb"\s*\]", mm[pos:pos + 4096]) is not None
+        else:
+            try:
+                ok = _decode_first_element(mm, pos) == first
+            except ValueError:
+                ok = False
+        if ok:
+            hits.append(pos)
+    return hits[0] if len(hits) == 1 else None
+
+
+def _splice_append(path: str, draft: Dict[str, Any], mark: AppendMark) -> Optional[int]:
+    """能以拼接方式写回时返回写入字节数（无新增内容时为 0），否则返回 None。"""
+    if "tracks" not in mark.keys or mark.lengths[("tracks",)] is None:
+        return None
+    if _file_stat(path) != mark.stat:
+        return None
+
+    fragments: Dict[Tuple[str, ...], bytes] = {}
+    for p in APPEND_PATHS:
+        arr = _get_path(draft, p)
+        old_len = mark.lengths[p]
+        if old_len is None:
+            # 原文件中没有该数组：仍为空则无需写入，否则需要整体写回
+            if arr:
+                return None
+            continue
+        if arr is None or len(arr) < old_len:
+            return None
+        if len(arr) > old_len:
+            # 分隔符与 json.dumps 默认一致：本工具写出的草稿经拼接后与整体写回逐字节相同
+            fragments[p] = ", ".join(json.dumps(x, ensure_ascii=False) for x in arr[old_len:]).encode("utf-8")
+    if not fragments:
+        return 0
+
+    with open(path, "rb") as f, mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+        inserts: List[Tuple[int, bytes]] = []
+        for p, frag in fragments.items():
+            old_len = mark.lengths[p]
+            if p == ("tracks",):
+                # 轨道顺序决定叠放层级，必须追加在末尾
+                pos = _find_tracks_end(mm, draft, mark)
+                piece = (b", " if old_len else b"") + frag
+            else:
+                # 素材通过 id 引用、与顺序无关，插入到数组开头即可，无需扫描整个数组
+                pos = _find_array_start(mm, p[-1], mark.firsts.get(p), empty=not old_len)
+                piece = frag + (b", " if old_len else b"")
+            if pos is None:
+                return None
+            inserts.append((pos, piece))
+        inserts.sort(key=lambda x: x[0])
+
+        def pieces():
+            with memoryview(mm) as view:
+                cursor = 0
+                for pos, piece in inserts:
+                    yield view[cursor:pos]
+                    yield piece
+                    cursor = pos
+                yield view[cursor:]
+
+        tmp, written = _write_temp(path, pieces())
+    # Windows 下需先关闭映射再替换
+    os.replace(tmp, path)
+    # 素材插在了数组开头：同步调整内存中的顺序，常驻的草稿再次整体写回时与文件逐字节一致
+    for p in fragments:
+        if p != ("tracks",):
+            arr = _get_path(draft, p)
+            old_len = mark.lengths[p]
+            arr[:] = arr[old_len:] + arr[:old_len]
+    return written
+
+
+def write_draft(path: str, draft: Dict[str, Any], mark: Optional[AppendMark] = None) -> int:
+    """写回草稿：若提供 mark 且本次只有追加，则把新片段拼接进原文件；否则整体原子写回。
+
+    返回写入字节数；内容未变化、文件未被重写时为 0。
+    """
+    if mark is not None:
+        written = _splice_append(path, draft, mark)
+        if written is not None:
+            return written
+    return save_draft(path, draft)
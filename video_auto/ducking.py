@@ -0,0 +1,120 @@
+import math
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+# manifest 中 project.bgm.ducking 的默认值（与 docs/manifest.schema.json 一致）
+DEFAULT_DUCKING: Dict[str, Any] = {
+    "enabled": True,
+    "reduce_db": 12,
+    "attack_ms": 200,
+    "release_ms": 300,
+    "prepad_ms": 150,
+    "postpad_ms": 250,
+    # 增益变化小于该值（dB）的关键帧会被省略
+    "tolerance_db": 0.5,
+}
+_MIN_GAIN = 1e-6
+
+
+def merge_intervals(
+    intervals: Iterable[Tuple[int, int]], prepad: int = 0, postpad: int = 0, gap: int = 0
+) -> List[Tuple[int, int]]:
+    """对区间做前后补白，并在一次有序扫描中合并重叠或间隔不超过 gap 的区间。"""
+    padded = sorted((max(0, s - prepad), e + postpad) for s, e in intervals if e > s)
+    merged: List[Tuple[int, int]] = []
+    for start, end in padded:
+        if merged and start - merged[-1][1] <= gap:
+            if end > merged[-1][1]:
+                merged[-1] = (merged[-1][0], end)
+        else:
+            merged.append((start, end))
+    return merged
+
+
+def _db(gain: float) -> float:
+    return 20 * math.log10(max(gain, _MIN_GAIN))
+
+
+def simplify(points: List[Tuple[int, float]], tolerance_db: float) -> List[Tuple[int, float]]:
+    """省略可由相邻保留点线性插值得到（误差小于 tolerance_db）的中间关键帧。"""
+    if len(points) < 2:
+        return points
+    kept = [points[0]]
+    for i in range(1, len(points) - 1):
+        t0, g0 = kept[-1]
+        t, g = points[i]
+        t1, g1 = points[i + 1]
+        expected = g0 if t1 == t0 else g0 + (g1 - g0) * (t - t0) / (t1 - t0)
+        if abs(_db(g) - _db(expected)) >= tolerance_db:
+            kept.append(points[i])
+    kept.append(points[-1])
+    if len(kept) == 2 and abs(_db(kept[0][1]) - _db(kept[1][1])) < tolerance_db:
+        return kept[:1]
+    return kept
+
+
+def build_envelope(
+    intervals: Iterable[Tuple[int, int]],
+    total: int,
+    reduce_db: float = DEFAULT_DUCKING["reduce_db"],
+    attack: int = DEFAULT_DUCKING["attack_ms"] * 1000,
+    release: int = DEFAULT_DUCKING["release_ms"] * 1000,
+    prepad: int = DEFAULT_DUCKING["prepad_ms"] * 1000,
+    postpad: int = DEFAULT_DUCKING["postpad_ms"] * 1000,
+    tolerance_db: float = DEFAULT_DUCKING["tolerance_db"],
+) -> List[Tuple[int, float]]:
+    """根据解说区间生成 BGM 增益包络 [(时间, 线性增益)]，时间单位微秒，范围 [0, total]。
+
+    每个（补白、合并后的）区间只需 4 个点：开始下降、降到底、开始恢复、恢复完成；
+    两段区间之间不足一次完整 attack + release 时直接合并，避免音量短暂回升。
+    """
+    ducked = 10 ** (-abs(reduce_db) / 20)
+    if total <= 0 or abs(reduce_db) < tolerance_db:
+        return []
+    points: List[Tuple[int, float]] = []
+    for start, end in merge_intervals(intervals, prepad, postpad, gap=attack + release):
+        if start >= total:
+            break
+        end = min(end, total)
+        points.extend(((start - attack, 1.0), (start, ducked), (end, ducked), (end + release, 1.0)))
+    if not points:
+        return []
+    return simplify(_clip(points, total), tolerance_db)
+
+
+def _interpolate(points: List[Tuple[int, float]], t: int) -> float:
+    if t <= points[0][0]:
+        return points[0][1]
+    for (t0, g0), (t1, g1) in zip(points, points[1:]):
+        if t0 <= t <= t1:
+            return g0 if t1 == t0 else g0 + (g1 - g0) * (t - t0) / (t1 - t0)
+    return points[-1][1]
+
+
+def _clip(points: List[Tuple[int, float]], total: int) -> List[Tuple[int, float]]:
+    """把越出 [0, total] 的斜坡截断到边界（在边界处插值补点）。"""
+    inside = [(t, g) for t, g in points if 0 <= t <= total]
+    if points[0][0] < 0 and (not inside or inside[0][0] > 0):
+        inside.insert(0, (0, _interpolate(points, 0)))
+    if points[-1][0] > total and inside[-1][0] < total:
+        inside.append((total, _interpolate(points, total)))
+    return inside
+
+
+def slice_envelope(points: List[Tuple[int, float]], start: int, end: int) -> List[Tuple[int, float]]:
+    """取包络在 [start, end] 内的部分（时间改为相对 start），用于 BGM 循环拼接出的各个片段。"""
+    if not points:
+        return []
+    inner = [(t - start, g) for t, g in points if start < t < end]
+    head = (0, _interpolate(points, start))
+    tail = (end - start, _interpolate(points, end))
+    out = [head] + inner + [tail]
+    # 整段增益恒定：原音量不需要关键帧，压低的只需一个关键帧
+    if all(abs(g - head[1]) < 1e-9 for _, g in out):
+        return [] if abs(head[1] - 1.0) < 1e-9 else [head]
+    return out
+
+
+def ducking_settings(conf: Optional[Dict[str, Any]]) -> Dict[str, Any]:
+    settings = dict(DEFAULT_DUCKING)
+    settings.update({k: v for k, v in (conf or {}).items() if v is not None})
+    return settings
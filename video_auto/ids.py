@@ -0,0 +1,42 @@
+import hashlib
+import uuid
+from datetime import datetime
+from typing import Any, Optional, Sequence, TypeVar
+
+T = TypeVar("T")
+_VARIANT = {c: "89ab"[int(c, 16) & 3] for c in "0123456789abcdef"}
+
+# 本工具派生 id 的命名空间
+ID_NAMESPACE = uuid.uuid5(uuid.NAMESPACE_URL, "https://github.com/wan624-pang/video-auto")
+
+
+class IdAllocator:
+    """一次运行内的 id 与随机数来源。
+
+    给定 seed 时，id 由 (seed, scope, 键) 经 uuid5 派生，随机选择也由同样的键决定，
+    相同输入重复运行得到逐字节相同的输出；未给 seed 时每次运行都不同。
+    每个片段要派生多个 id，这里直接用 hashlib 计算 uuid5（结果与 uuid.uuid5 相同），
+    省去构造 UUID 对象的开销。
+    """
+
+    def __init__(self, seed: Optional[int] = None, scope: str = "") -> None:
+        self.seed = seed
+        base = f"run:{seed}:{scope}" if seed is not None else f"run:{uuid.uuid4()}"
+        self.namespace = uuid.uuid5(ID_NAMESPACE, base)
+        self._prefix = self.namespace.bytes
+        # 动画 request_id 的时间戳前缀；固定 seed 时不依赖当前时间
+        self.stamp = datetime.now().strftime("%Y%m%d%H%M%S") if seed is None else f"{seed % 10**14:014d}"
+
+    def _digest(self, key: Any) -> bytes:
+        name = "/".join(str(k) for k in key)
+        return hashlib.sha1(self._prefix + name.encode("utf-8")).digest()
+
+    def id(self, *key: Any) -> str:
+        """由键派生 UUID 格式的 id，例如 ids.id("image_segment", index, material_id)。"""
+        h = self._digest(key).hex()
+        # 版本位固定为 5，变体位为 RFC 4122
+        return f"{h[:8]}-{h[8:12]}-5{h[13:16]}-{_VARIANT[h[16]]}{h[17:20]}-{h[20:32]}"
+
+    def choice(self, seq: Sequence[T], *key: Any) -> T:
+        """由键确定地选取一个元素：各片段的随机选择互不影响，与调用顺序无关。"""
+        return seq[int.from_bytes(self._digest(key), "big") % len(seq)]
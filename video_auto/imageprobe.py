@@ -0,0 +1,165 @@
+import struct
+from concurrent.futures import ThreadPoolExecutor
+from typing import BinaryIO, Dict, Iterable, List, Optional, Tuple
+
+from .statcache import StatCache, shared_cache
+
+# EXIF 方向 5-8 表示需要旋转 90°，显示宽高互换
+_SWAP_ORIENTATIONS = {5, 6, 7, 8}
+# 带尺寸信息的 JPEG SOF 标记（排除 DHT=C4、JPG=C8、DAC=CC）
+_SOF_MARKERS = {0xC0, 0xC1, 0xC2, 0xC3, 0xC5, 0xC6, 0xC7, 0xC9, 0xCA, 0xCB, 0xCD, 0xCE, 0xCF}
+# 无长度字段的 JPEG 标记
+_STANDALONE_MARKERS = {0x01, 0xD0, 0xD1, 0xD2, 0xD3, 0xD4, 0xD5, 0xD6, 0xD7, 0xD8}
+
+DEFAULT_PROBE_WORKERS = 8
+
+
+def _exif_orientation(data: bytes) -> int:
+    """从 TIFF 结构（可带 "Exif\\0\\0" 前缀）的 IFD0 中读取 Orientation 标签，缺省为 1。"""
+    if data.startswith(b"Exif\x00\x00"):
+        data = data[6:]
+    if len(data) < 8:
+        return 1
+    if data[:2] == b"II":
+        endian = "<"
+    elif data[:2] == b"MM":
+        endian = ">"
+    else:
+        return 1
+    ifd_offset = struct.unpack(endian + "I", data[4:8])[0]
+    if ifd_offset + 2 > len(data):
+        return 1
+    count = struct.unpack(endian + "H", data[ifd_offset:ifd_offset + 2])[0]
+    for i in range(count):
+        entry = ifd_offset + 2 + i * 12
+        if entry + 12 > len(data):
+            break
+        tag, typ = struct.unpack(endian + "HH", data[entry:entry + 4])
+        if tag == 0x0112 and typ == 3:
+            return struct.unpack(endian + "H", data[entry + 8:entry + 10])[0]
+    return 1
+
+
+def _probe_jpeg(f: BinaryIO) -> Optional[Tuple[int, int, int]]:
+    f.seek(2)
+    orientation = 1
+    while True:
+        byte = f.read(1)
+        if not byte:
+            return None
+        if byte != b"\xff":
+            continue
+        marker = f.read(1)
+        while marker == b"\xff":  # 填充字节
+            marker = f.read(1)
+        if not marker:
+            return None
+        code = marker[0]
+        if code in _STANDALONE_MARKERS:
+            continue
+        if code in (0xD9, 0xDA):  # EOI / SOS：之后是图像数据，不再有尺寸信息
+            return None
+        length_bytes = f.read(2)
+        if len(length_bytes) < 2:
+            return None
+        length = struct.unpack(">H", length_bytes)[0]
+        if code in _SOF_MARKERS:
+            header = f.read(5)
+            if len(header) < 5:
+                return None
+            height, width = struct.unpack(">HH", header[1:5])
+            return width, height, orientation
+        if code == 0xE1 and orientation == 1:
+            payload = f.read(length - 2)
+            if payload.startswith(b"Exif\x00\x00"):
+                orientation = _exif_orientation(payload)
+            continue
+        f.seek(length - 2, 1)
+
+
+def _probe_webp(f: BinaryIO, head: bytes) -> Optional[Tuple[int, int, int]]:
+    chunk = head[12:16]
+    size: Optional[Tuple[int, int]] = None
+    has_exif = False
+    if chunk == b"VP8 " and head[23:26] == b"\x9d\x01\x2a":
+        w, h = struct.unpack("<HH", head[26:30])
+        size = (w & 0x3FFF, h & 0x3FFF)
+    elif chunk == b"VP8L" and head[20] == 0x2F:
+        b0, b1, b2, b3 = head[21:25]
+        size = (1 + (b0 | ((b1 & 0x3F) << 8)), 1 + ((b1 >> 6) | (b2 << 2) | ((b3 & 0x0F) << 10)))
+    elif chunk == b"VP8X":
+        has_exif = bool(head[20] & 0x08)
+        size = (1 + int.from_bytes(head[24:27], "little"), 1 + int.from_bytes(head[27:30], "little"))
+    if size is None:
+        return None
+
+    orientation = 1
+    if has_exif:
+        # 扩展格式下 EXIF 位于独立的 chunk 中，逐个跳过 chunk 头查找
+        offset = 12
+        while True:
+            f.seek(offset)
+            chunk_head = f.read(8)
+            if len(chunk_head) < 8:
+                break
+            name, length = chunk_head[:4], struct.unpack("<I", chunk_head[4:])[0]
+            if name == b"EXIF":
+                orientation = _exif_orientation(f.read(length))
+                break
+            offset += 8 + length + (length & 1)
+    return size[0], size[1], orientation
+
+
+def probe_image_file(path: str) -> Optional[Tuple[int, int]]:
+    """只读取文件头获取图片显示尺寸 (宽, 高)，已按 EXIF 方向校正；无法识别时返回 None。
+
+    支持 JPEG（SOF）、PNG（IHDR）、GIF（逻辑屏幕描述符）、WebP（VP8/VP8L/VP8X）。
+    """
+    try:
+        with open(path, "rb") as f:
+            head = f.read(32)
+            result: Optional[Tuple[int, int, int]] = None
+            if head[:2] == b"\xff\xd8":
+                result = _probe_jpeg(f)
+            elif head[:8] == b"\x89PNG\r\n\x1a\n" and head[12:16] == b"IHDR":
+                w, h = struct.unpack(">II", head[16:24])
+                result = (w, h, 1)
+            elif head[:6] in (b"GIF87a", b"GIF89a"):
+                w, h = struct.unpack("<HH", head[6:10])
+                result = (w, h, 1)
+            elif head[:4] == b"RIFF" and head[8:12] == b"WEBP" and len(head) >= 30:
+                result = _probe_webp(f, head)
+    except (OSError, struct.error, IndexError):
+        return None
+    if result is None:
+        return None
+    width, height, orientation = result
+    if orientation in _SWAP_ORIENTATIONS:
+        width, height = height, width
+    return width, height
+
+
+def probe_images(
+    image_files: Iterable[str], workers: int = DEFAULT_PROBE_WORKERS, cache: Optional[StatCache] = None
+) -> Dict[str, Optional[Tuple[int, int]]]:
+    """批量探测图片尺寸：命中缓存（路径 + 大小 + mtime）直接返回，未命中的用线程池并行探测。"""
+    cache = cache if cache is not None else shared_cache("image_probe")
+    results: Dict[str, Optional[Tuple[int, int]]] = {}
+    pending: List[str] = []
+    for path in image_files:
+        if path in results:
+            continue
+        hit, value = cache.lookup(path)
+        if hit:
+            results[path] = tuple(value) if value else None
+        else:
+            results[path] = None
+            pending.append(path)
+
+    if pending:
+        with ThreadPoolExecutor(max_workers=workers) as pool:
+            for path, size in zip(pending, pool.map(probe_image_file, pending)):
+                results[path] = size
+                cache.put(path, list(size) if size else None)
+        cache.save()
+    return results
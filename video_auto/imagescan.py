@@ -0,0 +1,97 @@
+import os
+import re
+from fnmatch import fnmatchcase
+from typing import Any, Dict, Iterator, List, Optional, Sequence, Tuple
+
+from .statcache import StatCache, shared_cache
+
+IMAGE_EXTENSIONS = frozenset({".jpg", ".jpeg", ".png", ".gif", ".webp"})
+# 目录列表缓存的条目上限：每条含整个目录的文件名列表，远大于单个文件的探测结果
+DIR_CACHE_ENTRIES = 1024
+
+_DIGITS = re.compile(r"(\d+)")
+
+
+def natural_key(name: str) -> Tuple[Any, ...]:
+    """自然排序键：数字按数值比较、字母不区分大小写，"img_2" 排在 "img_10" 之前。"""
+    parts = _DIGITS.split(name)
+    # split 结果总是 文本, 数字, 文本, ... 交替，同一位置类型一致，可以直接比较
+    key = tuple(int(p) if i % 2 else p.casefold() for i, p in enumerate(parts))
+    # 仅大小写或前导零不同的名称按原文决出先后，保证顺序确定
+    return key, name
+
+
+def _list_dir(folder: str) -> Optional[Dict[str, List[str]]]:
+    """一次 scandir：返回按自然顺序排列的图片文件名与子目录名；跳过隐藏文件与目录。"""
+    files: List[str] = []
+    dirs: List[str] = []
+    try:
+        with os.scandir(folder) as it:
+            for entry in it:
+                name = entry.name
+                if name.startswith("."):
+                    continue
+                try:
+                    if entry.is_dir(follow_symlinks=False):
+                        dirs.append(name)
+                    elif os.path.splitext(name)[1].lower() in IMAGE_EXTENSIONS and entry.is_file():
+                        files.append(name)
+                except OSError:
+                    continue
+    except OSError:
+        return None
+    files.sort(key=natural_key)
+    dirs.sort(key=natural_key)
+    return {"files": files, "dirs": dirs}
+
+
+def _matches(rel: str, patterns: Sequence[str]) -> bool:
+    # 模式同时对相对路径与文件名匹配（不区分大小写），"*.png" 与 "raw/*" 都按直觉生效
+    rel = rel.replace(os.sep, "/").casefold()
+    name = rel.rsplit("/", 1)[-1]
+    return any(fnmatchcase(rel, p) or fnmatchcase(name, p) for p in patterns)
+
+
+def iter_images(
+    folder: str,
+    recursive: bool = False,
+    include: Optional[Sequence[str]] = None,
+    exclude: Optional[Sequence[str]] = None,
+    cache: Optional[StatCache] = None,
+) -> Iterator[str]:
+    """逐个产出 folder 中的图片路径（生成器，调用方可以边扫描边导入）。
+
+    扩展名不区分大小写（.JPG/.PNG 同样识别）；按自然顺序排列，每个目录先产出文件、再依次进入子目录。
+    recursive=True 时递归子目录（不跟随目录符号链接）。include/exclude 为 fnmatch 模式（不区分大小写），
+    匹配相对 folder 的路径或文件名：给出 include 时只保留匹配项，exclude 匹配的文件或子目录被跳过。
+    各目录的列表按目录 mtime 缓存，目录未变化时重复扫描只需一次 stat。
+    """
+    cache = cache if cache is not None else shared_cache("image_dirs", max_entries=DIR_CACHE_ENTRIES)
+    include = [p.casefold() for p in include] if include else None
+    exclude = [p.casefold() for p in exclude] if exclude else None
+    pending = [(folder, "")]
+    try:
+        while pending:
+            path, rel = pending.pop()
+            hit, listing = cache.lookup(path)
+            if not hit:
+                listing = _list_dir(path)
+                if listing is None:
+                    continue
+                cache.put(path, listing)
+            for name in listing["files"]:
+                rel_name = os.path.join(rel, name) if rel else name
+                if include and not _matches(rel_name, include):
+                    continue
+                if exclude and _matches(rel_name, exclude):
+                    continue
+                yield os.path.join(path, name)
+            if recursive:
+                # 逆序入栈，保证按自然顺序依次进入子目录
+                for name in reversed(listing["dirs"]):
+                    rel_name = os.path.join(rel, name) if rel else name
+                    if exclude and _matches(rel_name, exclude):
+                        continue
+                    pending.append((os.path.join(path, name), rel_name))
+    finally:
+        cache.save()
@@ -0,0 +1,132 @@
+import hashlib
+import json
+import os
+import threading
+from typing import Any, Dict, List, Optional
+
+from . import paths
+from .draftio import atomic_write
+
+DRAFT_FILE = "draft_content.json"
+INDEX_VERSION = 1
+# 工程目录以下最多下探的层数（草稿通常就在工程目录根部）
+DEFAULT_MAX_DEPTH = 3
+
+_shared: Dict[str, "DraftLocator"] = {}
+_shared_lock = threading.Lock()
+
+
+def _index_path(root: str, max_depth: int) -> str:
+    key = hashlib.sha1(f"{os.path.normcase(root)}|{max_depth}".encode("utf-8")).hexdigest()
+    return os.path.join(paths.get_cache_dir(), "draft_index", f"{key}.json")
+
+
+def _walk_project(path: str, depth: int) -> List[str]:
+    """有限深度的 os.scandir 遍历；某目录已含草稿文件时视为工程根，不再下探。"""
+    try:
+        with os.scandir(path) as it:
+            entries = list(it)
+    except OSError:
+        return []
+    for entry in entries:
+        if entry.name == DRAFT_FILE and entry.is_file():
+            return [entry.path]
+    found: List[str] = []
+    if depth > 0:
+        for entry in entries:
+            if entry.is_dir(follow_symlinks=False):
+                found.extend(_walk_project(entry.path, depth - 1))
+    return found
+
+
+class DraftLocator:
+    """草稿位置索引：按工程目录 mtime 增量维护，持久化在缓存目录。
+
+    每次查询只需 scandir 草稿根目录一层；mtime 未变化的工程目录直接复用索引，
+    变化（或新增）的才重新遍历。reindex=True 时强制全量重建。
+    """
+
+    def __init__(self, root: str, max_depth: int = DEFAULT_MAX_DEPTH) -> None:
+        self.root = os.path.abspath(root)
+        self.max_depth = max_depth
+        self.index_path = _index_path(self.root, max_depth)
+        self.projects: Dict[str, Dict[str, Any]] = {}
+        self._load()
+
+    def _load(self) -> None:
+        try:
+            with open(self.index_path, "r", encoding="utf-8") as f:
+                data = json.load(f)
+        except (OSError, ValueError):
+            return
+        if data.get("version") == INDEX_VERSION and data.get("root") == self.root:
+            self.projects = data.get("projects") or {}
+
+    def _save(self) -> None:
+        os.makedirs(os.path.dirname(self.index_path), exist_ok=True)
+        data = {"version": INDEX_VERSION, "root": self.root, "projects": self.projects}
+        atomic_write(self.index_path, [json.dumps(data, ensure_ascii=False).encode("utf-8")])
+
+    def refresh(self, reindex: bool = False) -> None:
+        projects: Dict[str, Dict[str, Any]] = {}
+        changed = reindex
+        try:
+            with os.scandir(self.root) as it:
+                entries = [e for e in it if e.is_dir(follow_symlinks=False)]
+        except OSError:
+            entries = []
+        for entry in entries:
+            mtime_ns = entry.stat(follow_symlinks=False).st_mtime_ns
+            cached = None if reindex else self.projects.get(entry.name)
+            if cached is not None and cached.get("mtime_ns") == mtime_ns:
+                projects[entry.name] = cached
+                continue
+            drafts = _walk_project(entry.path, self.max_depth)
+            projects[entry.name] = {
+                "mtime_ns": mtime_ns,
+                "drafts": [os.path.relpath(p, self.root) for p in drafts],
+            }
+            changed = True
+        if set(projects) != set(self.projects):
+            changed = True
+        self.projects = projects
+        if changed:
+            self._save()
+
+    def drafts(self) -> List[str]:
+        found: List[str] = []
+        for name in sorted(self.projects):
+            found.extend(os.path.join(self.root, rel) for rel in self.projects[name].get("drafts") or [])
+        return found
+
+    def latest(self) -> Optional[str]:
+        """返回修改时间最新的 draft_content.json；索引中已失效的条目会被跳过。"""
+        best: Optional[str] = None
+        best_mtime = -1
+        for path in self.drafts():
+            try:
+                mtime = os.stat(path).st_mtime_ns
+            except OSError:
+                continue
+            if mtime > best_mtime:
+                best, best_mtime = path, mtime
+        return best
+
+
+def find_latest_draft(root: str, reindex: bool = False, max_depth: int = DEFAULT_MAX_DEPTH) -> Optional[str]:
+    """在草稿根目录下查找最新的 draft_content.json（基于位置索引）。"""
+    if os.path.isfile(os.path.join(root, DRAFT_FILE)):
+        return os.path.join(os.path.abspath(root), DRAFT_FILE)
+    locator = shared_locator(root, max_depth)
+    locator.refresh(reindex=reindex)
+    return locator.latest()
+
+
+def shared_locator(root: str, max_depth: int = DEFAULT_MAX_DEPTH) -> DraftLocator:
+    """进程内共享的位置索引：常驻进程中只在首次使用时读取索引文件，之后仅做增量刷新。"""
+    key = _index_path(os.path.abspath(root), max_depth)
+    with _shared_lock:
+        locator = _shared.get(key)
+        if locator is None:
+            locator = _shared[key] = DraftLocator(root, max_depth=max_depth)
+    return locator
@@ -0,0 +1,61 @@
+import hashlib
+import os
+import tempfile
+import time
+from contextlib import contextmanager
+from typing import Iterator
+
+from .profiling import span
+
+try:
+    import fcntl
+except ImportError:  # Windows
+    fcntl = None
+    import msvcrt
+
+
+def _lock_path(draft_folder: str) -> str:
+    lock_dir = os.path.join(tempfile.gettempdir(), "video_auto_locks")
+    os.makedirs(lock_dir, exist_ok=True)
+    key = hashlib.sha1(os.path.normcase(os.path.abspath(draft_folder)).encode("utf-8")).hexdigest()
+    return os.path.join(lock_dir, f"{key}.lock")
+
+
+@contextmanager
+def file_lock(path: str, poll_interval: float = 0.2) -> Iterator[None]:
+    """以 path 为锁文件的跨进程互斥锁；进程崩溃时由操作系统释放。
+
+    不可重入：同一进程内对同一锁文件再次加锁会等待自身，调用方不要嵌套使用。
+    """
+    fd = os.open(path, os.O_RDWR | os.O_CREAT, 0o644)
+    try:
+        with span("acquire_lock"):
+            if fcntl is not None:
+                fcntl.flock(fd, fcntl.LOCK_EX)
+            else:
+                while True:
+                    try:
+                        msvcrt.locking(fd, msvcrt.LK_NBLCK, 1)
+                        break
+                    except OSError:
+                        time.sleep(poll_interval)
+        try:
+            yield
+        finally:
+            if fcntl is not None:
+                fcntl.flock(fd, fcntl.LOCK_UN)
+            else:
+                os.lseek(fd, 0, os.SEEK_SET)
+                msvcrt.locking(fd, msvcrt.LK_UNLCK, 1)
+    finally:
+        os.close(fd)
+
+
+@contextmanager
+def draft_lock(draft_folder: str, poll_interval: float = 0.2) -> Iterator[None]:
+    """草稿级互斥锁（跨进程）：同一草稿同一时刻只允许一个写入者。
+
+    锁文件放在系统临时目录，不会污染草稿文件夹；进程崩溃时由操作系统释放。
+    """
+    with file_lock(_lock_path(draft_folder), poll_interval):
+        yield
@@ -0,0 +1,137 @@
+import hashlib
+import os
+from concurrent.futures import Future, ThreadPoolExecutor
+from typing import Any, Dict, Iterable, List, Optional
+
+from .statcache import StatCache, shared_cache
+
+# 快速哈希读取的首尾块大小
+PARTIAL_BLOCK_SIZE = 64 * 1024
+_FULL_CHUNK_SIZE = 1024 * 1024
+DEFAULT_HASH_WORKERS = 8
+
+
+def partial_hash(path: str) -> Optional[str]:
+    """快速内容指纹：文件大小 + 首尾各 64KB 的 blake2b。"""
+    try:
+        size = os.path.getsize(path)
+        h = hashlib.blake2b(digest_size=16)
+        h.update(size.to_bytes(8, "little"))
+        with open(path, "rb") as f:
+            h.update(f.read(PARTIAL_BLOCK_SIZE))
+            if size > PARTIAL_BLOCK_SIZE:
+                f.seek(max(PARTIAL_BLOCK_SIZE, size - PARTIAL_BLOCK_SIZE))
+                h.update(f.read(PARTIAL_BLOCK_SIZE))
+    except OSError:
+        return None
+    return "p:" + h.hexdigest()
+
+
+def full_hash(path: str) -> Optional[str]:
+    """完整内容哈希（读取整个文件），用于需要排除首尾相同、中间不同的极端情况。"""
+    try:
+        h = hashlib.blake2b(digest_size=16)
+        with open(path, "rb") as f:
+            for chunk in iter(lambda: f.read(_FULL_CHUNK_SIZE), b""):
+                h.update(chunk)
+    except OSError:
+        return None
+    return "f:" + h.hexdigest()
+
+
+def _fully_covered(path: str) -> bool:
+    """文件不超过首尾两块时快速指纹已读完整个文件，无需再算完整哈希。"""
+    try:
+        return os.path.getsize(path) <= 2 * PARTIAL_BLOCK_SIZE
+    except OSError:
+        return False
+
+
+class MaterialIndex:
+    """materials.videos 的内容寻址索引：相同内容的素材只保留一份。
+
+    每次运行从草稿中构建一次；先按快速指纹（partial_hash）分组，指纹相同的素材在复用前再用
+    完整内容哈希确认，首尾相同、中间不同的图片不会被合并。
+    两种哈希都按 路径 + 大小 + mtime 缓存，重复运行无需重新读文件。
+    """
+
+    def __init__(
+        self,
+        draft: Dict[str, Any],
+        workers: int = DEFAULT_HASH_WORKERS,
+        cache: Optional[StatCache] = None,
+    ) -> None:
+        self.workers = workers
+        self.cache = cache if cache is not None else shared_cache("content_hash")
+        self.by_hash: Dict[str, List[Dict[str, Any]]] = {}
+
+        materials = (draft.get("materials") or {}).get("videos") or []
+        with_path = [m for m in materials if m.get("path")]
+        hashes = self.hash_files(m["path"] for m in with_path)
+        for m in with_path:
+            self.add(hashes.get(m["path"]), m)
+
+    def _cached(self, path: str, field: str) -> Optional[str]:
+        return (self.cache.get(path) or {}).get(field)
+
+    def _store(self, path: str, field: str, digest: str) -> None:
+        entry = dict(self.cache.get(path) or {})
+        entry[field] = digest
+        self.cache.put(path, entry)
+
+    def hash_files(self, files: Iterable[str]) -> Dict[str, Optional[str]]:
+        """计算快速指纹。files 可以是生成器：未命中缓存的文件一出现就提交到线程池，与目录扫描并行进行。"""
+        results: Dict[str, Optional[str]] = {}
+        pending: Dict[str, "Future[Optional[str]]"] = {}
+        pool: Optional[ThreadPoolExecutor] = None
+        try:
+            for path in files:
+                if path in results:
+                    continue
+                results[path] = self._cached(path, "partial")
+                if results[path] is None:
+                    if pool is None:
+                        pool = ThreadPoolExecutor(max_workers=self.workers)
+                    pending[path] = pool.submit(partial_hash, path)
+
+            for path, fut in pending.items():
+                digest = fut.result()
+                results[path] = digest
+                if digest:
+                    self._store(path, "partial", digest)
+        finally:
+            if pool is not None:
+                pool.shutdown()
+        if pending:
+            self.cache.save()
+        return results
+
+    def _full_hash(self, path: str) -> Optional[str]:
+        digest = self._cached(path, "full")
+        if digest is None:
+            digest = full_hash(path)
+            if digest:
+                self._store(path, "full", digest)
+                self.cache.save()
+        return digest
+
+    def find(self, path: str, digest: Optional[str]) -> Optional[Dict[str, Any]]:
+        """与 path 内容相同的已有素材：快速指纹相同且完整哈希一致；没有则返回 None。"""
+        candidates = self.by_hash.get(digest) if digest else None
+        if not candidates:
+            return None
+        full: Optional[str] = None
+        for material in candidates:
+            if material["path"] == path or _fully_covered(path):
+                return material
+            if full is None:
+                full = self._full_hash(path)
+                if full is None:
+                    return None
+            if self._full_hash(material["path"]) == full:
+                return material
+        return None
+
+    def add(self, digest: Optional[str], material: Dict[str, Any]) -> None:
+        if digest:
+            self.by_hash.setdefault(digest, []).append(material)
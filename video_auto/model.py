@@ -0,0 +1,513 @@
+import json
+from functools import lru_cache
+from typing import Any, Dict, List, Optional, Tuple
+
+from .presets import get_preset, parse_resolution, resolve_preset_name
+
+# 紧凑的时间线模型：只保存每个素材/片段各不相同的字段，序列化时套用按预设预编译的模板。
+# 模板中的嵌套对象（crop、matting、clip 等）在每次输出时复制一份，各片段可以独立地原地修改。
+_MATERIAL_BASE: Dict[str, Any] = {
+    "aigc_type": "none",
+    "audio_fade": None,
+    "cartoon_path": "",
+    "category_id": "",
+    "category_name": "",
+    "check_flag": 0,
+    "crop": {
+        "lower_left_x": 0.0,
+        "lower_left_y": 1.0,
+        "lower_right_x": 1.0,
+        "lower_right_y": 1.0,
+        "upper_left_x": 0.0,
+        "upper_left_y": 0.0,
+        "upper_right_x": 1.0,
+        "upper_right_y": 0.0,
+    },
+    "crop_ratio": "free",
+    "crop_scale": 1.0,
+    "duration": 0,
+    "formula_id": "",
+    "freeze": None,
+    "has_audio": False,
+    "height": 1080,
+    "id": "",
+    "intensifies_audio_path": "",
+    "intensifies_path": "",
+    "is_ai_generate_content": False,
+    "is_copyright": False,
+    "is_text_edit_overdub": False,
+    "is_unified_beauty_mode": False,
+    "local_id": "",
+    "local_material_id": "",
+    "material_id": "",
+    "material_name": "",
+    "material_url": "",
+    "matting": {
+        "flag": 0,
+        "has_use_quick_brush": False,
+        "has_use_quick_eraser": False,
+        "interactiveTime": [],
+        "path": "",
+        "strokes": [],
+    },
+    "media_path": "",
+    "object_locked": None,
+    "origin_material_id": "",
+    "path": "",
+    "picture_from": "none",
+    "picture_set_category_id": "",
+    "picture_set_category_name": "",
+    "request_id": "",
+    "reverse_intensifies_path": "",
+    "reverse_path": "",
+    "smart_motion": None,
+    "source": 0,
+    "source_platform": 0,
+    "stable": {
+        "matrix_path": "",
+        "stable_level": 0,
+        "time_range": {"duration": 0, "start": 0},
+    },
+    "team_id": "",
+    "type": "photo",
+    "video_algorithm": {
+        "algorithms": [],
+        "complement_frame_config": None,
+        "deflicker": None,
+        "gameplay_configs": [],
+        "motion_blur_config": None,
+        "noise_reduction": None,
+        "path": "",
+        "quality_enhance": None,
+        "time_range": None,
+    },
+    "width": 1920,
+}
+
+# 图片片段的默认缩放（略大于画布，平移时不露边）与平移关键帧幅度；预设可覆盖
+DEFAULT_IMAGE_SCALE = 1.25
+DEFAULT_MOTION_AMPLITUDE = 0.21
+
+_SEGMENT_BASE: Dict[str, Any] = {
+    "cartoon": False,
+    "clip": {
+        "alpha": 1.0,
+        "flip": {"horizontal": False, "vertical": False},
+        "rotation": 0.0,
+        "scale": {"x": DEFAULT_IMAGE_SCALE, "y": DEFAULT_IMAGE_SCALE},
+        "transform": {"x": 0.0, "y": 0.0},
+    },
+    "common_keyframes": [],
+    "enable_adjust": False,
+    "enable_color_curves": True,
+    "enable_color_wheels": True,
+    "extra_material_refs": [],
+    "group_id": "",
+    "id": "",
+    "intensifies_audio": False,
+    "is_placeholder": False,
+    "material_id": "",
+    "render_index": 0,
+    "source_timerange": {"duration": 0, "start": 0},
+    "speed": 1.0,
+    "target_timerange": {"duration": 0, "start": 0},
+    "template_id": "",
+    "template_scene": "default",
+    "track_attribute": 0,
+    "track_render_index": 0,
+    "uniform_scale": {"on": True, "value": 1.0},
+    "visible": True,
+    "volume": 1.0,
+}
+
+_AUDIO_MATERIAL_BASE: Dict[str, Any] = {
+    "app_id": 0,
+    "category_id": "",
+    "category_name": "local",
+    "check_flag": 1,
+    "duration": 0,
+    "effect_id": "",
+    "formula_id": "",
+    "id": "",
+    "intensifies_path": "",
+    "local_material_id": "",
+    "music_id": "",
+    "name": "",
+    "path": "",
+    "request_id": "",
+    "resource_id": "",
+    "source_platform": 0,
+    "team_id": "",
+    "text_id": "",
+    "tone_category_id": "",
+    "tone_category_name": "",
+    "tone_effect_id": "",
+    "tone_effect_name": "",
+    "tone_speaker": "",
+    "tone_type": "",
+    "type": "extract_music",
+    "video_id": "",
+    "wave_points": [],
+}
+
+# 音频片段没有画面属性
+_AUDIO_SEGMENT_BASE: Dict[str, Any] = dict(
+    _SEGMENT_BASE,
+    clip=None,
+    enable_color_curves=False,
+    enable_color_wheels=False,
+    uniform_scale=None,
+)
+
+# 字幕文本素材；content 中的样式与下列字号/颜色保持一致
+_TEXT_MATERIAL_BASE: Dict[str, Any] = {
+    "add_type": 0,
+    "alignment": 1,
+    "background_alpha": 1.0,
+    "background_color": "",
+    "bold_width": 0.0,
+    "border_color": "#000000",
+    "border_width": 0.08,
+    "check_flag": 7,
+    "content": "",
+    "font_name": "",
+    "font_path": "",
+    "font_size": 8.0,
+    "id": "",
+    "italic_degree": 0,
+    "letter_spacing": 0.0,
+    "line_spacing": 0.02,
+    "text_alpha": 1.0,
+    "text_color": "#FFFFFF",
+    "type": "subtitle",
+    "typesetting": 0,
+    "underline": False,
+}
+_TEXT_STYLE: Dict[str, Any] = {
+    "fill": {"content": {"solid": {"color": [1.0, 1.0, 1.0]}}},
+    "size": 8.0,
+    "strokes": [{"content": {"solid": {"color": [0.0, 0.0, 0.0]}}, "width": 0.08}],
+}
+
+# 字幕片段：不缩放，位于画面下方
+_TEXT_SEGMENT_BASE: Dict[str, Any] = dict(
+    _SEGMENT_BASE,
+    clip=dict(_SEGMENT_BASE["clip"], scale={"x": 1.0, "y": 1.0}, transform={"x": 0.0, "y": -0.8}),
+    enable_color_curves=False,
+    enable_color_wheels=False,
+)
+
+_ANIMATION_ITEM_BASE: Dict[str, Any] = {
+    "anim_adjust_params": None,
+    "category_id": "in",
+    "category_name": "入场",
+    "duration": 700_000,
+    "id": "",
+    "material_type": "video",
+    "name": "",
+    "panel": "video",
+    "path": "",
+    "platform": "all",
+    "request_id": "",
+    "resource_id": "",
+    "start": 0,
+    "type": "in",
+}
+
+
+# 压缩输出时，下列字段即使取默认值也保留（剪映据此定位素材、时间与引用）
+_REQUIRED_FIELDS = frozenset(
+    {
+        "id",
+        "type",
+        "path",
+        "name",
+        "material_name",
+        "material_id",
+        "content",
+        "duration",
+        "start",
+        "width",
+        "height",
+        "render_index",
+        "extra_material_refs",
+        "common_keyframes",
+        "source_timerange",
+        "target_timerange",
+    }
+)
+
+
+def _omittable(base: Dict[str, Any]) -> frozenset:
+    # 取值为 null / 空字符串 / 空列表 / false / 0 的可选字段，与剪映读取缺省字段时的默认值一致
+    return frozenset(k for k, v in base.items() if k not in _REQUIRED_FIELDS and v in (None, "", [], False, 0))
+
+
+# 模板名（Templates 属性名）-> 可省略的字段
+OMITTABLE_FIELDS: Dict[str, frozenset] = {
+    "material": _omittable(_MATERIAL_BASE),
+    "segment": _omittable(_SEGMENT_BASE),
+    "animation_item": _omittable(_ANIMATION_ITEM_BASE),
+    "audio_material": _omittable(_AUDIO_MATERIAL_BASE),
+    "audio_segment": _omittable(_AUDIO_SEGMENT_BASE),
+    "text_material": _omittable(_TEXT_MATERIAL_BASE),
+    "text_segment": _omittable(_TEXT_SEGMENT_BASE),
+}
+
+
+# Segment.to_json 为每个片段重新生成的字段，无需从模板复制
+_ASSIGNED_FIELDS = frozenset({"common_keyframes", "extra_material_refs", "source_timerange", "target_timerange"})
+
+
+def _clone(value: Any) -> Any:
+    """复制由 dict/list 与标量组成的 JSON 值（比 copy.deepcopy 快得多）。"""
+    if type(value) is dict:
+        return {k: _clone(v) for k, v in value.items()}
+    if type(value) is list:
+        return [_clone(v) for v in value]
+    return value
+
+
+def omit_defaults(obj: Dict[str, Any], template: str) -> int:
+    """就地删除 obj 中取默认值的可省略字段，返回删除的字段数。"""
+    omitted = [k for k in OMITTABLE_FIELDS[template] if k in obj and obj[k] in (None, "", [], False, 0)]
+    for k in omitted:
+        del obj[k]
+    return len(omitted)
+
+
+class Templates:
+    """某个预设下预编译的输出模板与画布参数。"""
+
+    __slots__ = (
+        "preset_name",
+        "width",
+        "height",
+        "fps",
+        "image_scale",
+        "motion_amplitude",
+        "material",
+        "segment",
+        "animation_item",
+        "audio_material",
+        "audio_segment",
+        "text_material",
+        "text_segment",
+        "_mutable",
+    )
+
+    def __init__(
+        self,
+        preset_name: str,
+        width: int,
+        height: int,
+        fps: int,
+        image_scale: float = DEFAULT_IMAGE_SCALE,
+        motion_amplitude: float = DEFAULT_MOTION_AMPLITUDE,
+    ) -> None:
+        self.preset_name = preset_name
+        self.width = width
+        self.height = height
+        self.fps = fps
+        self.image_scale = image_scale
+        self.motion_amplitude = motion_amplitude
+        self.material = dict(_MATERIAL_BASE, width=width, height=height)
+        self.segment = dict(_SEGMENT_BASE, clip=dict(_SEGMENT_BASE["clip"], scale={"x": image_scale, "y": image_scale}))
+        self.animation_item = dict(_ANIMATION_ITEM_BASE)
+        self.audio_material = dict(_AUDIO_MATERIAL_BASE)
+        self.audio_segment = dict(_AUDIO_SEGMENT_BASE)
+        self.text_material = dict(_TEXT_MATERIAL_BASE)
+        self.text_segment = dict(_TEXT_SEGMENT_BASE)
+        # 各模板中取值为 dict/list 的字段：实例化时逐个复制，输出之间不共享可变对象
+        # （to_json 每次都会重新赋值的字段除外）
+        self._mutable: Dict[str, Tuple[str, ...]] = {
+            name: tuple(
+                k for k, v in getattr(self, name).items() if isinstance(v, (dict, list)) and k not in _ASSIGNED_FIELDS
+            )
+            for name in OMITTABLE_FIELDS
+        }
+
+    def instantiate(self, name: str) -> Dict[str, Any]:
+        """按模板名（如 "segment"）生成一份独立的输出字典，嵌套对象与模板及其他输出互不共享。"""
+        d = dict(getattr(self, name))
+        for k in self._mutable[name]:
+            d[k] = _clone(d[k])
+        return d
+
+    def canvas_config(self) -> Dict[str, Any]:
+        return {"height": self.height, "ratio": "original", "width": self.width}
+
+
+@lru_cache(maxsize=None)
+def compile_templates(preset_name: Optional[str] = None) -> Templates:
+    """按预设编译模板（每个预设只编译一次）；preset_name 为空时使用默认预设。"""
+    name = resolve_preset_name(preset_name)
+    preset = get_preset(name)
+    width, height = parse_resolution(preset.get("resolution", "1920x1080"))
+    return Templates(
+        name,
+        width,
+        height,
+        int(preset.get("fps", 30)),
+        float(preset.get("image_scale", DEFAULT_IMAGE_SCALE)),
+        float(preset.get("motion_amplitude", DEFAULT_MOTION_AMPLITUDE)),
+    )
+
+
+class Keyframe:
+    __slots__ = ("id", "property_type", "start_value", "end_value", "duration")
+
+    def __init__(self, id: str, property_type: str, start_value: float, end_value: float, duration: int) -> None:
+        self.id = id
+        self.property_type = property_type
+        self.start_value = start_value
+        self.end_value = end_value
+        self.duration = duration
+
+    def to_json(self) -> Dict[str, Any]:
+        return {
+            "id": self.id,
+            "keyframe_list": [
+                {"time_offset": 0, "values": [self.start_value]},
+                {"time_offset": self.duration, "values": [self.end_value]},
+            ],
+            "property_type": self.property_type,
+        }
+
+
+class Envelope:
+    """多点关键帧（如 BGM 音量包络），points 为 [(相对片段起点的时间, 值)]。"""
+
+    __slots__ = ("id", "property_type", "points")
+
+    def __init__(self, id: str, property_type: str, points: List[Tuple[int, float]]) -> None:
+        self.id = id
+        self.property_type = property_type
+        self.points = points
+
+    def to_json(self) -> Dict[str, Any]:
+        return {
+            "id": self.id,
+            "keyframe_list": [{"time_offset": t, "values": [round(v, 6)]} for t, v in self.points],
+            "property_type": self.property_type,
+        }
+
+
+class Animation:
+    __slots__ = ("id", "name", "resource_id", "request_id")
+
+    def __init__(self, id: str, name: str, resource_id: str, request_id: str) -> None:
+        self.id = id
+        self.name = name
+        self.resource_id = resource_id
+        self.request_id = request_id
+
+    def to_json(self, templates: Templates) -> Dict[str, Any]:
+        item = templates.instantiate("animation_item")
+        item["id"] = self.resource_id
+        item["name"] = self.name
+        item["request_id"] = self.request_id
+        item["resource_id"] = self.resource_id
+        return {"animations": [item], "id": self.id, "type": "sticker_animation"}
+
+
+class Material:
+    __slots__ = ("id", "path", "name", "width", "height")
+
+    def __init__(self, id: str, path: str, name: str, width: Optional[int] = None, height: Optional[int] = None) -> None:
+        self.id = id
+        self.path = path
+        self.name = name
+        self.width = width
+        self.height = height
+
+    def to_json(self, templates: Templates) -> Dict[str, Any]:
+        d = templates.instantiate("material")
+        d["id"] = self.id
+        d["material_name"] = self.name
+        d["path"] = self.path
+        if self.width and self.height:
+            d["width"] = self.width
+            d["height"] = self.height
+        return d
+
+
+class AudioMaterial:
+    __slots__ = ("id", "path", "name", "duration")
+
+    def __init__(self, id: str, path: str, name: str, duration: int) -> None:
+        self.id = id
+        self.path = path
+        self.name = name
+        self.duration = duration
+
+    def to_json(self, templates: Templates) -> Dict[str, Any]:
+        d = templates.instantiate("audio_material")
+        d["duration"] = self.duration
+        d["id"] = self.id
+        d["name"] = self.name
+        d["path"] = self.path
+        return d
+
+
+class TextMaterial:
+    __slots__ = ("id", "text")
+
+    def __init__(self, id: str, text: str) -> None:
+        self.id = id
+        self.text = text
+
+    def to_json(self, templates: Templates) -> Dict[str, Any]:
+        d = templates.instantiate("text_material")
+        style = dict(_TEXT_STYLE, range=[0, len(self.text)])
+        d["content"] = json.dumps({"styles": [style], "text": self.text}, ensure_ascii=False)
+        d["id"] = self.id
+        return d
+
+
+class Segment:
+    __slots__ = ("id", "material_id", "start", "duration", "render_index", "keyframes", "material_refs")
+    # Templates 上对应的片段模板属性名
+    template = "segment"
+
+    def __init__(
+        self,
+        id: str,
+        material_id: str,
+        start: int,
+        duration: int,
+        render_index: int,
+        keyframes: Optional[List[Keyframe]] = None,
+        material_refs: Optional[List[str]] = None,
+    ) -> None:
+        self.id = id
+        self.material_id = material_id
+        self.start = start
+        self.duration = duration
+        self.render_index = render_index
+        self.keyframes = keyframes or []
+        self.material_refs = material_refs or []
+
+    def key(self) -> Tuple[str, int, int]:
+        return self.material_id, self.start, self.duration
+
+    def to_json(self, templates: Templates) -> Dict[str, Any]:
+        d = templates.instantiate(self.template)
+        d["common_keyframes"] = [k.to_json() for k in self.keyframes]
+        d["extra_material_refs"] = list(self.material_refs)
+        d["id"] = self.id
+        d["material_id"] = self.material_id
+        d["render_index"] = self.render_index
+        d["source_timerange"] = {"duration": self.duration, "start": 0}
+        d["target_timerange"] = {"duration": self.duration, "start": self.start}
+        return d
+
+
+class AudioSegment(Segment):
+    __slots__ = ()
+    template = "audio_segment"
+
+
+class TextSegment(Segment):
+    __slots__ = ()
+    template = "text_segment"
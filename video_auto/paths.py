@@ -1,8 +1,10 @@
 import os
 import platform
-from glob import glob
 from typing import Optional
 
+from . import locator
+from .profiling import span
+
 
 def get_default_draft_root() -> str:
     system = platform.system().lower()
@@ -14,22 +16,29 @@ def get_default_draft_root() -> str:
         return os.path.expanduser("~/Desktop/Youtube/剪映draft/JianyingPro Drafts")
 
 
-def find_draft_content_json(draft_path: Optional[str]) -> Optional[str]:
-    if draft_path:
-        draft_path = os.path.abspath(draft_path)
-        if os.path.isdir(draft_path):
-            candidate = os.path.join(draft_path, "draft_content.json")
-            if os.path.exists(candidate):
-                return candidate
-            matches = glob(os.path.join(draft_path, "**", "draft_content.json"), recursive=True)
-            if matches:
-                matches.sort(key=os.path.getmtime, reverse=True)
-                return matches[0]
-        elif os.path.isfile(draft_path) and draft_path.endswith("draft_content.json"):
-            return draft_path
-    root = get_default_draft_root()
-    matches = glob(os.path.join(root, "**", "draft_content.json"), recursive=True)
-    if not matches:
-        return None
-    matches.sort(key=os.path.getmtime, reverse=True)
-    return matches[0]
+def get_cache_dir() -> str:
+    """本工具的缓存目录，可通过环境变量 VIDEO_AUTO_CACHE_DIR 覆盖。"""
+    override = os.environ.get("VIDEO_AUTO_CACHE_DIR")
+    if override:
+        return os.path.abspath(os.path.expanduser(override))
+    system = platform.system().lower()
+    if system.startswith("windows"):
+        base = os.environ.get("LOCALAPPDATA") or os.path.expanduser("~/AppData/Local")
+    elif system == "darwin":
+        base = os.path.expanduser("~/Library/Caches")
+    else:
+        base = os.environ.get("XDG_CACHE_HOME") or os.path.expanduser("~/.cache")
+    return os.path.join(base, "video_auto")
+
+
+def find_draft_content_json(draft_path: Optional[str], reindex: bool = False) -> Optional[str]:
+    with span("find_draft"):
+        if draft_path:
+            draft_path = os.path.abspath(draft_path)
+            if os.path.isdir(draft_path):
+                found = locator.find_latest_draft(draft_path, reindex=reindex)
+                if found:
+                    return found
+            elif os.path.isfile(draft_path) and draft_path.endswith("draft_content.json"):
+                return draft_path
+        return locator.find_latest_draft(get_default_draft_root(), reindex=reindex)
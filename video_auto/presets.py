@@ -1,20 +1,52 @@
+from typing import Any, Dict, Optional, Tuple
+
 PRESETS = {
     "横屏专业": {
         "resolution": "1920x1080",
         "fps": 30,
         "title_font_size": 36,
         "transition": "crossfade",
+        "image_scale": 1.25,
+        "motion_amplitude": 0.21,
     },
     "竖屏快剪": {
         "resolution": "1080x1920",
         "fps": 60,
         "title_font_size": 42,
         "transition": "slide",
+        "image_scale": 1.25,
+        "motion_amplitude": 0.21,
     },
     "电影质感": {
         "resolution": "2048x858",
         "fps": 24,
         "title_font_size": 28,
         "transition": "film",
+        "image_scale": 1.25,
+        "motion_amplitude": 0.21,
     },
 }
+
+DEFAULT_PRESET = "横屏专业"
+
+
+def resolve_preset_name(name: Optional[str]) -> str:
+    """解析预设名称：空值取默认预设；支持前缀简写（如 “横屏” → “横屏专业”）。"""
+    if not name:
+        return DEFAULT_PRESET
+    if name in PRESETS:
+        return name
+    matches = [key for key in PRESETS if key.startswith(name)]
+    if len(matches) == 1:
+        return matches[0]
+    raise ValueError(f"未知预设: {name}，可选: {', '.join(PRESETS)}")
+
+
+def get_preset(name: Optional[str]) -> Dict[str, Any]:
+    return PRESETS[resolve_preset_name(name)]
+
+
+def parse_resolution(resolution: str) -> Tuple[int, int]:
+    """解析 “1920x1080” 形式的分辨率为 (宽, 高)。"""
+    width, _, height = str(resolution).lower().partition("x")
+    return int(width), int(height)
@@ -0,0 +1,177 @@
+import json
+import time
+import tracemalloc
+import unicodedata
+from contextlib import contextmanager
+from typing import Any, Dict, Iterator, List, Optional
+
+# 当前生效的 Profiler；为 None 时 span() 直接返回空操作对象，几乎没有开销
+_active: Optional["Profiler"] = None
+
+
+class _NullSpan:
+    __slots__ = ()
+
+    def __enter__(self) -> "_NullSpan":
+        return self
+
+    def __exit__(self, *exc: Any) -> None:
+        return None
+
+    def count(self, name: str, n: int = 1) -> None:
+        pass
+
+
+_NULL_SPAN = _NullSpan()
+
+
+class Span:
+    """一次计时区间。可用 count() 记录该阶段处理的对象数量（图片、片段、字节等）。"""
+
+    __slots__ = ("profiler", "name", "path", "counts", "_wall", "_cpu", "_mem_start", "peak")
+
+    def __init__(self, profiler: "Profiler", name: str) -> None:
+        self.profiler = profiler
+        self.name = name
+        self.path = ""
+        self.counts: Dict[str, int] = {}
+        self._wall = 0.0
+        self._cpu = 0.0
+        self._mem_start = 0
+        self.peak = 0
+
+    def count(self, name: str, n: int = 1) -> None:
+        self.counts[name] = self.counts.get(name, 0) + n
+
+    def __enter__(self) -> "Span":
+        self.profiler._enter(self)
+        self._wall = time.perf_counter()
+        self._cpu = time.process_time()
+        return self
+
+    def __exit__(self, *exc: Any) -> None:
+        wall = time.perf_counter() - self._wall
+        cpu = time.process_time() - self._cpu
+        self.profiler._exit(self, wall, cpu)
+
+
+class Profiler:
+    """按阶段汇总墙钟时间、CPU 时间、对象计数，以及可选的 tracemalloc 内存峰值。
+
+    同名（同一嵌套路径）的区间会累加，calls 记录进入次数。
+    """
+
+    def __init__(self, trace_memory: bool = False) -> None:
+        self.trace_memory = trace_memory
+        self.stats: Dict[str, Dict[str, Any]] = {}
+        self._stack: List[Span] = []
+
+    def span(self, name: str) -> Span:
+        return Span(self, name)
+
+    def _enter(self, span: Span) -> None:
+        parent = self._stack[-1] if self._stack else None
+        span.path = f"{parent.path}/{span.name}" if parent else span.name
+        if span.path not in self.stats:
+            # 进入时登记，报告按首次进入顺序（父阶段在子阶段之前）输出
+            self.stats[span.path] = {
+                "name": span.path,
+                "depth": len(self._stack),
+                "calls": 0,
+                "wall_s": 0.0,
+                "cpu_s": 0.0,
+                "counts": {},
+            }
+        if self.trace_memory:
+            current, peak = tracemalloc.get_traced_memory()
+            if parent is not None:
+                parent.peak = max(parent.peak, peak)
+            tracemalloc.reset_peak()
+            span._mem_start = current
+            span.peak = current
+        self._stack.append(span)
+
+    def _exit(self, span: Span, wall: float, cpu: float) -> None:
+        self._stack.pop()
+        stat = self.stats[span.path]
+        stat["calls"] += 1
+        stat["wall_s"] += wall
+        stat["cpu_s"] += cpu
+        for key, n in span.counts.items():
+            stat["counts"][key] = stat["counts"].get(key, 0) + n
+        if self.trace_memory:
+            span.peak = max(span.peak, tracemalloc.get_traced_memory()[1])
+            stat["peak_bytes"] = max(stat.get("peak_bytes", 0), span.peak - span._mem_start)
+            if self._stack:
+                self._stack[-1].peak = max(self._stack[-1].peak, span.peak)
+
+    def to_json(self) -> List[Dict[str, Any]]:
+        """按首次进入顺序返回各阶段统计。"""
+        out = []
+        for stat in self.stats.values():
+            item = dict(stat, wall_s=round(stat["wall_s"], 6), cpu_s=round(stat["cpu_s"], 6))
+            out.append(item)
+        return out
+
+    def format_table(self) -> str:
+        """人类可读的阶段表：子阶段按嵌套层级缩进。"""
+        rows = self.to_json()
+        if not rows:
+            return "（无性能数据）"
+        headers = ["阶段", "次数", "墙钟(ms)", "CPU(ms)"] + (["峰值(MB)"] if self.trace_memory else []) + ["计数"]
+        table = []
+        for r in rows:
+            cells = [
+                "  " * r["depth"] + r["name"].rsplit("/", 1)[-1],
+                str(r["calls"]),
+                f"{r['wall_s'] * 1000:.1f}",
+                f"{r['cpu_s'] * 1000:.1f}",
+            ]
+            if self.trace_memory:
+                cells.append(f"{r.get('peak_bytes', 0) / 1024 / 1024:.1f}")
+            cells.append(", ".join(f"{k}={v}" for k, v in r["counts"].items()))
+            table.append(cells)
+        widths = [max(_display_width(row[i]) for row in [headers] + table) for i in range(len(headers))]
+        lines = []
+        for row in [headers] + table:
+            out = []
+            for i, cell in enumerate(row):
+                pad = " " * (widths[i] - _display_width(cell))
+                # 首列左对齐，数值列右对齐，计数列不补齐
+                out.append(cell + pad if i == 0 else cell if i == len(row) - 1 else pad + cell)
+            lines.append("  ".join(out).rstrip())
+        return "\n".join(lines)
+
+    def write_json(self, path: str) -> None:
+        with open(path, "w", encoding="utf-8") as f:
+            json.dump({"trace_memory": self.trace_memory, "spans": self.to_json()}, f, ensure_ascii=False, indent=2)
+
+
+def _display_width(text: str) -> int:
+    return sum(2 if unicodedata.east_asian_width(ch) in "WF" else 1 for ch in text)
+
+
+def span(name: str) -> Any:
+    """在当前 Profiler 下开启一个计时区间；未启用性能分析时返回空操作对象。"""
+    profiler = _active
+    if profiler is None:
+        return _NULL_SPAN
+    return profiler.span(name)
+
+
+@contextmanager
+def profile(trace_memory: bool = False) -> Iterator[Profiler]:
+    """启用性能分析：with 块内的 span() 记录到返回的 Profiler。"""
+    global _active
+    previous = _active
+    profiler = Profiler(trace_memory)
+    started_tracing = trace_memory and not tracemalloc.is_tracing()
+    if started_tracing:
+        tracemalloc.start()
+    _active = profiler
+    try:
+        yield profiler
+    finally:
+        _active = previous
+        if started_tracing:
+            tracemalloc.stop()
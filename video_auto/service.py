@@ -0,0 +1,392 @@
+import json
+import os
+import threading
+import time
+from collections import OrderedDict, deque
+from concurrent.futures import Future, ThreadPoolExecutor
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Any, Callable, Deque, Dict, List, Optional, Tuple
+
+from . import draftcache, draftio, sync
+from .api import apply_manifest, derive_draft, render_target, write_rendered_draft
+from .backup import run_backup
+from .config import Manifest, load_manifest
+from .ids import IdAllocator
+from .locator import DRAFT_FILE
+from .lock import draft_lock
+from .model import compile_templates
+from .statcache import file_identity
+from .validate import inspect_loaded
+
+DEFAULT_HOST = "127.0.0.1"
+DEFAULT_PORT = 8765
+DEFAULT_CACHE_DRAFTS = 8
+DEFAULT_CACHE_MB = 1024
+# 解析后的草稿在内存中约为文件大小的数倍，用于估算缓存占用
+PARSED_SIZE_FACTOR = 6
+# 每个接口保留最近多少次请求的耗时用于计算分位数
+LATENCY_WINDOW = 2048
+
+# 缓存条目：(文件身份, 已解析草稿, 估算内存字节数)
+_CacheEntry = Tuple[Tuple[int, int], Dict[str, Any], int]
+
+
+class DraftCache:
+    """常驻内存的已解析草稿（LRU）。
+
+    条目按 (大小, mtime) 校验，文件被外部修改时重新读取；条目数或估算内存超过上限时
+    淘汰最久未使用的草稿。调用方需持有对应草稿的锁（见 RenderService 的按草稿队列）。
+    """
+
+    def __init__(self, max_entries: int = DEFAULT_CACHE_DRAFTS, max_bytes: int = DEFAULT_CACHE_MB << 20) -> None:
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self._entries: "OrderedDict[str, _CacheEntry]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def get(self, path: str) -> Dict[str, Any]:
+        ident = file_identity(path)
+        with self._lock:
+            entry = self._entries.get(path)
+            if entry is not None and entry[0] == ident:
+                self._entries.move_to_end(path)
+                self.hits += 1
+                return entry[1]
+            self.misses += 1
+        draft = draftcache.load_draft(path)
+        self.put(path, draft)
+        return draft
+
+    def put(self, path: str, draft: Dict[str, Any]) -> None:
+        """登记（写回后的）草稿及其当前文件身份。"""
+        ident = file_identity(path)
+        if ident is None:
+            self.discard(path)
+            return
+        with self._lock:
+            self._entries[path] = (ident, draft, ident[0] * PARSED_SIZE_FACTOR)
+            self._entries.move_to_end(path)
+            # 至少保留刚放入的条目
+            while len(self._entries) > 1 and (
+                len(self._entries) > self.max_entries or self._estimated_bytes() > self.max_bytes
+            ):
+                self._entries.popitem(last=False)
+                self.evictions += 1
+
+    def discard(self, path: str) -> None:
+        with self._lock:
+            self._entries.pop(path, None)
+
+    def _estimated_bytes(self) -> int:
+        return sum(e[2] for e in self._entries.values())
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                "drafts": len(self._entries),
+                "estimated_mb": round(self._estimated_bytes() / (1 << 20), 1),
+                "max_drafts": self.max_entries,
+                "max_mb": round(self.max_bytes / (1 << 20), 1),
+                "hits": self.hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+            }
+
+
+class LatencyStats:
+    """各接口最近 LATENCY_WINDOW 次请求的耗时与计数。"""
+
+    def __init__(self) -> None:
+        self._lock = threading.Lock()
+        self._samples: Dict[str, Deque[float]] = {}
+        self._counts: Dict[str, List[int]] = {}
+
+    def record(self, name: str, seconds: float, ok: bool) -> None:
+        with self._lock:
+            self._samples.setdefault(name, deque(maxlen=LATENCY_WINDOW)).append(seconds)
+            counts = self._counts.setdefault(name, [0, 0])
+            counts[0] += 1
+            if not ok:
+                counts[1] += 1
+
+    def summary(self) -> Dict[str, Dict[str, Any]]:
+        with self._lock:
+            snapshot = {name: (sorted(s), list(self._counts[name])) for name, s in self._samples.items()}
+        out: Dict[str, Dict[str, Any]] = {}
+        for name, (samples, (count, errors)) in snapshot.items():
+            out[name] = {"count": count, "errors": errors}
+            for q in (50, 90, 99):
+                idx = min(len(samples) - 1, int(len(samples) * q / 100))
+                out[name][f"p{q}_ms"] = round(samples[idx] * 1000, 1)
+        return out
+
+
+class _Job:
+    __slots__ = ("kind", "manifest", "preset_name", "ids", "source_folder", "future")
+
+    def __init__(
+        self,
+        kind: str,
+        manifest: Optional[Manifest] = None,
+        preset_name: Optional[str] = None,
+        ids: Optional[IdAllocator] = None,
+        source_folder: Optional[str] = None,
+    ) -> None:
+        self.kind = kind
+        self.manifest = manifest
+        self.preset_name = preset_name
+        self.ids = ids
+        # 渲染目标是派生草稿（给出 output）时的源草稿，目标尚不存在时从它复制
+        self.source_folder = source_folder
+        self.future: Future = Future()
+
+
+class RenderService:
+    """常驻渲染服务的核心：按草稿排队，同一草稿的请求合并为一次写回，不同草稿并行处理。"""
+
+    def __init__(
+        self,
+        workers: Optional[int] = None,
+        max_drafts: int = DEFAULT_CACHE_DRAFTS,
+        max_mb: int = DEFAULT_CACHE_MB,
+    ) -> None:
+        self.cache = DraftCache(max_drafts, max_mb << 20)
+        self.latency = LatencyStats()
+        self._pool = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="render")
+        self._lock = threading.Lock()
+        self._queues: Dict[str, List[_Job]] = {}
+        self._active: Dict[str, int] = {}
+        self._batches = 0
+        self._coalesced = 0
+        self.started = time.time()
+
+    # ---- 提交 ----
+
+    def render(
+        self,
+        manifest_path: str,
+        preset_name: Optional[str] = None,
+        seed: Optional[int] = None,
+        reindex: bool = False,
+        output_dir: Optional[str] = None,
+    ) -> Dict[str, Any]:
+        """与 render_video 写入同一草稿（见 api.render_target）：自动选中的最新草稿是派生草稿时回到源草稿，
+        给出 output_dir 时写入 <output_dir>/<源草稿名>（首次从源草稿复制），源草稿不被修改。
+        """
+        manifest_path = os.path.abspath(manifest_path)
+        mf = load_manifest(manifest_path)
+        compile_templates(preset_name)
+        source_folder, folder = render_target(mf.get_draft_settings(), reindex, output_dir)
+        job = _Job("render", mf, preset_name, IdAllocator(seed, scope=manifest_path), source_folder)
+        return self._submit(os.path.join(folder, DRAFT_FILE), job)
+
+    def validate(self, draft_path: str) -> Dict[str, Any]:
+        draft_path = os.path.abspath(draft_path)
+        draft_content = draft_path if os.path.isfile(draft_path) else os.path.join(draft_path, "draft_content.json")
+        if not os.path.isfile(draft_content):
+            raise FileNotFoundError(f"未找到草稿: {draft_content}")
+        return self._submit(draft_content, _Job("validate"))
+
+    def _submit(self, draft_content: str, job: _Job) -> Dict[str, Any]:
+        with self._lock:
+            self._queues.setdefault(draft_content, []).append(job)
+            if draft_content not in self._active:
+                self._active[draft_content] = 0
+                self._pool.submit(self._drain, draft_content)
+        return job.future.result()
+
+    # ---- 处理 ----
+
+    def _drain(self, draft_content: str) -> None:
+        """串行处理某草稿的队列：每轮取走当前排队的全部请求，合并处理。"""
+        while True:
+            with self._lock:
+                jobs = self._queues.pop(draft_content, [])
+                if not jobs:
+                    del self._active[draft_content]
+                    return
+                self._active[draft_content] = len(jobs)
+            try:
+                self._run_batch(draft_content, jobs)
+            except BaseException as e:
+                for job in jobs:
+                    if not job.future.done():
+                        job.future.set_exception(e)
+                self.cache.discard(draft_content)
+
+    def _requeue(self, draft_content: str, jobs: List[_Job]) -> None:
+        with self._lock:
+            self._queues[draft_content] = jobs + self._queues.get(draft_content, [])
+
+    def _run_batch(self, draft_content: str, jobs: List[_Job]) -> None:
+        folder = os.path.dirname(draft_content)
+        renders = [j for j in jobs if j.kind == "render"]
+        with draft_lock(folder):
+            written = 0
+            if renders and not os.path.isfile(draft_content):
+                # 派生草稿尚不存在：从源草稿复制（与 render_video 的首次派生相同），整体写出
+                draft = derive_draft(renders[0].source_folder, folder, renders[0].preset_name)
+                mark = None
+            else:
+                draft = self.cache.get(draft_content)
+                if renders:
+                    for job in renders:
+                        backup = job.manifest.get_draft_settings().get("backup", {})
+                        if backup.get("enable") and backup.get("location"):
+                            # 同一批只需在改动前备份一次
+                            run_backup(folder, backup)
+                            break
+                    mark = None if sync.has_owned_tracks(draft) else draftio.AppendMark(draft_content, draft)
+            if renders:
+                # 各请求依次作用于同一份内存草稿，最后只写回一次
+                for i, job in enumerate(renders):
+                    try:
+                        if apply_manifest(job.manifest, draft, job.preset_name, job.ids)["rewritten"]:
+                            mark = None
+                    except Exception as e:
+                        # 内存草稿可能已被部分修改：丢弃后，其余请求重新排队、基于磁盘内容重做
+                        job.future.set_exception(e)
+                        self.cache.discard(draft_content)
+                        self._requeue(draft_content, [j for j in jobs if j is not job])
+                        return
+                written = write_rendered_draft(draft_content, draft, mark)
+                self.cache.put(draft_content, draft)
+                with self._lock:
+                    self._batches += 1
+                    self._coalesced += len(renders) - 1
+
+            for job in jobs:
+                if job.kind == "render":
+                    job.future.set_result(
+                        {"draft_folder": folder, "bytes_written": written, "coalesced": len(renders)}
+                    )
+                else:
+                    report = {"path": folder, "errors": []}
+                    job.future.set_result(inspect_loaded(draft, report))
+
+    # ---- 状态 ----
+
+    def metrics(self) -> Dict[str, Any]:
+        with self._lock:
+            queued = {path: len(jobs) for path, jobs in self._queues.items()}
+            in_flight = sum(self._active.values())
+            batches, coalesced = self._batches, self._coalesced
+        return {
+            "uptime_s": round(time.time() - self.started, 1),
+            "queue_depth": sum(queued.values()),
+            "in_flight": in_flight,
+            "queues": queued,
+            # 合并后的处理轮数（每轮至多写回一次）与被合并掉的请求数
+            "batches": batches,
+            "coalesced_requests": coalesced,
+            "requests": self.latency.summary(),
+            "cache": self.cache.stats(),
+        }
+
+    def close(self) -> None:
+        self._pool.shutdown(wait=True)
+
+
+class _Handler(BaseHTTPRequestHandler):
+    service: RenderService
+
+    def _send(self, status: int, payload: Dict[str, Any]) -> None:
+        body = json.dumps(payload, ensure_ascii=False).encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json; charset=utf-8")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def _call(self, name: str, fn: Callable[[], Dict[str, Any]]) -> None:
+        started = time.perf_counter()
+        try:
+            result, status = fn(), 200
+        except FileNotFoundError as e:
+            result, status = {"error": str(e)}, 404
+        except (ValueError, KeyError, TypeError) as e:
+            result, status = {"error": f"{type(e).__name__}: {e}"}, 400
+        except Exception as e:
+            result, status = {"error": f"{type(e).__name__}: {e}"}, 500
+        self.service.latency.record(name, time.perf_counter() - started, status == 200)
+        self._send(status, result)
+
+    def do_GET(self) -> None:
+        if self.path == "/metrics":
+            self._send(200, self.service.metrics())
+        elif self.path == "/health":
+            self._send(200, {"ok": True})
+        else:
+            self._send(404, {"error": f"未知路径: {self.path}"})
+
+    def do_POST(self) -> None:
+        length = int(self.headers.get("Content-Length") or 0)
+        try:
+            params = json.loads(self.rfile.read(length) or b"{}")
+            if not isinstance(params, dict):
+                raise ValueError("请求体必须是 JSON 对象")
+        except ValueError as e:
+            self._send(400, {"error": f"无法解析请求体: {e}"})
+            return
+
+        if self.path == "/render":
+            self._call(
+                "render",
+                lambda: self.service.render(
+                    params["manifest"],
+                    preset_name=params.get("preset"),
+                    seed=params.get("seed"),
+                    reindex=bool(params.get("reindex")),
+                    output_dir=params.get("output"),
+                ),
+            )
+        elif self.path == "/validate":
+            self._call("validate", lambda: self.service.validate(params["path"]))
+        else:
+            self._send(404, {"error": f"未知路径: {self.path}"})
+
+    def log_message(self, format: str, *args: Any) -> None:
+        # 默认每个请求一行日志，常驻服务中过于嘈杂
+        pass
+
+
+def serve(
+    host: str = DEFAULT_HOST,
+    port: int = DEFAULT_PORT,
+    workers: Optional[int] = None,
+    max_drafts: int = DEFAULT_CACHE_DRAFTS,
+    max_mb: int = DEFAULT_CACHE_MB,
+) -> None:
+    """启动本地 HTTP 服务，阻塞直到 Ctrl+C。"""
+    service = RenderService(workers, max_drafts, max_mb)
+    handler = type("Handler", (_Handler,), {"service": service})
+    server = ThreadingHTTPServer((host, port), handler)
+    server.daemon_threads = True
+    print(f"渲染服务已启动: http://{host}:{server.server_address[1]}（Ctrl+C 退出）")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        print("已停止服务")
+    finally:
+        server.server_close()
+        service.close()
+
+
+def main() -> None:
+    import argparse
+
+    parser = argparse.ArgumentParser(prog="python -m video_auto.service", description="常驻本地渲染服务")
+    parser.add_argument("--host", default=DEFAULT_HOST, help="监听地址，默认仅本机")
+    parser.add_argument("--port", type=int, default=DEFAULT_PORT, help="监听端口")
+    parser.add_argument("--workers", type=int, default=None, help="同时处理的草稿数上限")
+    parser.add_argument("--cache-drafts", type=int, default=DEFAULT_CACHE_DRAFTS, help="内存中最多缓存的草稿数")
+    parser.add_argument("--cache-mb", type=int, default=DEFAULT_CACHE_MB, help="草稿缓存的估算内存上限（MB）")
+    args = parser.parse_args()
+    serve(args.host, args.port, args.workers, args.cache_drafts, args.cache_mb)
+
+
+if __name__ == "__main__":
+    main()
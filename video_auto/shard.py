@@ -0,0 +1,381 @@
+import json
+import os
+import re
+import shutil
+import uuid
+from bisect import bisect_right
+from concurrent.futures import ProcessPoolExecutor
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+
+from . import draftcache, sync
+from .draftindex import DraftIndex
+from .draftio import atomic_write, prepare_draft_folder, write_draft
+from .ids import ID_NAMESPACE, IdAllocator
+from .lock import draft_lock
+from .model import compile_templates
+from .profiling import span
+from .subtitles import Cue
+from .timeline import TimelineBuilder
+
+SHARD_INDEX_NAME = "shard_index.json"
+
+# 分片时重建的本工具轨道（其余轨道按时间窗口切分后保留）
+_REBUILT_TRACKS = {sync.IMAGE_TRACK_ID, sync.EFFECT_TRACK_ID}
+
+
+def _timing_bounds(item: sync.TimingItem) -> Tuple[int, int]:
+    if isinstance(item, tuple):
+        return item[0], item[1]
+    start = sync.get_segment_start(item) or 0
+    duration = int((item.get("target_timerange") or {}).get("duration") or 0)
+    return start, start + duration
+
+
+def plan_shards(
+    timing: Sequence[sync.TimingItem],
+    max_duration: Optional[int] = None,
+    max_segments: Optional[int] = None,
+) -> List[int]:
+    """在字幕边界处切分时间线，返回各分片的起始时间（微秒，第一个恒为 0）。
+
+    timing 需按开始时间排序。贪心装箱：加入下一条字幕会使分片时长超过 max_duration、
+    或条目数超过 max_segments 时，从该字幕开始新分片；单条字幕本身超长时独占一个分片。
+    """
+    offsets = [0]
+    count = 0
+    for item in timing:
+        start, end = _timing_bounds(item)
+        if count and (
+            (max_segments and count >= max_segments) or (max_duration and end - offsets[-1] > max_duration)
+        ):
+            offsets.append(start)
+            count = 0
+        count += 1
+    return offsets
+
+
+def _shift_keyframes(seg: Dict[str, Any], trim: int, duration: int) -> None:
+    # 关键帧时间相对片段开头：裁掉开头后整体前移，丢弃落在片段外的关键帧
+    for group in seg.get("common_keyframes") or []:
+        group["keyframe_list"] = [
+            dict(kf, time_offset=kf["time_offset"] - trim)
+            for kf in group.get("keyframe_list") or []
+            if 0 <= kf.get("time_offset", 0) - trim <= duration
+        ]
+
+
+def _clip_segment(seg: Dict[str, Any], lo: int, hi: Optional[int]) -> Dict[str, Any]:
+    """把片段裁剪到 [lo, hi) 并平移到以 lo 为 0，返回新字典（不修改原片段）。"""
+    tt = seg.get("target_timerange") or {}
+    start = int(tt.get("start") or 0)
+    end = start + int(tt.get("duration") or 0)
+    new_start = max(start, lo)
+    new_end = end if hi is None else min(end, hi)
+    trim = new_start - start
+    duration = new_end - new_start
+    if trim == 0 and new_end == end:
+        clipped = dict(seg)
+    else:
+        clipped = json.loads(json.dumps(seg))
+        st = clipped.get("source_timerange")
+        if isinstance(st, dict) and tt.get("duration"):
+            # 按源/目标时长之比（即变速）换算源区间
+            ratio = int(st.get("duration") or 0) / int(tt["duration"])
+            st["start"] = int(st.get("start") or 0) + round(trim * ratio)
+            st["duration"] = round(duration * ratio)
+        if trim:
+            _shift_keyframes(clipped, trim, duration)
+    clipped["target_timerange"] = dict(tt, start=new_start - lo, duration=duration)
+    return clipped
+
+
+def _segment_refs(seg: Dict[str, Any]) -> List[Any]:
+    return [seg.get("material_id")] + list(seg.get("extra_material_refs") or [])
+
+
+def slice_draft(draft: Dict[str, Any], offsets: List[int], rebuilt: Sequence[str] = ()) -> List[Dict[str, Any]]:
+    """按分片起点把草稿切成多份，各自的片段平移到 t=0。
+
+    跨越分片边界的片段被裁成两段，分别落入相邻分片；rebuilt 中的轨道（由分片重新生成）被丢弃。
+    素材只保留被本分片片段引用的条目，从未被任何片段引用的素材原样保留在每个分片中。
+    """
+    n = len(offsets)
+    shard_tracks: List[List[Dict[str, Any]]] = [[] for _ in range(n)]
+    shard_refs: List[set] = [set() for _ in range(n)]
+    referenced: set = set()
+    for track in draft.get("tracks") or []:
+        if track.get("id") in rebuilt:
+            for seg in track.get("segments") or []:
+                referenced.update(_segment_refs(seg))
+            continue
+        parts: List[List[Dict[str, Any]]] = [[] for _ in range(n)]
+        for seg in track.get("segments") or []:
+            refs = _segment_refs(seg)
+            referenced.update(refs)
+            tt = seg.get("target_timerange") or {}
+            start = int(tt.get("start") or 0)
+            end = start + int(tt.get("duration") or 0)
+            k = max(bisect_right(offsets, start) - 1, 0)
+            while k < n:
+                hi = offsets[k + 1] if k + 1 < n else None
+                parts[k].append(_clip_segment(seg, offsets[k], hi))
+                shard_refs[k].update(refs)
+                if hi is None or end <= hi:
+                    break
+                k += 1
+        for k in range(n):
+            # 空轨道也保留，维持各分片轨道结构一致
+            shard_tracks[k].append(dict(track, segments=parts[k]))
+
+    shards: List[Dict[str, Any]] = []
+    materials = draft.get("materials") or {}
+    for k in range(n):
+        keep = shard_refs[k]
+        shard_materials = {
+            key: [m for m in value if m.get("id") not in referenced or m.get("id") in keep]
+            if isinstance(value, list)
+            else value
+            for key, value in materials.items()
+        }
+        shards.append(dict(draft, tracks=shard_tracks[k], materials=shard_materials))
+    return shards
+
+
+def shard_folder_name(source_folder: str, index: int) -> str:
+    return os.path.join(
+        os.path.dirname(os.path.abspath(source_folder)), f"{os.path.basename(source_folder)}_part{index + 1:02d}"
+    )
+
+
+def shard_source(folder: str) -> str:
+    """若 folder 是某次分片生成的草稿，返回其源草稿文件夹，否则原样返回。
+
+    分片刚写出时往往是“最新草稿”，重复分片时据此回到源草稿，避免对分片再分片。
+    """
+    folder = os.path.abspath(folder)
+    base, sep, part = os.path.basename(folder).rpartition("_part")
+    if not sep or not part.isdigit():
+        return folder
+    source = os.path.join(os.path.dirname(folder), base)
+    try:
+        with open(os.path.join(source, SHARD_INDEX_NAME), "r", encoding="utf-8") as f:
+            shards = json.load(f).get("shards") or []
+    except (OSError, ValueError):
+        return folder
+    return source if any(os.path.abspath(s.get("folder", "")) == folder for s in shards) else folder
+
+
+def _remove_stale_shards(source_folder: str, keep: Sequence[str]) -> List[str]:
+    """删除上次分片生成、本次不再需要的分片文件夹（如重新分片为更少的分片），返回删除的文件夹。
+
+    只删除旧的 shard_index.json 中记录、且位于源草稿旁并符合 <源草稿名>_partNN 命名的文件夹。
+    """
+    try:
+        with open(os.path.join(source_folder, SHARD_INDEX_NAME), "r", encoding="utf-8") as f:
+            old = json.load(f).get("shards") or []
+    except (OSError, ValueError, AttributeError):
+        return []
+    pattern = re.compile(re.escape(os.path.basename(source_folder)) + r"_part\d+")
+    keep_set = {os.path.abspath(k) for k in keep}
+    removed: List[str] = []
+    for entry in old:
+        folder = os.path.abspath(entry.get("folder") or "") if isinstance(entry, dict) else ""
+        if (
+            folder in keep_set
+            or os.path.dirname(folder) != os.path.dirname(source_folder)
+            or not pattern.fullmatch(os.path.basename(folder))
+            or not os.path.isdir(folder)
+        ):
+            continue
+        with draft_lock(folder):
+            shutil.rmtree(folder)
+        removed.append(folder)
+    return removed
+
+
+def _shard_timing(
+    shard: Dict[str, Any], cues: Optional[List[Cue]], index: Optional[DraftIndex] = None
+) -> Sequence[sync.TimingItem]:
+    return cues if cues is not None else sync.get_subtitle_segments_from_draft(shard, index)
+
+
+def _count_spans(timing: Sequence[sync.TimingItem], duration: int) -> int:
+    """分片中图片片段的个数，与 upsert_image_track 按同样规则切分。"""
+    builder = TimelineBuilder(
+        sync.get_subtitle_starts(timing), sync.MIN_IMAGE_DURATION_SECONDS * sync.MICROSECONDS, duration
+    )
+    return sum(1 for _ in builder.spans())
+
+
+def _build_shard(
+    shard: Dict[str, Any],
+    cues: Optional[List[Cue]],
+    text_track: bool,
+    image_files: List[str],
+    duration: int,
+    folder: str,
+    source_folder: str,
+    seed: Optional[int],
+    preset_name: Optional[str],
+    compact: bool = False,
+) -> Dict[str, Any]:
+    """子进程中生成单个分片：导入图片、铺设图片轨道（末张延伸到分片终点）并写出草稿。
+
+    image_files 已由父进程轮转，第一张即接着上一分片最后一张图片之后的那张。
+    """
+    path = os.path.join(folder, "draft_content.json")
+    draft_id = str(uuid.uuid5(ID_NAMESPACE, f"shard:{os.path.abspath(folder)}"))
+    if "id" in shard:
+        shard["id"] = draft_id
+    templates = compile_templates(preset_name)
+    ids = IdAllocator(seed, scope=os.path.abspath(path))
+
+    sync.ensure_materials(shard)
+    sync.ensure_tracks(shard)
+    index = DraftIndex(shard)
+    if cues is not None and text_track:
+        sync.upsert_text_track(shard, cues, templates, ids, index)
+    timing = _shard_timing(shard, cues, index)
+    image_materials = sync.import_images_or_placeholder(shard, image_files, templates, index)
+    image_track, created = sync.upsert_image_track(
+        shard, image_materials, timing, templates, end=duration, ids=ids, draft_index=index
+    )
+    sync.ensure_effect_track(shard, created, index)
+    compacted = sync.compact_generated(shard) if compact else None
+
+    with draft_lock(folder):
+        prepare_draft_folder(source_folder, folder, draft_id, skip=(SHARD_INDEX_NAME,))
+        written = write_draft(path, shard)
+    result = {
+        "folder": folder,
+        "subtitles": len(timing),
+        "segments": len(image_track["segments"]),
+        "bytes_written": written,
+        "draft_bytes": os.path.getsize(path),
+    }
+    if compacted is not None:
+        result["compact"] = compacted
+    return result
+
+
+def shard_draft(
+    draft_content: str,
+    images_dir: Optional[str] = None,
+    max_duration: Optional[int] = None,
+    max_segments: Optional[int] = None,
+    subtitle_file: Optional[str] = None,
+    text_track: bool = False,
+    seed: Optional[int] = None,
+    workers: Optional[int] = None,
+    preset_name: Optional[str] = None,
+    compact: bool = False,
+    recursive: bool = False,
+    include: Optional[Sequence[str]] = None,
+    exclude: Optional[Sequence[str]] = None,
+) -> Dict[str, Any]:
+    """把超长草稿在字幕边界处切成多个草稿（<源草稿名>_part01、_part02 ...），各自从 t=0 开始。
+
+    max_duration（微秒）与 max_segments（每个分片的字幕条数）至少给出一个。源草稿不会被修改；
+    各分片在子进程中并行生成，分片索引（各分片在原时间线上的偏移与时长）写入源草稿目录的
+    shard_index.json（原子替换），便于分别导出后按顺序拼接；重新分片为更少的分片时，
+    上次多出的分片文件夹会被删除。返回该索引。
+    """
+    if not max_duration and not max_segments:
+        raise ValueError("分片需要指定 max_duration 或 max_segments")
+    source_folder = os.path.dirname(os.path.abspath(draft_content))
+
+    with span("load_draft") as sp:
+        draft = draftcache.load_draft(draft_content)
+        sp.count("bytes", os.path.getsize(draft_content))
+    sync.ensure_tracks(draft)
+
+    rebuilt = set(_REBUILT_TRACKS)
+    cues: Optional[List[Cue]] = None
+    if subtitle_file:
+        cues = sync.load_subtitle_cues(subtitle_file)
+        timing: Sequence[sync.TimingItem] = cues
+        if text_track:
+            rebuilt.add(sync.TEXT_TRACK_ID)
+    else:
+        timing = sync.get_subtitle_segments_from_draft(draft)
+
+    with span("plan_shards") as sp:
+        offsets = plan_shards(timing, max_duration, max_segments)
+        shards = slice_draft(draft, offsets, tuple(rebuilt))
+        sp.count("shards", len(offsets))
+
+    # 分片终点：下一分片起点；最后一个分片取字幕与保留片段的最晚结束时间
+    content_end = max((_timing_bounds(item)[1] for item in timing), default=0)
+    content_end = max(content_end, offsets[-1] + DraftIndex(shards[-1]).end_time())
+    ends = offsets[1:] + [max(content_end, offsets[-1])]
+
+    shard_cues: List[Optional[List[Cue]]] = [None] * len(offsets)
+    if cues is not None:
+        for k, lo in enumerate(offsets):
+            hi = ends[k] if k + 1 < len(offsets) else None
+            shard_cues[k] = [
+                (max(s, lo) - lo, (e if hi is None else min(e, hi)) - lo, text)
+                for s, e, text in cues
+                if s >= lo and (hi is None or s < hi)
+            ]
+
+    with span("find_images") as sp:
+        image_files = sync.find_images_in_folder(images_dir, recursive, include, exclude)
+        sp.count("images", len(image_files))
+
+    # 图片在整条时间线上连续轮换：每个分片从前面各分片片段总数（对图片数取模）处开始，
+    # 而不是都从第一张开始
+    image_offsets = [0] * len(offsets)
+    if image_files:
+        with span("image_offsets"):
+            spans = 0
+            for k in range(len(offsets)):
+                image_offsets[k] = spans % len(image_files)
+                spans += _count_spans(_shard_timing(shards[k], shard_cues[k]), ends[k] - offsets[k])
+
+    folders = [shard_folder_name(source_folder, k) for k in range(len(offsets))]
+    with span("build_shards") as sp:
+        with ProcessPoolExecutor(max_workers=workers) as pool:
+            futures = [
+                pool.submit(
+                    _build_shard,
+                    shards[k],
+                    shard_cues[k],
+                    text_track,
+                    image_files[image_offsets[k] :] + image_files[: image_offsets[k]],
+                    ends[k] - offsets[k],
+                    folders[k],
+                    source_folder,
+                    seed,
+                    preset_name,
+                    compact,
+                )
+                for k in range(len(offsets))
+            ]
+            results = [fut.result() for fut in futures]
+        sp.count("shards", len(results))
+
+    index = {
+        "source": os.path.abspath(draft_content),
+        "max_duration": max_duration,
+        "max_segments": max_segments,
+        "total_duration": ends[-1],
+        "shards": [
+            dict(
+                results[k],
+                index=k + 1,
+                offset=offsets[k],
+                duration=ends[k] - offsets[k],
+                image_offset=image_offsets[k],
+            )
+            for k in range(len(offsets))
+        ],
+    }
+    # 先删除旧索引中多出来的分片，再原子替换索引：中途失败时旧索引仍能找到它们
+    with span("remove_stale_shards") as sp:
+        sp.count("removed", len(_remove_stale_shards(source_folder, folders)))
+    atomic_write(
+        os.path.join(source_folder, SHARD_INDEX_NAME),
+        [json.dumps(index, ensure_ascii=False, indent=2).encode("utf-8")],
+    )
+    return index
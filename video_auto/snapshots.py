@@ -0,0 +1,274 @@
+import hashlib
+import json
+import os
+import shutil
+import zlib
+from concurrent.futures import Future, ThreadPoolExecutor
+from datetime import datetime, timedelta
+from typing import Any, ContextManager, Dict, Iterator, List, Optional, Set
+
+from .draftio import atomic_write
+from .lock import file_lock
+
+# 固定大小分块：未改动的文件块在快照之间共享
+CHUNK_SIZE = 4 * 1024 * 1024
+DEFAULT_COMPRESS_WORKERS = 4
+# 同时在途的压缩任务上限，避免大文件把所有分块一次性读入内存
+_MAX_IN_FLIGHT = 16
+
+
+def _objects_dir(location: str) -> str:
+    return os.path.join(location, "objects")
+
+
+def _snapshots_dir(location: str) -> str:
+    return os.path.join(location, "snapshots")
+
+
+def _object_path(location: str, digest: str) -> str:
+    return os.path.join(_objects_dir(location), digest[:2], digest)
+
+
+def _store_lock(location: str) -> ContextManager[None]:
+    """仓库级锁：分块在快照 JSON 写入之前就已落盘（或因已存在而被跳过），
+    若此时另一进程按现有快照回收分块，会删掉新快照即将引用的分块。
+    创建、还原与清理快照都在该锁内进行；草稿锁是按草稿的，无法覆盖共享分块。
+    """
+    os.makedirs(location, exist_ok=True)
+    return file_lock(os.path.join(location, ".lock"))
+
+
+def _store_chunk(location: str, digest: str, data: bytes) -> None:
+    path = _object_path(location, digest)
+    if os.path.exists(path):
+        return
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    atomic_write(path, [zlib.compress(data, 6)])
+
+
+def _iter_files(src: str, exclude: Optional[str]) -> Iterator[str]:
+    for dirpath, dirnames, filenames in os.walk(src):
+        if exclude:
+            dirnames[:] = [d for d in dirnames if os.path.abspath(os.path.join(dirpath, d)) != exclude]
+        dirnames.sort()
+        for name in sorted(filenames):
+            if name.startswith(".draft_") and name.endswith(".tmp"):
+                continue  # 草稿写入过程中的临时文件
+            path = os.path.join(dirpath, name)
+            if os.path.isfile(path) and not os.path.islink(path):
+                yield path
+
+
+def list_snapshots(location: str, source: Optional[str] = None) -> List[Dict[str, Any]]:
+    """列出快照（按创建时间升序）；可按源草稿目录过滤。"""
+    folder = _snapshots_dir(location)
+    if not os.path.isdir(folder):
+        return []
+    source = os.path.abspath(source) if source else None
+    snapshots: List[Dict[str, Any]] = []
+    for name in sorted(os.listdir(folder)):
+        if not name.endswith(".json"):
+            continue
+        try:
+            with open(os.path.join(folder, name), "r", encoding="utf-8") as f:
+                snap = json.load(f)
+        except (OSError, ValueError):
+            continue
+        if source and snap.get("source") != source:
+            continue
+        snapshots.append(snap)
+    snapshots.sort(key=lambda s: s.get("created", ""))
+    return snapshots
+
+
+def load_snapshot(location: str, snapshot_id: str) -> Dict[str, Any]:
+    path = os.path.join(_snapshots_dir(location), f"{snapshot_id}.json")
+    if not os.path.exists(path):
+        raise FileNotFoundError(f"未找到快照: {snapshot_id}")
+    with open(path, "r", encoding="utf-8") as f:
+        return json.load(f)
+
+
+def snapshot_draft(src: str, location: str, workers: int = DEFAULT_COMPRESS_WORKERS) -> str:
+    """为草稿目录创建一个增量快照，返回快照 id。
+
+    文件按固定大小分块并以 blake2b 内容寻址；与上一个快照相比大小与 mtime 未变的文件
+    直接复用其分块列表，无需重新读取；新分块在线程池中并行压缩写入。
+    """
+    src = os.path.abspath(src)
+    location = os.path.abspath(location)
+    os.makedirs(_snapshots_dir(location), exist_ok=True)
+
+    with _store_lock(location):
+        return _snapshot_locked(src, location, workers)
+
+
+def _snapshot_locked(src: str, location: str, workers: int) -> str:
+    previous: Dict[str, Dict[str, Any]] = {}
+    history = list_snapshots(location, source=src)
+    if history:
+        previous = {f["path"]: f for f in history[-1].get("files", [])}
+
+    exclude = location if location.startswith(src + os.sep) else None
+    files: List[Dict[str, Any]] = []
+    written = 0
+    with ThreadPoolExecutor(max_workers=workers) as pool:
+        in_flight: List[Future] = []
+        for path in _iter_files(src, exclude):
+            rel = os.path.relpath(path, src).replace(os.sep, "/")
+            st = os.stat(path)
+            prev = previous.get(rel)
+            if prev and prev.get("size") == st.st_size and prev.get("mtime_ns") == st.st_mtime_ns:
+                files.append(prev)
+                continue
+
+            chunks: List[str] = []
+            with open(path, "rb") as f:
+                for data in iter(lambda: f.read(CHUNK_SIZE), b""):
+                    digest = hashlib.blake2b(data, digest_size=20).hexdigest()
+                    chunks.append(digest)
+                    if os.path.exists(_object_path(location, digest)):
+                        continue
+                    written += len(data)
+                    in_flight.append(pool.submit(_store_chunk, location, digest, data))
+                    if len(in_flight) >= _MAX_IN_FLIGHT:
+                        in_flight.pop(0).result()
+            files.append({"path": rel, "size": st.st_size, "mtime_ns": st.st_mtime_ns, "chunks": chunks})
+        for fut in in_flight:
+            fut.result()
+
+    now = datetime.now()
+    snapshot_id = now.strftime("%Y%m%d_%H%M%S_%f")
+    snap = {
+        "id": snapshot_id,
+        "created": now.isoformat(timespec="seconds"),
+        "source": src,
+        "total_size": sum(f["size"] for f in files),
+        "new_bytes": written,
+        "files": files,
+    }
+    data = json.dumps(snap, ensure_ascii=False).encode("utf-8")
+    atomic_write(os.path.join(_snapshots_dir(location), f"{snapshot_id}.json"), [data])
+    return snapshot_id
+
+
+def restore_snapshot(location: str, snapshot_id: str, dest: Optional[str] = None) -> str:
+    """把快照还原到 dest（默认还原到原草稿目录），逐文件原子替换；快照中不存在的文件保持不动。"""
+    with _store_lock(location):
+        return _restore_locked(location, snapshot_id, dest)
+
+
+def _restore_locked(location: str, snapshot_id: str, dest: Optional[str]) -> str:
+    snap = load_snapshot(location, snapshot_id)
+    dest = os.path.abspath(dest or snap["source"])
+    for entry in snap.get("files", []):
+        target = os.path.join(dest, *entry["path"].split("/"))
+        os.makedirs(os.path.dirname(target), exist_ok=True)
+
+        def chunks(entry: Dict[str, Any] = entry) -> Iterator[bytes]:
+            for digest in entry["chunks"]:
+                with open(_object_path(location, digest), "rb") as f:
+                    yield zlib.decompress(f.read())
+
+        atomic_write(target, chunks())
+        os.utime(target, ns=(entry["mtime_ns"], entry["mtime_ns"]))
+    return dest
+
+
+def prune_snapshots(
+    location: str,
+    keep_last: Optional[int] = None,
+    keep_days: Optional[int] = None,
+    source: Optional[str] = None,
+) -> List[str]:
+    """按保留策略删除旧快照，并清理不再被任何快照引用的分块。返回被删除的快照 id。
+
+    keep_last：每个源草稿保留最近 N 个；keep_days：保留最近 N 天内的快照。两者同时给出时满足其一即保留。
+    """
+    if keep_last is None and keep_days is None:
+        return []
+    with _store_lock(location):
+        return _prune_locked(location, keep_last, keep_days, source)
+
+
+def _prune_locked(
+    location: str, keep_last: Optional[int], keep_days: Optional[int], source: Optional[str]
+) -> List[str]:
+    snapshots = list_snapshots(location)
+    by_source: Dict[str, List[Dict[str, Any]]] = {}
+    for snap in snapshots:
+        by_source.setdefault(snap.get("source", ""), []).append(snap)
+
+    cutoff = (datetime.now() - timedelta(days=keep_days)).isoformat(timespec="seconds") if keep_days else None
+    target_source = os.path.abspath(source) if source else None
+    removed: List[str] = []
+    for src, snaps in by_source.items():
+        if target_source and src != target_source:
+            continue
+        for i, snap in enumerate(snaps):
+            recent = keep_last is not None and i >= len(snaps) - keep_last
+            fresh = cutoff is not None and snap.get("created", "") >= cutoff
+            if not (recent or fresh):
+                os.remove(os.path.join(_snapshots_dir(location), f"{snap['id']}.json"))
+                removed.append(snap["id"])
+
+    if removed:
+        _collect_garbage(location)
+    return removed
+
+
+def _collect_garbage(location: str) -> None:
+    live: Set[str] = set()
+    for snap in list_snapshots(location):
+        for entry in snap.get("files", []):
+            live.update(entry.get("chunks", []))
+    objects = _objects_dir(location)
+    if not os.path.isdir(objects):
+        return
+    for prefix in os.listdir(objects):
+        folder = os.path.join(objects, prefix)
+        for digest in os.listdir(folder):
+            if digest not in live:
+                os.remove(os.path.join(folder, digest))
+        if not os.listdir(folder):
+            shutil.rmtree(folder, ignore_errors=True)
+
+
+def main() -> None:
+    import argparse
+
+    parser = argparse.ArgumentParser(prog="python -m video_auto.snapshots", description="草稿快照管理")
+    parser.add_argument("location", help="快照仓库目录（manifest 中的 draft_settings.backup.location）")
+    sub = parser.add_subparsers(dest="command", required=True)
+
+    p_list = sub.add_parser("list", help="列出快照")
+    p_list.add_argument("--source", default=None, help="只列出指定草稿目录的快照")
+
+    p_restore = sub.add_parser("restore", help="还原快照")
+    p_restore.add_argument("snapshot", help="快照 id")
+    p_restore.add_argument("--to", default=None, help="还原目标目录，默认还原到原草稿目录")
+
+    p_prune = sub.add_parser("prune", help="按保留策略清理旧快照")
+    p_prune.add_argument("--keep", type=int, default=None, help="每个草稿保留最近 N 个快照")
+    p_prune.add_argument("--keep-days", type=int, default=None, help="保留最近 N 天内的快照")
+    p_prune.add_argument("--source", default=None, help="只清理指定草稿目录的快照")
+
+    args = parser.parse_args()
+    if args.command == "list":
+        for snap in list_snapshots(args.location, source=args.source):
+            print(
+                f"{snap['id']}  {snap.get('created', '')}  文件 {len(snap.get('files', []))}  "
+                f"总大小 {snap.get('total_size', 0)}  新增 {snap.get('new_bytes', 0)}  {snap.get('source', '')}"
+            )
+    elif args.command == "restore":
+        dest = restore_snapshot(args.location, args.snapshot, args.to)
+        print(f"已还原快照 {args.snapshot} 到: {dest}")
+    elif args.command == "prune":
+        if args.keep is None and args.keep_days is None:
+            parser.error("prune 需要 --keep 或 --keep-days")
+        removed = prune_snapshots(args.location, keep_last=args.keep, keep_days=args.keep_days, source=args.source)
+        print(f"已删除 {len(removed)} 个快照")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,106 @@
+import json
+import os
+import threading
+from collections import OrderedDict
+from typing import Any, Dict, Optional, Tuple
+
+from . import paths
+from .draftio import atomic_write
+
+# 每个缓存最多保留的条目数（内存与缓存文件同一上限），超出时淘汰最久未使用的条目；
+# 常驻进程（监听模式、渲染服务）持续处理新文件时内存不会无限增长
+DEFAULT_MAX_ENTRIES = 20_000
+
+_MISSING = object()
+_shared: Dict[str, "StatCache"] = {}
+_shared_lock = threading.Lock()
+
+
+def file_identity(path: str) -> Optional[Tuple[int, int]]:
+    """文件身份：(大小, 修改时间 ns)；文件不存在时返回 None。"""
+    try:
+        st = os.stat(path)
+    except OSError:
+        return None
+    return st.st_size, st.st_mtime_ns
+
+
+class StatCache:
+    """按 路径 + 大小 + mtime 失效的持久化结果缓存（JSON 文件，位于缓存目录）。
+
+    用于图片/音频探测等“同一文件结果不变”的场景；线程安全，save() 原子写回。
+    条目数超过 max_entries 时按 LRU 淘汰。
+    """
+
+    def __init__(self, name: str, cache_dir: Optional[str] = None, max_entries: int = DEFAULT_MAX_ENTRIES) -> None:
+        self.path = os.path.join(cache_dir or paths.get_cache_dir(), f"{name}.json")
+        self.max_entries = max_entries
+        self._lock = threading.Lock()
+        self._entries: "OrderedDict[str, Dict[str, Any]]" = OrderedDict()
+        self._dirty = False
+        try:
+            with open(self.path, "r", encoding="utf-8") as f:
+                data = json.load(f)
+            if isinstance(data, dict):
+                self._entries.update(data)
+                self._dirty = self._evict()
+        except (OSError, ValueError):
+            pass
+
+    def _evict(self) -> bool:
+        """淘汰超出上限的最久未使用条目（调用方持有锁或尚未共享），返回是否有淘汰。"""
+        evicted = False
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+            evicted = True
+        return evicted
+
+    def get(self, path: str, default: Any = None) -> Any:
+        key = os.path.abspath(path)
+        ident = file_identity(key)
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                self._entries.move_to_end(key)
+        if entry is None or ident is None or [entry.get("size"), entry.get("mtime_ns")] != list(ident):
+            return default
+        return entry.get("value")
+
+    def lookup(self, path: str) -> Tuple[bool, Any]:
+        """返回 (是否命中, 值)，用于区分“未缓存”和“缓存值为 None”。"""
+        value = self.get(path, _MISSING)
+        return (False, None) if value is _MISSING else (True, value)
+
+    def put(self, path: str, value: Any) -> None:
+        key = os.path.abspath(path)
+        ident = file_identity(key)
+        if ident is None:
+            return
+        with self._lock:
+            self._entries[key] = {"size": ident[0], "mtime_ns": ident[1], "value": value}
+            self._entries.move_to_end(key)
+            self._evict()
+            self._dirty = True
+
+    def save(self) -> None:
+        with self._lock:
+            if not self._dirty:
+                return
+            data = json.dumps(self._entries, ensure_ascii=False).encode("utf-8")
+            self._dirty = False
+        os.makedirs(os.path.dirname(self.path), exist_ok=True)
+        atomic_write(self.path, [data])
+
+
+def shared_cache(name: str, max_entries: int = DEFAULT_MAX_ENTRIES) -> StatCache:
+    """进程内共享的缓存实例（按缓存目录区分）。
+
+    常驻进程（监听模式、渲染服务）中各次调用复用同一份内存数据，无需重复读取缓存文件；
+    max_entries 在首次创建时生效，限制其内存占用。
+    """
+    key = os.path.join(paths.get_cache_dir(), name)
+    with _shared_lock:
+        cache = _shared.get(key)
+        if cache is None:
+            cache = _shared[key] = StatCache(name, max_entries=max_entries)
+    return cache
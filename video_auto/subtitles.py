@@ -0,0 +1,122 @@
+import html
+import os
+import re
+from typing import Iterable, Iterator, List, Optional, Tuple
+
+# (开始, 结束, 文本)，时间单位微秒
+Cue = Tuple[int, int, str]
+
+SUBTITLE_EXTENSIONS = (".srt", ".vtt", ".ass", ".ssa")
+
+# SRT 与 WebVTT 的时间行：小时可省略（VTT），毫秒分隔符为 , 或 .，其后可跟 VTT 的 cue 设置
+_TIMING = re.compile(
+    r"\s*(?:(\d+):)?(\d{1,2}):(\d{2})[,.](\d{1,3})\s*-->\s*(?:(\d+):)?(\d{1,2}):(\d{2})[,.](\d{1,3})"
+)
+_TAG = re.compile(r"<[^>]*>")
+_ASS_OVERRIDE = re.compile(r"\{[^}]*\}")
+_VTT_BLOCKS = ("NOTE", "STYLE", "REGION")
+
+
+def _us(h: Optional[str], m: str, s: str, frac: str) -> int:
+    ms = int(frac.ljust(3, "0"))
+    return (((int(h) if h else 0) * 60 + int(m)) * 60 + int(s)) * 1_000_000 + ms * 1000
+
+
+def _clean(text: str) -> str:
+    # 大多数字幕不含标签/实体，先做廉价判断
+    if "<" in text:
+        text = _TAG.sub("", text)
+    if "&" in text:
+        text = html.unescape(text)
+    return text
+
+
+def iter_timed_blocks(lines: Iterable[str]) -> Iterator[Cue]:
+    """SRT / WebVTT 通用解析：时间行开始一条字幕，直到空行结束。
+
+    序号行与 VTT 的 cue 标识不含时间行，自然被跳过；NOTE/STYLE/REGION 块整体跳过到空行。
+    """
+    start = end = 0
+    text: List[str] = []
+    in_cue = False
+    in_skip = False
+    for line in lines:
+        line = line.rstrip("\r\n")
+        if in_cue:
+            if line.strip():
+                text.append(line)
+                continue
+            yield start, end, _clean("\n".join(text))
+            in_cue = False
+            continue
+        if in_skip:
+            in_skip = bool(line.strip())
+            continue
+        if line.startswith(_VTT_BLOCKS):
+            in_skip = True
+            continue
+        if "-->" not in line:
+            continue
+        m = _TIMING.match(line)
+        if m is None:
+            continue
+        g = m.groups()
+        start = _us(g[0], g[1], g[2], g[3])
+        end = max(start, _us(g[4], g[5], g[6], g[7]))
+        text = []
+        in_cue = True
+    if in_cue:
+        yield start, end, _clean("\n".join(text))
+
+
+def _ass_time(value: str) -> int:
+    # H:MM:SS.cc
+    h, m, s = value.strip().split(":")
+    sec, _, frac = s.partition(".")
+    return _us(h, m, sec, frac[:3])
+
+
+def iter_ass(lines: Iterable[str]) -> Iterator[Cue]:
+    """ASS/SSA：只解析 [Events] 段的 Dialogue 行，字段顺序取自 Format 行。"""
+    in_events = False
+    fields: List[str] = []
+    for line in lines:
+        line = line.strip()
+        if line.startswith("["):
+            in_events = line.lower() == "[events]"
+            continue
+        if not in_events:
+            continue
+        if line.startswith("Format:"):
+            fields = [f.strip().lower() for f in line[7:].split(",")]
+            continue
+        if not line.startswith("Dialogue:") or not fields:
+            continue
+        # Text 是最后一个字段，其中可能含逗号
+        parts = line[9:].split(",", len(fields) - 1)
+        if len(parts) != len(fields):
+            continue
+        try:
+            start = _ass_time(parts[fields.index("start")])
+            end = _ass_time(parts[fields.index("end")])
+        except ValueError:
+            continue
+        text = parts[-1]
+        if "{" in text:
+            text = _ASS_OVERRIDE.sub("", text)
+        if "\\" in text:
+            text = text.replace("\\N", "\n").replace("\\n", "\n").replace("\\h", " ")
+        yield start, max(start, end), text
+
+
+def iter_cues(path: str) -> Iterator[Cue]:
+    """逐行流式解析字幕文件（SRT / WebVTT / ASS / SSA，按扩展名识别），产出 (开始, 结束, 文本)。
+
+    不把整个文件读入内存；ASS 中的条目可能未按时间排序，需要时由调用方排序。
+    """
+    ext = os.path.splitext(path)[1].lower()
+    if ext not in SUBTITLE_EXTENSIONS:
+        raise ValueError(f"不支持的字幕格式: {path}（支持 {', '.join(SUBTITLE_EXTENSIONS)}）")
+    parse = iter_ass if ext in (".ass", ".ssa") else iter_timed_blocks
+    with open(path, "r", encoding="utf-8-sig", errors="replace") as f:
+        yield from parse(f)
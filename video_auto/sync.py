@@ -1,15 +1,59 @@
 import os
-import json
 import uuid
-import random
-from glob import glob
-from datetime import datetime
-from typing import Any, Dict, List, Optional
+from typing import Any, Dict, Iterable, Iterator, List, Optional, Sequence, Tuple, Union
+
+from .audioprobe import probe_audios
+from .compact import compact_draft
+from . import draftcache
+from .draftindex import DraftIndex
+from .draftio import AppendMark, write_draft
+from .ducking import build_envelope, ducking_settings, slice_envelope
+from .ids import ID_NAMESPACE as _ID_NAMESPACE, IdAllocator
+from .imageprobe import probe_images
+from .imagescan import iter_images
+from .locator import find_latest_draft
+from .materials import MaterialIndex
+from .model import (
+    Animation,
+    AudioMaterial,
+    AudioSegment,
+    Envelope,
+    Keyframe,
+    Material,
+    DEFAULT_MOTION_AMPLITUDE,
+    Segment,
+    Templates,
+    TextMaterial,
+    TextSegment,
+    compile_templates,
+)
+from .profiling import span
+from .subtitles import Cue, iter_cues
+from .timeline import TimelineBuilder
 
 # 最小图片展示时间（秒）
 MIN_IMAGE_DURATION_SECONDS = 5
 MICROSECONDS = 1_000_000
 
+# 本工具创建的轨道与素材使用固定/可推导的 id 作为标记，重复运行时据此定位并增量更新
+IMAGE_TRACK_ID = str(uuid.uuid5(_ID_NAMESPACE, "track:image"))
+EFFECT_TRACK_ID = str(uuid.uuid5(_ID_NAMESPACE, "track:effect"))
+NARRATION_TRACK_ID = str(uuid.uuid5(_ID_NAMESPACE, "track:narration"))
+BGM_TRACK_ID = str(uuid.uuid5(_ID_NAMESPACE, "track:bgm"))
+TEXT_TRACK_ID = str(uuid.uuid5(_ID_NAMESPACE, "track:text"))
+PLACEHOLDER_MATERIAL_ID = str(uuid.uuid5(_ID_NAMESPACE, "image:placeholder"))
+
+# 压缩输出时处理的本工具轨道：轨道 id -> (片段模板, 素材列表, 素材模板)
+OWNED_TRACK_TEMPLATES = {
+    IMAGE_TRACK_ID: ("segment", "videos", "material"),
+    TEXT_TRACK_ID: ("text_segment", "texts", "text_material"),
+    NARRATION_TRACK_ID: ("audio_segment", "audios", "audio_material"),
+    BGM_TRACK_ID: ("audio_segment", "audios", "audio_material"),
+}
+
+# 时间基准条目：草稿中的片段，或字幕文件中的 (开始, 结束, 文本)
+TimingItem = Union[Dict[str, Any], Cue]
+
 
 def microsec_to_time(microseconds: int) -> str:
     """将微秒转换为 MM:SS:MS 字符串"""
@@ -24,44 +68,73 @@ def format_duration(microseconds: int) -> str:
     return f"{microseconds / MICROSECONDS:.2f}秒"
 
 
-def get_latest_draft_folder() -> str:
+def get_latest_draft_folder(reindex: bool = False) -> str:
     """获取最新的剪映草稿文件夹。
 
     默认搜索路径（可根据实际系统调整）:
     ~/Desktop/Youtube/剪映draft/JianyingPro Drafts/*/draft_content.json
+    查找通过持久化的草稿位置索引完成，reindex=True 时强制重建索引。
     """
-    draft_pattern = os.path.expanduser(
-        "~/Desktop/Youtube/剪映draft/JianyingPro Drafts/*/draft_content.json"
-    )
-    draft_files = glob(draft_pattern)
-    if not draft_files:
+    draft_root = os.path.expanduser("~/Desktop/Youtube/剪映draft/JianyingPro Drafts")
+    latest_draft_file = find_latest_draft(draft_root, reindex=reindex, max_depth=0)
+    if not latest_draft_file:
         raise FileNotFoundError("未找到剪映草稿文件。请检查草稿存放路径。")
-    latest_draft_file = max(draft_files, key=os.path.getmtime)
     return os.path.dirname(latest_draft_file)
 
 
-def find_images_in_folder(folder_path: Optional[str] = None) -> List[str]:
-    """在指定文件夹中查找图片文件，若未提供则搜索默认目录与当前目录。
+DEFAULT_IMAGES_DIR = os.path.expanduser("~/Desktop/Youtube/images")
+
 
-    支持扩展名：jpg、jpeg、png、gif、webp
+def iter_images_in_folder(
+    folder_path: Optional[str] = None,
+    recursive: bool = False,
+    include: Optional[Sequence[str]] = None,
+    exclude: Optional[Sequence[str]] = None,
+) -> Iterator[str]:
+    """按自然顺序逐个产出图片路径（见 imagescan.iter_images），未提供目录时使用默认目录；
+    目录中没有图片时改为搜索当前模块所在目录。
+
+    支持扩展名（不区分大小写）：jpg、jpeg、png、gif、webp
     """
-    if folder_path is None:
-        folder_path = os.path.expanduser("~/Desktop/Youtube/images")
+    found = False
+    for path in iter_images(folder_path or DEFAULT_IMAGES_DIR, recursive, include, exclude):
+        found = True
+        yield path
+    if not found:
+        yield from iter_images(os.path.dirname(os.path.abspath(__file__)), include=include, exclude=exclude)
+
+
+def find_images_in_folder(
+    folder_path: Optional[str] = None,
+    recursive: bool = False,
+    include: Optional[Sequence[str]] = None,
+    exclude: Optional[Sequence[str]] = None,
+) -> List[str]:
+    """在指定文件夹中查找图片文件，返回列表；参数见 iter_images_in_folder。"""
+    return list(iter_images_in_folder(folder_path, recursive, include, exclude))
+
+
+def image_material_id(image_file: str) -> str:
+    """同一路径的图片始终得到同一个素材 id。"""
+    return str(uuid.uuid5(_ID_NAMESPACE, "image:" + os.path.abspath(image_file)))
 
-    image_extensions = ["jpg", "jpeg", "png", "gif", "webp"]
 
-    image_files: List[str] = []
-    for ext in image_extensions:
-        pattern = os.path.join(folder_path, f"*.{ext}")
-        image_files.extend(glob(pattern))
+def audio_material_id(audio_file: str) -> str:
+    return str(uuid.uuid5(_ID_NAMESPACE, "audio:" + os.path.abspath(audio_file)))
 
-    if not image_files:
-        current_folder = os.path.dirname(os.path.abspath(__file__))
-        for ext in image_extensions:
-            pattern = os.path.join(current_folder, f"*.{ext}")
-            image_files.extend(glob(pattern))
 
-    return image_files
+def text_material_id(start: int, end: int, text: str) -> str:
+    """字幕文本素材 id 由时间与内容推导，内容不变的条目重复运行时保持同一 id。"""
+    return str(uuid.uuid5(_ID_NAMESPACE, f"text:{start}:{end}:{text}"))
+
+
+def is_owned_material(material: Dict[str, Any]) -> bool:
+    """素材是否由本工具导入（占位图，或 id 由路径推导的图片/音频素材）。"""
+    mid = material.get("id")
+    if mid == PLACEHOLDER_MATERIAL_ID:
+        return True
+    path = material.get("path")
+    return bool(path) and (mid == image_material_id(path) or mid == audio_material_id(path))
 
 
 def ensure_materials(draft: Dict[str, Any]) -> None:
@@ -73,156 +146,188 @@ def ensure_materials(draft: Dict[str, Any]) -> None:
         draft["materials"]["material_animations"] = []
 
 
-def import_images_to_draft(draft: Dict[str, Any], image_files: List[str]) -> List[Dict[str, Any]]:
-    """将图片作为 photo 类型素材导入到 materials.videos 中，返回导入的素材列表。"""
-    ensure_materials(draft)
+def _collecting(items: Iterable[str], out: List[str]) -> Iterator[str]:
+    for item in items:
+        out.append(item)
+        yield item
 
-    image_materials: List[Dict[str, Any]] = []
-    for image_file in image_files:
-        image_id = str(uuid.uuid4())
-        file_name = os.path.basename(image_file)
-
-        image_material = {
-            "aigc_type": "none",
-            "audio_fade": None,
-            "cartoon_path": "",
-            "category_id": "",
-            "category_name": "",
-            "check_flag": 0,
-            "crop": {
-                "lower_left_x": 0.0,
-                "lower_left_y": 1.0,
-                "lower_right_x": 1.0,
-                "lower_right_y": 1.0,
-                "upper_left_x": 0.0,
-                "upper_left_y": 0.0,
-                "upper_right_x": 1.0,
-                "upper_right_y": 0.0,
-            },
-            "crop_ratio": "free",
-            "crop_scale": 1.0,
-            "duration": 0,
-            "formula_id": "",
-            "freeze": None,
-            "has_audio": False,
-            "height": 1080,
-            "id": image_id,
-            "intensifies_audio_path": "",
-            "intensifies_path": "",
-            "is_ai_generate_content": False,
-            "is_copyright": False,
-            "is_text_edit_overdub": False,
-            "is_unified_beauty_mode": False,
-            "local_id": "",
-            "local_material_id": "",
-            "material_id": "",
-            "material_name": file_name,
-            "material_url": "",
-            "matting": {
-                "flag": 0,
-                "has_use_quick_brush": False,
-                "has_use_quick_eraser": False,
-                "interactiveTime": [],
-                "path": "",
-                "strokes": [],
-            },
-            "media_path": "",
-            "object_locked": None,
-            "origin_material_id": "",
-            "path": image_file,
-            "picture_from": "none",
-            "picture_set_category_id": "",
-            "picture_set_category_name": "",
-            "request_id": "",
-            "reverse_intensifies_path": "",
-            "reverse_path": "",
-            "smart_motion": None,
-            "source": 0,
-            "source_platform": 0,
-            "stable": {
-                "matrix_path": "",
-                "stable_level": 0,
-                "time_range": {"duration": 0, "start": 0},
-            },
-            "team_id": "",
-            "type": "photo",
-            "video_algorithm": {
-                "algorithms": [],
-                "complement_frame_config": None,
-                "deflicker": None,
-                "gameplay_configs": [],
-                "motion_blur_config": None,
-                "noise_reduction": None,
-                "path": "",
-                "quality_enhance": None,
-                "time_range": None,
-            },
-            "width": 1920,
-        }
-        draft["materials"]["videos"].append(image_material)
-        image_materials.append(image_material)
 
-    return image_materials
+def import_images_to_draft(
+    draft: Dict[str, Any],
+    image_files: Iterable[str],
+    index: Optional[MaterialIndex] = None,
+    templates: Optional[Templates] = None,
+    draft_index: Optional[DraftIndex] = None,
+) -> List[Dict[str, Any]]:
+    """将图片作为 photo 类型素材导入到 materials.videos 中，返回与 image_files 一一对应的素材列表。
 
+    素材 id 由路径推导；同一路径（经 draft_index 按 id 查找）或内容相同（快速指纹与完整哈希均一致，见 MaterialIndex）
+    的图片直接复用草稿中已有的素材，不会重复导入。
+    宽高取自图片文件头（带缓存），无法识别时回退为预设分辨率。
+    image_files 可以是生成器（如 iter_images_in_folder）：边扫描边提交哈希任务。
+    """
+    with span("import_images") as sp:
+        ensure_materials(draft)
+        templates = templates or compile_templates()
+        with span("hash"):
+            if index is None:
+                index = MaterialIndex(draft)
+            files: List[str] = []
+            digests = index.hash_files(_collecting(image_files, files))
+        image_files = files
+        if draft_index is None:
+            draft_index = DraftIndex(draft)
+
+        # 只探测真正需要新建素材的文件
+        fresh: List[str] = []
+        seen = set()
+        for image_file in image_files:
+            digest = digests.get(image_file)
+            if draft_index.material(image_material_id(image_file), "videos") or index.find(image_file, digest):
+                continue
+            key = digests.get(image_file) or image_material_id(image_file)
+            if key not in seen:
+                seen.add(key)
+                fresh.append(image_file)
+        with span("probe") as probe_sp:
+            sizes = probe_images(fresh)
+            probe_sp.count("files", len(fresh))
+
+        image_materials: List[Dict[str, Any]] = []
+        for image_file in image_files:
+            image_id = image_material_id(image_file)
+            found = draft_index.material(image_id, "videos") or index.find(image_file, digests.get(image_file))
+            if found is not None:
+                image_materials.append(found)
+                continue
+            file_name = os.path.basename(image_file)
+            width, height = sizes.get(image_file) or (templates.width, templates.height)
+
+            image_material = Material(image_id, image_file, file_name, width, height).to_json(templates)
+            draft["materials"]["videos"].append(image_material)
+            index.add(digests.get(image_file), image_material)
+            image_materials.append(image_material)
+            sp.count("new_materials")
+
+        sp.count("images", len(image_files))
+    return image_materials
 
-def _kf(property_type: str, values_start: float, values_end: float, duration: int) -> Dict[str, Any]:
-    return {
-        "id": str(uuid.uuid4()),
-        "keyframe_list": [
-            {"time_offset": 0, "values": [values_start]},
-            {"time_offset": duration, "values": [values_end]},
-        ],
-        "property_type": property_type,
-    }
 
+def import_audios_to_draft(
+    draft: Dict[str, Any],
+    audio_files: List[str],
+    templates: Optional[Templates] = None,
+    draft_index: Optional[DraftIndex] = None,
+) -> List[Dict[str, Any]]:
+    """将音频导入 materials.audios，返回成功导入（可读出时长）的素材列表，顺序与 audio_files 一致。
 
-def create_common_keyframes(start_time: int, duration: int, movement_type: Optional[str] = None) -> List[Dict[str, Any]]:
-    """创建简单的平移关键帧（X/Y），用于营造缓慢移动效果。"""
+    时长只读取文件头/帧头获得（见 audioprobe），按 路径 + 大小 + mtime 缓存；
+    已导入的同一路径音频在时长未变时直接复用。读不出时长的文件被跳过，计入 import_audios 的 skipped。
+    """
+    with span("import_audios") as sp:
+        ensure_materials(draft)
+        templates = templates or compile_templates()
+        # 只在确实导入音频时创建 audios，避免无音频的草稿每次写回都多出一个空数组
+        audios = draft["materials"].setdefault("audios", [])
+        if draft_index is None:
+            draft_index = DraftIndex(draft)
+        with span("probe") as probe_sp:
+            durations = probe_audios(audio_files)
+            probe_sp.count("files", len(durations))
+
+        audio_materials: List[Dict[str, Any]] = []
+        for audio_file in audio_files:
+            duration = durations.get(audio_file)
+            if not duration:
+                sp.count("skipped")
+                continue
+            audio_id = audio_material_id(audio_file)
+            found = draft_index.material(audio_id, "audios")
+            if found is not None and found.get("duration") == duration:
+                audio_materials.append(found)
+                continue
+            material = AudioMaterial(audio_id, audio_file, os.path.basename(audio_file), duration).to_json(templates)
+            if found is not None:
+                # 文件被替换、时长变化：原地更新
+                found.clear()
+                found.update(material)
+                material = found
+            else:
+                audios.append(material)
+                sp.count("new_materials")
+            audio_materials.append(material)
+        sp.count("audios", len(audio_files))
+    return audio_materials
+
+
+# 随机入场动画：(名称, resource_id)
+ANIMATION_PRESETS = [
+    ("渐显", "fade"),
+    ("向右甩入", "scale_in_right"),
+    ("向左滑动", "slide_in_left"),
+    ("雨刷 II", "wiper"),
+    ("左右抖动", "shake"),
+]
+MOVEMENT_TYPES = ["left", "right", "up", "down"]
+KEN_BURNS_AMPLITUDE = DEFAULT_MOTION_AMPLITUDE
+
+
+def _kf(ids: IdAllocator, key: str, property_type: str, values_start: float, values_end: float, duration: int) -> Keyframe:
+    return Keyframe(ids.id(key, property_type), property_type, values_start, values_end, duration)
+
+
+def movement_keyframes(
+    duration: int,
+    movement_type: Optional[str] = None,
+    ids: Optional[IdAllocator] = None,
+    key: str = "",
+    amplitude: float = KEN_BURNS_AMPLITUDE,
+) -> List[Keyframe]:
+    """平移关键帧（X/Y）模型，用于营造缓慢移动效果；amplitude 为起止位置的偏移幅度（取自预设）。
+
+    id 与随机的移动方向都由 ids 按 key（通常为片段 id）派生。
+    """
+    ids = ids or IdAllocator()
     if movement_type is None:
-        movement_type = random.choice(["left", "right", "up", "down"])
+        movement_type = ids.choice(MOVEMENT_TYPES, key, "movement")
 
     if movement_type in ["left", "right"]:
-        x_start = -0.21 if movement_type == "left" else 0.21
+        x_start = -amplitude if movement_type == "left" else amplitude
         x_end = -x_start
         return [
-            _kf("KFTypePositionX", x_start, x_end, duration),
-            _kf("KFTypePositionY", 0, 0, duration),
+            _kf(ids, key, "KFTypePositionX", x_start, x_end, duration),
+            _kf(ids, key, "KFTypePositionY", 0, 0, duration),
         ]
     else:
-        y_start = -0.21 if movement_type == "up" else 0.21
+        y_start = -amplitude if movement_type == "up" else amplitude
         y_end = -y_start
         return [
-            _kf("KFTypePositionX", 0, 0, duration),
-            _kf("KFTypePositionY", y_start, y_end, duration),
+            _kf(ids, key, "KFTypePositionX", 0, 0, duration),
+            _kf(ids, key, "KFTypePositionY", y_start, y_end, duration),
         ]
 
 
+def create_common_keyframes(start_time: int, duration: int, movement_type: Optional[str] = None) -> List[Dict[str, Any]]:
+    """创建简单的平移关键帧（X/Y），用于营造缓慢移动效果。"""
+    return [kf.to_json() for kf in movement_keyframes(duration, movement_type, key=str(start_time))]
+
+
+def _animation(name: str, resource_id: str, ids: IdAllocator, key: str) -> Animation:
+    animation_id = ids.id(key, "animation")
+    request_id = ids.stamp + animation_id[:8].upper()
+    return Animation(animation_id, name, resource_id, request_id)
+
+
+def pick_animation(ids: Optional[IdAllocator] = None, key: str = "") -> Animation:
+    """随机挑选一种入场动画，只构建被选中的那一个。"""
+    ids = ids or IdAllocator()
+    name, resource_id = ids.choice(ANIMATION_PRESETS, key, "animation")
+    return _animation(name, resource_id, ids, key)
+
+
 def _anim(name: str, resource_id: str) -> Dict[str, Any]:
     """创建一个简化的动画描述对象。"""
-    animation_id = str(uuid.uuid4())
-    request_id = datetime.now().strftime("%Y%m%d%H%M%S") + str(uuid.uuid4())[:8].upper()
-    return {
-        "animations": [
-            {
-                "anim_adjust_params": None,
-                "category_id": "in",
-                "category_name": "入场",
-                "duration": 700_000,
-                "id": resource_id,
-                "material_type": "video",
-                "name": name,
-                "panel": "video",
-                "path": "",
-                "platform": "all",
-                "request_id": request_id,
-                "resource_id": resource_id,
-                "start": 0,
-                "type": "in",
-            }
-        ],
-        "id": animation_id,
-        "type": "sticker_animation",
-    }
+    return _animation(name, resource_id, IdAllocator(), resource_id).to_json(compile_templates())
 
 
 def create_fade_animation() -> Dict[str, Any]:
@@ -246,15 +351,7 @@ def create_shake_animation() -> Dict[str, Any]:
 
 
 def get_random_animation() -> Dict[str, Any]:
-    return random.choice(
-        [
-            create_fade_animation(),
-            create_scale_animation(),
-            create_bounce_animation(),
-            create_wiper_animation(),
-            create_shake_animation(),
-        ]
-    )
+    return pick_animation().to_json(compile_templates())
 
 
 def get_segment_start(seg: Dict[str, Any]) -> Optional[int]:
@@ -269,23 +366,47 @@ def get_segment_start(seg: Dict[str, Any]) -> Optional[int]:
     return None
 
 
-def get_subtitle_segments_from_draft(draft: Dict[str, Any]) -> List[Dict[str, Any]]:
-    """从草稿中提取字幕片段列表。不同版本结构可能不同，这里尽量兼容。"""
-    tracks = draft.get("tracks") or []
+def get_subtitle_segments_from_draft(
+    draft: Dict[str, Any], draft_index: Optional[DraftIndex] = None
+) -> List[Dict[str, Any]]:
+    """从草稿中提取字幕片段列表（按开始时间排序）。不同版本结构可能不同，这里尽量兼容。"""
+    if draft_index is None:
+        draft_index = DraftIndex(draft)
     subtitle_segments: List[Dict[str, Any]] = []
-    for track in tracks:
-        ttype = track.get("type") or track.get("track_type") or ""
-        if str(ttype).lower() in {"text", "subtitle", "sticker"}:  # 字幕/文本可能标记不同
-            for seg in track.get("segments") or []:
-                # 若包含文本/字幕属性，认为是字幕片段
-                attrs = seg.get("attrs") or {}
-                if any(k in seg for k in ("text", "subtitle")) or attrs.get("is_text"):
-                    subtitle_segments.append(seg)
-    # 按开始时间排序
-    subtitle_segments.sort(key=lambda s: get_segment_start(s) or 0)
+    # 字幕/文本可能标记不同；各轨道的区间索引已按开始时间排序，归并即可
+    tracks = draft_index.tracks_of_type("text", "subtitle", "sticker")
+    for seg in draft_index.segments_by_start(tracks):
+        # 若包含文本/字幕属性，认为是字幕片段
+        attrs = seg.get("attrs") or {}
+        if any(k in seg for k in ("text", "subtitle")) or attrs.get("is_text"):
+            subtitle_segments.append(seg)
     return subtitle_segments
 
 
+def load_subtitle_cues(path: str) -> List[Cue]:
+    """流式解析字幕文件（SRT / WebVTT / ASS），返回按开始时间排序的 (开始, 结束, 文本)。
+
+    SRT/VTT 通常已按时间排列，只在确实乱序时（多见于 ASS）才原地排序，不再复制整个列表。
+    """
+    with span("parse_subtitles") as sp:
+        cues = list(iter_cues(path))
+        if any(cues[i] < cues[i - 1] for i in range(1, len(cues))):
+            cues.sort()
+            sp.count("sorted")
+        sp.count("cues", len(cues))
+    return cues
+
+
+def get_subtitle_starts(subtitle_segments: Sequence[TimingItem]) -> List[int]:
+    """一次性提取字幕开始时间（跳过无法解析的片段）；也接受字幕文件条目。"""
+    starts: List[int] = []
+    for seg in subtitle_segments:
+        st = seg[0] if isinstance(seg, tuple) else get_segment_start(seg)
+        if st is not None:
+            starts.append(st)
+    return starts
+
+
 def find_next_subtitle_time(subtitle_segments: List[Dict[str, Any]], start_time: int) -> int:
     min_end = start_time + MIN_IMAGE_DURATION_SECONDS * MICROSECONDS
     candidates: List[int] = []
@@ -301,39 +422,17 @@ def find_next_subtitle_time(subtitle_segments: List[Dict[str, Any]], start_time:
     return min_end
 
 
-def build_image_segment(material_id: str, start_time: int, duration: int, render_index: int) -> Dict[str, Any]:
-    seg = {
-        "cartoon": False,
-        "clip": {
-            "alpha": 1.0,
-            "flip": {"horizontal": False, "vertical": False},
-            "rotation": 0.0,
-            "scale": {"x": 1.25, "y": 1.25},
-            "transform": {"x": 0.0, "y": 0.0},
-        },
-        "common_keyframes": [],
-        "enable_adjust": False,
-        "enable_color_curves": True,
-        "enable_color_wheels": True,
-        "extra_material_refs": [],
-        "group_id": "",
-        "id": str(uuid.uuid4()),
-        "intensifies_audio": False,
-        "is_placeholder": False,
-        "material_id": material_id,
-        "render_index": render_index,
-        "source_timerange": {"duration": duration, "start": 0},
-        "speed": 1.0,
-        "target_timerange": {"duration": duration, "start": start_time},
-        "template_id": "",
-        "template_scene": "default",
-        "track_attribute": 0,
-        "track_render_index": 0,
-        "uniform_scale": {"on": True, "value": 1.0},
-        "visible": True,
-        "volume": 1.0,
-    }
-    return seg
+def build_image_segment(
+    material_id: str,
+    start_time: int,
+    duration: int,
+    render_index: int,
+    templates: Optional[Templates] = None,
+    ids: Optional[IdAllocator] = None,
+) -> Dict[str, Any]:
+    seg_id = (ids or IdAllocator()).id("image_segment", render_index, material_id, start_time, duration)
+    seg = Segment(seg_id, material_id, start_time, duration, render_index)
+    return seg.to_json(templates or compile_templates())
 
 
 def add_effect_track(draft: Dict[str, Any], created_segments: List[Dict[str, Any]]) -> Dict[str, Any]:
@@ -341,7 +440,7 @@ def add_effect_track(draft: Dict[str, Any], created_segments: List[Dict[str, Any
     effect_track = {
         "attribute": 0,
         "flag": 0,
-        "id": str(uuid.uuid4()),
+        "id": EFFECT_TRACK_ID,
         "segments": [],
         "type": "effect",
     }
@@ -354,93 +453,481 @@ def ensure_tracks(draft: Dict[str, Any]) -> None:
         draft["tracks"] = []
 
 
-def sync_images_with_subtitles_in_draft(draft: Dict[str, Any], images_dir: Optional[str] = None) -> Dict[str, Any]:
-    """按照字幕时间创建图片片段，设置关键帧与随机动画，并生成特效轨道。"""
-    ensure_materials(draft)
-    ensure_tracks(draft)
+def apply_canvas_config(draft: Dict[str, Any], templates: Templates) -> bool:
+    """按预设设置画布尺寸与帧率，返回草稿是否因此发生变化。"""
+    canvas = dict(draft.get("canvas_config") or {})
+    canvas.update(templates.canvas_config())
+    fps = float(templates.fps)
+    if draft.get("canvas_config") == canvas and draft.get("fps") == fps:
+        return False
+    draft["canvas_config"] = canvas
+    draft["fps"] = fps
+    return True
+
+
+def find_track(
+    draft: Dict[str, Any], track_id: str, draft_index: Optional[DraftIndex] = None
+) -> Optional[Dict[str, Any]]:
+    if draft_index is not None:
+        return draft_index.track(track_id)
+    for track in draft.get("tracks") or []:
+        if track.get("id") == track_id:
+            return track
+    return None
 
-    subtitle_segments = get_subtitle_segments_from_draft(draft)
-    image_files = find_images_in_folder(images_dir)
 
-    image_materials = import_images_to_draft(draft, image_files)
+def has_owned_image_track(draft: Dict[str, Any]) -> bool:
+    """草稿中是否已有本工具生成的图片轨道（即本次为重复运行）。"""
+    return find_track(draft, IMAGE_TRACK_ID) is not None
 
-    # 若没有图片，创建一个默认占位素材
-    if not image_materials:
-        default_image = {
-            "id": str(uuid.uuid4()),
-            "type": "photo",
-            "path": "",
-            "material_name": "placeholder",
-            "width": 1920,
-            "height": 1080,
-        }
-        draft["materials"]["videos"].append(default_image)
-        image_materials = [default_image]
 
-    # 创建图片轨道
-    image_track = {
-        "attribute": 0,
-        "flag": 0,
-        "id": str(uuid.uuid4()),
-        "segments": [],
-        "type": "video",
-    }
+def has_owned_tracks(draft: Dict[str, Any]) -> bool:
+    """草稿中是否已有本工具生成的图片、旁白、BGM 或字幕轨道；重复运行会就地改写这些轨道。"""
+    return has_owned_image_track(draft) or any(
+        find_track(draft, track_id) is not None for track_id in (NARRATION_TRACK_ID, BGM_TRACK_ID, TEXT_TRACK_ID)
+    )
 
-    last_end_time = 0
-    created_segments: List[Dict[str, Any]] = []
 
-    if not subtitle_segments:
-        # 无字幕时，至少铺 1 段 5 秒
-        duration = MIN_IMAGE_DURATION_SECONDS * MICROSECONDS
-        mat = image_materials[0]
-        seg = build_image_segment(mat["id"], last_end_time, duration, 0)
-        seg["common_keyframes"] = create_common_keyframes(last_end_time, duration)
-        anim = get_random_animation()
-        draft["materials"]["material_animations"].append(anim)
-        seg["extra_material_refs"].append(anim["id"])
-        image_track["segments"].append(seg)
-        created_segments.append(seg)
+def ensure_effect_track(
+    draft: Dict[str, Any],
+    created_segments: Optional[List[Dict[str, Any]]] = None,
+    draft_index: Optional[DraftIndex] = None,
+) -> None:
+    ensure_tracks(draft)
+    # 避免重复添加，占位一次
+    if draft_index is not None:
+        present = bool(draft_index.tracks_of_type("effect"))
     else:
-        for i in range(len(subtitle_segments)):
-            start_time = last_end_time
-            end_time = find_next_subtitle_time(subtitle_segments, start_time)
-            duration = end_time - start_time
+        present = any(t.get("type") == "effect" for t in draft["tracks"])
+    if not present:
+        draft["tracks"].append(add_effect_track(draft, created_segments or []))
 
-            mat = image_materials[i % len(image_materials)]
-            seg = build_image_segment(mat["id"], start_time, duration, i)
 
-            # 关键帧与动画
-            seg["common_keyframes"] = create_common_keyframes(start_time, duration)
-            anim = get_random_animation()
-            draft["materials"]["material_animations"].append(anim)
-            seg["extra_material_refs"].append(anim["id"])
+def _segment_key(seg: Dict[str, Any]) -> Tuple[Any, int, int]:
+    tt = seg.get("target_timerange") or {}
+    return seg.get("material_id"), int(tt.get("start") or 0), int(tt.get("duration") or 0)
+
+
+def upsert_image_track(
+    draft: Dict[str, Any],
+    image_materials: List[Dict[str, Any]],
+    subtitle_segments: Sequence[TimingItem],
+    templates: Optional[Templates] = None,
+    end: Optional[int] = None,
+    ids: Optional[IdAllocator] = None,
+    draft_index: Optional[DraftIndex] = None,
+    beats: Optional[Sequence[int]] = None,
+    beat_tolerance: int = 0,
+) -> Tuple[Dict[str, Any], List[Dict[str, Any]]]:
+    """按字幕时间轴铺设图片片段（含关键帧与随机动画），返回 (图片轨道, 新建片段)。
+
+    subtitle_segments 只取各片段起点，也可传入旁白轨道的片段或字幕文件条目，使图片随之切换；
+    end 给出时最后一张图片延伸到该时间（如旁白总时长）。
+    beats（微秒，如 BGM 节拍）给出时，切换点吸附到 beat_tolerance 以内最近的节拍（见 TimelineBuilder）。
+    新片段的 id、关键帧与动画由 ids 按 (序号, 素材, 起点, 时长) 派生。
+    图片轨道以 IMAGE_TRACK_ID 标记。重复运行时与已有片段按 (素材, 起点, 时长) 比对：
+    未变化的片段连同关键帧、动画引用原样保留，只重建发生变化的片段；
+    不再需要的片段、其动画以及不再使用的本工具图片素材会被移除。
+    """
+    image_track = find_track(draft, IMAGE_TRACK_ID, draft_index)
+    resync = image_track is not None
+    if image_track is None:
+        image_track = {
+            "attribute": 0,
+            "flag": 0,
+            "id": IMAGE_TRACK_ID,
+            "segments": [],
+            "type": "video",
+        }
+        draft["tracks"].append(image_track)
+
+    existing: Dict[Tuple[Any, int, int], List[Dict[str, Any]]] = {}
+    for seg in image_track.get("segments") or []:
+        existing.setdefault(_segment_key(seg), []).append(seg)
+
+    templates = templates or compile_templates()
+    with span("timeline") as sp:
+        builder = TimelineBuilder(
+            get_subtitle_starts(subtitle_segments),
+            MIN_IMAGE_DURATION_SECONDS * MICROSECONDS,
+            end,
+            beats,
+            beat_tolerance,
+        )
+        spans = list(builder.spans())
+        sp.count("subtitles", len(subtitle_segments))
+        if beats:
+            sp.count("beats", len(beats))
+        sp.count("spans", len(spans))
+
+    animations = draft["materials"]["material_animations"]
+    ids = ids or IdAllocator()
+    segments: List[Dict[str, Any]] = []
+    created_segments: List[Dict[str, Any]] = []
+    with span("segments_animations") as sp:
+        for i, (start_time, end_time) in enumerate(spans):
+            duration = end_time - start_time
+            mat = image_materials[i % len(image_materials)]
 
-            image_track["segments"].append(seg)
-            created_segments.append(seg)
+            kept = existing.get((mat["id"], start_time, duration))
+            if kept:
+                seg = kept.pop()
+                seg["render_index"] = i
+                segments.append(seg)
+                continue
 
-            last_end_time = end_time
+            # 关键帧与动画
+            seg_id = ids.id("image_segment", i, mat["id"], start_time, duration)
+            anim = pick_animation(ids, seg_id)
+            animations.append(anim.to_json(templates))
+            keyframes = movement_keyframes(duration, ids=ids, key=seg_id, amplitude=templates.motion_amplitude)
+            seg = Segment(seg_id, mat["id"], start_time, duration, i, keyframes, [anim.id])
+            seg_json = seg.to_json(templates)
+
+            segments.append(seg_json)
+            created_segments.append(seg_json)
+        sp.count("kept", len(segments) - len(created_segments))
+        sp.count("created", len(created_segments))
+
+    image_track["segments"] = segments
+    if resync:
+        with span("prune"):
+            _prune_owned_materials(draft, existing, image_materials)
+
+    return image_track, created_segments
+
+
+def upsert_narration_track(
+    draft: Dict[str, Any],
+    audio_materials: List[Dict[str, Any]],
+    templates: Optional[Templates] = None,
+    ids: Optional[IdAllocator] = None,
+    draft_index: Optional[DraftIndex] = None,
+) -> Dict[str, Any]:
+    """把旁白音频按顺序首尾相接铺到旁白轨道（NARRATION_TRACK_ID），返回该轨道。
+
+    旁白是时间线的基准：每段的起点即上一段的终点。重复运行时未变化的片段保留原 id。
+    """
+    track = find_track(draft, NARRATION_TRACK_ID, draft_index)
+    if track is None:
+        track = {"attribute": 0, "flag": 0, "id": NARRATION_TRACK_ID, "segments": [], "type": "audio"}
+        draft["tracks"].append(track)
+
+    existing: Dict[Tuple[Any, int, int], List[Dict[str, Any]]] = {}
+    for seg in track.get("segments") or []:
+        existing.setdefault(_segment_key(seg), []).append(seg)
+
+    templates = templates or compile_templates()
+    ids = ids or IdAllocator()
+    segments: List[Dict[str, Any]] = []
+    start = 0
+    with span("narration") as sp:
+        for i, material in enumerate(audio_materials):
+            duration = int(material["duration"])
+            kept = existing.get((material["id"], start, duration))
+            if kept:
+                seg = kept.pop()
+                seg["render_index"] = i
+            else:
+                seg_id = ids.id("narration_segment", i, material["id"], start, duration)
+                seg = AudioSegment(seg_id, material["id"], start, duration, i).to_json(templates)
+                sp.count("created")
+            segments.append(seg)
+            start += duration
+        sp.count("clips", len(segments))
+    track["segments"] = segments
+    return track
+
+
+def upsert_text_track(
+    draft: Dict[str, Any],
+    cues: List[Cue],
+    templates: Optional[Templates] = None,
+    ids: Optional[IdAllocator] = None,
+    draft_index: Optional[DraftIndex] = None,
+) -> Dict[str, Any]:
+    """把字幕文件条目生成为字幕轨道（TEXT_TRACK_ID）及 materials.texts 中的文本素材，返回该轨道。
+
+    文本素材 id 由 (开始, 结束, 文本) 推导：重复运行时未变化的条目连同片段原样保留，
+    不再出现的条目及其素材被移除。其他来源的文本素材不受影响。
+    """
+    track = find_track(draft, TEXT_TRACK_ID, draft_index)
+    if track is None:
+        track = {"attribute": 0, "flag": 0, "id": TEXT_TRACK_ID, "segments": [], "type": "text"}
+        draft["tracks"].append(track)
+
+    texts = draft["materials"].setdefault("texts", [])
+    existing = {seg.get("material_id"): seg for seg in track.get("segments") or []}
+    owned = {m.get("id"): m for m in texts if m.get("id") in existing}
+
+    templates = templates or compile_templates()
+    ids = ids or IdAllocator()
+    segments: List[Dict[str, Any]] = []
+    materials: List[Dict[str, Any]] = []
+    seen: Dict[str, int] = {}
+    with span("text_track") as sp:
+        for i, (start, end, text) in enumerate(cues):
+            mat_id = text_material_id(start, end, text)
+            # 完全相同的重复条目各自保留一份
+            dup = seen.get(mat_id, 0)
+            seen[mat_id] = dup + 1
+            if dup:
+                mat_id = text_material_id(start, end, f"{text}#{dup}")
+            seg = existing.get(mat_id)
+            if seg is not None:
+                seg["render_index"] = i
+            else:
+                seg = TextSegment(ids.id("text_segment", mat_id), mat_id, start, end - start, i).to_json(templates)
+                sp.count("created")
+            segments.append(seg)
+            material = owned.get(mat_id)
+            materials.append(material if material is not None else TextMaterial(mat_id, text).to_json(templates))
+        sp.count("cues", len(segments))
+    track["segments"] = segments
+    # 本工具的素材作为一个整体留在原位置（首次运行时追加到末尾），其他文本素材不动，避免重复运行改变顺序
+    first = next((i for i, m in enumerate(texts) if m.get("id") in owned), len(texts))
+    others = [m for m in texts if m.get("id") not in owned]
+    texts[:] = others[:first] + materials + others[first:]
+    return track
+
+
+def upsert_bgm_track(
+    draft: Dict[str, Any],
+    bgm_material: Dict[str, Any],
+    total: int,
+    speech_segments: Sequence[TimingItem],
+    volume: float = 0.3,
+    ducking: Optional[Dict[str, Any]] = None,
+    templates: Optional[Templates] = None,
+    ids: Optional[IdAllocator] = None,
+    draft_index: Optional[DraftIndex] = None,
+) -> Dict[str, Any]:
+    """铺设背景音乐轨道（BGM_TRACK_ID）：循环拼接覆盖 [0, total]，并按解说片段生成 ducking 音量包络。
+
+    包络由 ducking.build_envelope 生成：相邻解说合并后每段只需 4 个关键帧，
+    增益变化小于 tolerance_db 的关键帧被省略。每次运行整体重建该轨道。
+    """
+    track = find_track(draft, BGM_TRACK_ID, draft_index)
+    if track is None:
+        track = {"attribute": 0, "flag": 0, "id": BGM_TRACK_ID, "segments": [], "type": "audio"}
+        draft["tracks"].append(track)
+
+    templates = templates or compile_templates()
+    ids = ids or IdAllocator()
+    settings = ducking_settings(ducking)
+    envelope: List[Tuple[int, float]] = []
+    with span("bgm") as sp:
+        if settings.get("enabled"):
+            intervals = []
+            for seg in speech_segments:
+                if isinstance(seg, tuple):
+                    intervals.append((seg[0], seg[1]))
+                    continue
+                tt = seg.get("target_timerange") or {}
+                start = int(tt.get("start") or 0)
+                intervals.append((start, start + int(tt.get("duration") or 0)))
+            envelope = build_envelope(
+                intervals,
+                total,
+                reduce_db=float(settings["reduce_db"]),
+                attack=int(settings["attack_ms"]) * 1000,
+                release=int(settings["release_ms"]) * 1000,
+                prepad=int(settings["prepad_ms"]) * 1000,
+                postpad=int(settings["postpad_ms"]) * 1000,
+                tolerance_db=float(settings["tolerance_db"]),
+            )
+
+        clip = int(bgm_material["duration"])
+        segments: List[Dict[str, Any]] = []
+        start = 0
+        while start < total and clip > 0:
+            duration = min(clip, total - start)
+            points = [(t, g * volume) for t, g in slice_envelope(envelope, start, start + duration)]
+            seg_id = ids.id("bgm_segment", len(segments), bgm_material["id"], start, duration)
+            keyframes = [Envelope(ids.id(seg_id, "KFTypeVolume"), "KFTypeVolume", points)] if points else []
+            seg = AudioSegment(seg_id, bgm_material["id"], start, duration, len(segments), keyframes)
+            seg_json = seg.to_json(templates)
+            seg_json["volume"] = volume
+            segments.append(seg_json)
+            start += duration
+        track["segments"] = segments
+        sp.count("segments", len(segments))
+        sp.count("keyframes", sum(len(k["keyframe_list"]) for seg in segments for k in seg["common_keyframes"]))
+    return track
+
+
+def _prune_owned_materials(
+    draft: Dict[str, Any],
+    stale: Dict[Tuple[Any, int, int], List[Dict[str, Any]]],
+    image_materials: List[Dict[str, Any]],
+) -> None:
+    materials = draft["materials"]
+    keep = {m["id"] for m in image_materials}
+    live_refs = set()
+    for track in draft["tracks"]:
+        for seg in track.get("segments") or []:
+            keep.add(seg.get("material_id"))
+            live_refs.update(seg.get("extra_material_refs") or [])
+
+    # 压缩输出中多个片段共享同一动画素材，仍被引用的不能删除
+    stale_refs = {ref for segs in stale.values() for seg in segs for ref in seg.get("extra_material_refs") or []}
+    stale_refs -= live_refs
+    if stale_refs:
+        materials["material_animations"] = [a for a in materials["material_animations"] if a.get("id") not in stale_refs]
+
+    materials["videos"] = [m for m in materials["videos"] if m.get("id") in keep or not is_owned_material(m)]
+
+
+def remove_owned_track(draft: Dict[str, Any], track_id: str) -> bool:
+    """移除本工具生成的某条轨道（manifest 中已去掉对应素材时）；返回是否有改动。"""
+    tracks = draft.get("tracks") or []
+    kept = [t for t in tracks if t.get("id") != track_id]
+    if len(kept) == len(tracks):
+        return False
+    tracks[:] = kept
+    return True
+
+
+def prune_owned_audios(draft: Dict[str, Any]) -> bool:
+    """删除本工具导入、但已不被任何片段引用的音频素材（旁白被替换或移除、BGM 更换后）；返回是否有改动。"""
+    audios = draft["materials"].get("audios")
+    if not audios:
+        return False
+    live = {seg.get("material_id") for track in draft["tracks"] for seg in track.get("segments") or []}
+    kept = [m for m in audios if m.get("id") in live or not is_owned_material(m)]
+    if len(kept) == len(audios):
+        return False
+    draft["materials"]["audios"] = kept
+    return True
+
+
+def import_images_or_placeholder(
+    draft: Dict[str, Any],
+    image_files: Iterable[str],
+    templates: Templates,
+    draft_index: Optional[DraftIndex] = None,
+) -> List[Dict[str, Any]]:
+    """导入图片素材；没有图片时改用（并导入）一个默认占位素材。"""
+    if draft_index is None:
+        draft_index = DraftIndex(draft)
+    image_materials = import_images_to_draft(draft, image_files, templates=templates, draft_index=draft_index)
+    if image_materials:
+        return image_materials
+    default_image = {
+        "id": PLACEHOLDER_MATERIAL_ID,
+        "type": "photo",
+        "path": "",
+        "material_name": "placeholder",
+        "width": templates.width,
+        "height": templates.height,
+    }
+    if draft_index.material(PLACEHOLDER_MATERIAL_ID, "videos") is None:
+        draft["materials"]["videos"].append(default_image)
+    return [default_image]
+
+
+def compact_generated(draft: Dict[str, Any]) -> Dict[str, int]:
+    """压缩本工具生成的轨道与素材：共享入场动画、删除无效关键帧、省略默认字段（见 compact.compact_draft）。"""
+    return compact_draft(draft, OWNED_TRACK_TEMPLATES, (IMAGE_TRACK_ID,))
+
+
+def sync_images_with_subtitles_in_draft(
+    draft: Dict[str, Any],
+    images_dir: Optional[str] = None,
+    templates: Optional[Templates] = None,
+    ids: Optional[IdAllocator] = None,
+    subtitle_file: Optional[str] = None,
+    text_track: bool = False,
+    compact: bool = False,
+    recursive: bool = False,
+    include: Optional[Sequence[str]] = None,
+    exclude: Optional[Sequence[str]] = None,
+) -> Dict[str, Any]:
+    """按照字幕时间创建图片片段，设置关键帧与随机动画，并生成特效轨道。
+
+    给出 subtitle_file（SRT / WebVTT / ASS）时以其为时间基准，不再依赖草稿中已导入的字幕；
+    text_track=True 时同时据此生成字幕轨道。compact=True 时压缩生成的内容（见 compact_generated）。
+    图片按自然顺序分配给片段；recursive / include / exclude 见 iter_images_in_folder。
+    """
+    ensure_materials(draft)
+    ensure_tracks(draft)
+    templates = templates or compile_templates()
+    # 一次遍历建立索引，之后的轨道/素材查找都经由它
+    draft_index = DraftIndex(draft)
+
+    if subtitle_file:
+        cues = load_subtitle_cues(subtitle_file)
+        if text_track:
+            upsert_text_track(draft, cues, templates, ids, draft_index)
+        subtitle_segments: Sequence[TimingItem] = cues
+    else:
+        subtitle_segments = get_subtitle_segments_from_draft(draft, draft_index)
+    # 扫描与导入流水线进行：图片一被发现就开始计算内容哈希
+    image_files = iter_images_in_folder(images_dir, recursive, include, exclude)
+    image_materials = import_images_or_placeholder(draft, image_files, templates, draft_index)
+    _, created_segments = upsert_image_track(
+        draft, image_materials, subtitle_segments, templates, ids=ids, draft_index=draft_index
+    )
 
     # 追加特效轨道
-    effect_track = add_effect_track(draft, created_segments)
-    draft["tracks"].append(image_track)
-    draft["tracks"].append(effect_track)
+    ensure_effect_track(draft, created_segments, draft_index)
+    if compact:
+        compact_generated(draft)
     return draft
 
 
-def process_draft_automatically(images_dir: Optional[str] = None) -> None:
-    """自动处理最新的剪映草稿：导入图片，按字幕切片，添加关键帧与动画。"""
-    latest_draft_folder = get_latest_draft_folder()
-    draft_content_path = os.path.join(latest_draft_folder, "draft_content.json")
-
-    # 读取草稿
-    with open(draft_content_path, "r", encoding="utf-8") as f:
-        draft = json.load(f)
-
-    # 同步
-    draft = sync_images_with_subtitles_in_draft(draft, images_dir)
-
-    # 写回（建议实际环境中先做备份）
-    with open(draft_content_path, "w", encoding="utf-8") as f:
-        json.dump(draft, f, ensure_ascii=False)
+def process_draft_automatically(
+    images_dir: Optional[str] = None,
+    reindex: bool = False,
+    seed: Optional[int] = None,
+    subtitle_file: Optional[str] = None,
+    text_track: bool = False,
+    compact: bool = False,
+    recursive: bool = False,
+    include: Optional[Sequence[str]] = None,
+    exclude: Optional[Sequence[str]] = None,
+) -> Dict[str, Any]:
+    """自动处理最新的剪映草稿：导入图片，按字幕切片，添加关键帧与动画。
+
+    给定 seed 时 id 与随机选择可复现，输入不变的重复运行不会改写草稿文件。
+    其余参数见 sync_images_with_subtitles_in_draft。返回 draft_folder、bytes_written（写入字节数，
+    内容未变化时为 0）、draft_bytes（写回后草稿文件的大小），压缩时另含 compact（见 compact.compact_draft）。
+    """
+    with span("process_draft"):
+        with span("find_draft"):
+            latest_draft_folder = get_latest_draft_folder(reindex=reindex)
+        draft_content_path = os.path.join(latest_draft_folder, "draft_content.json")
+
+        # 读取草稿
+        with span("load_draft") as sp:
+            draft = draftcache.load_draft(draft_content_path)
+            sp.count("bytes", os.path.getsize(draft_content_path))
+            # 重复运行会就地改写已有轨道，只有首次运行可以走增量拼接
+            # 压缩会改动已有对象，同样需要整体写回
+            mark = None if compact or has_owned_tracks(draft) else AppendMark(draft_content_path, draft)
+
+        # 同步
+        ids = IdAllocator(seed, scope=os.path.abspath(draft_content_path))
+        draft = sync_images_with_subtitles_in_draft(
+            draft,
+            images_dir,
+            ids=ids,
+            subtitle_file=subtitle_file,
+            text_track=text_track,
+            recursive=recursive,
+            include=include,
+            exclude=exclude,
+        )
+        result: Dict[str, Any] = {"draft_folder": latest_draft_folder}
+        if compact:
+            result["compact"] = compact_generated(draft)
+
+        # 写回（原子替换；建议实际环境中先做备份）
+        with span("write_draft") as sp:
+            result["bytes_written"] = write_draft(draft_content_path, draft, mark)
+            result["draft_bytes"] = os.path.getsize(draft_content_path)
+            sp.count("bytes", result["draft_bytes"])
+        draftcache.remember(draft_content_path, draft)
 
     print(f"成功将图片与字幕同步到草稿: {latest_draft_folder}")
+    return result
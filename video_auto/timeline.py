@@ -0,0 +1,79 @@
+from bisect import bisect_left
+from typing import Iterable, Iterator, List, Optional, Tuple
+
+
+class TimelineBuilder:
+    """按字幕开始时间切分图片片段。
+
+    开始时间只排序一次，之后用游标 + bisect 单调前进，整体 O(n log n)；
+    每个片段至少持续 min_duration，终点取第一个不早于该时长的字幕开始时间。
+    片段数不再固定为字幕条数：旧循环恰好产出 n 段，字幕较密时末尾多出若干 5 秒补位片段，
+    首条字幕晚于 min_duration 开始时则少一段、最后一条字幕没有图片；这里一直切分到
+    某段覆盖了最后一条字幕的开始时间为止。sync、api 与分片都经由本类切分。
+    给出 end（如旁白总时长）时，最后一段延伸到 end。
+
+    给出 beats（如 BGM 的节拍时刻）时，每个切换点吸附到 tolerance 以内最近的节拍，
+    吸附后片段仍不短于 min_duration；最后一段的终点 end 不吸附。没有字幕但有 end 时，
+    改为按节拍切分：每段在不早于 min_duration 的第一个节拍处切换，直到 end。
+    """
+
+    def __init__(
+        self,
+        starts: Iterable[int],
+        min_duration: int,
+        end: Optional[int] = None,
+        beats: Optional[Iterable[int]] = None,
+        tolerance: int = 0,
+    ) -> None:
+        self.starts: List[int] = sorted(starts)
+        self.min_duration = min_duration
+        self.end = end
+        self.beats: List[int] = sorted(beats) if beats else []
+        self.tolerance = tolerance
+
+    def snap(self, start: int, point: int) -> int:
+        """point 两侧最近的节拍中，距离不超过 tolerance 且与 start 相隔至少 min_duration 的那个；没有则原样返回。"""
+        beats = self.beats
+        i = bisect_left(beats, point)
+        best, best_distance = point, self.tolerance + 1
+        for beat in beats[max(i - 1, 0) : i + 1]:
+            distance = abs(beat - point)
+            if distance < best_distance and beat - start >= self.min_duration:
+                best, best_distance = beat, distance
+        return best
+
+    def spans(self) -> Iterator[Tuple[int, int]]:
+        """依次产出 (start, end)，单位微秒。无字幕时产出一段最短时长（有节拍与 end 时按节拍切分）。"""
+        starts = self.starts
+        if not starts:
+            if self.beats and self.end:
+                yield from self._beat_spans(self.end)
+                return
+            yield 0, self.min_duration
+            return
+
+        cursor = 0
+        start = 0
+        while True:
+            min_end = start + self.min_duration
+            cursor = bisect_left(starts, min_end, cursor)
+            if cursor == len(starts):
+                # 剩余字幕都落在本段内：最后一段，延伸到 end
+                yield start, max(min_end, self.end or 0)
+                return
+            end = self.snap(start, starts[cursor]) if self.beats else starts[cursor]
+            yield start, end
+            start = end
+
+    def _beat_spans(self, total: int) -> Iterator[Tuple[int, int]]:
+        beats = self.beats
+        cursor = 0
+        start = 0
+        while start < total:
+            cursor = bisect_left(beats, start + self.min_duration, cursor)
+            end = beats[cursor] if cursor < len(beats) else total
+            # 剩余部分不足一段最短时长时并入当前段
+            if total - end < self.min_duration:
+                end = total
+            yield start, end
+            start = end
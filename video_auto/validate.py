@@ -0,0 +1,165 @@
+import csv
+import json
+import os
+from concurrent.futures import ProcessPoolExecutor
+from typing import Any, Dict, Iterable, List, Optional, Set
+
+from .draftcache import load_draft
+from .draftindex import DraftIndex, TrackIndex
+from .locator import DRAFT_FILE, DraftLocator
+
+MICROSECONDS = 1_000_000
+# 同类问题在报告中最多列出的示例数
+MAX_EXAMPLES = 5
+CSV_FIELDS = ["path", "ok", "tracks", "segments", "duration_s", "missing_refs", "overlaps", "errors"]
+
+
+def _duration_seconds(us: int) -> float:
+    return us / MICROSECONDS
+
+
+def track_stats(track: Dict[str, Any], material_ids: Set[str], timeline: Optional[TrackIndex] = None) -> Dict[str, Any]:
+    """单个轨道的统计：沿区间索引（片段已按起点排序）一次扫描，同时得出总时长、引用缺失与重叠。"""
+    timeline = timeline or TrackIndex(track)
+    missing: List[str] = []
+    end = 0
+    covered = 0
+    overlaps: List[List[Any]] = []
+    prev_id = None
+    spans = timeline.spans()
+    for start, stop, seg in spans:
+        mid = seg.get("material_id")
+        if mid and mid not in material_ids:
+            missing.append(mid)
+        for ref in seg.get("extra_material_refs") or []:
+            if ref not in material_ids:
+                missing.append(ref)
+        if start < end:
+            overlaps.append([prev_id, seg.get("id"), _duration_seconds(end - start)])
+        covered += max(0, stop - max(start, end))
+        if stop > end:
+            end, prev_id = stop, seg.get("id")
+    return {
+        "id": track.get("id"),
+        "type": track.get("type"),
+        "segments": len(spans),
+        "end": timeline.end(),
+        "covered": covered,
+        "missing_refs": missing,
+        "overlaps": overlaps,
+    }
+
+
+def inspect_draft(draft_path: str) -> Dict[str, Any]:
+    """校验单个草稿（目录或 draft_content.json 路径），返回机器可读的结果。"""
+    draft_content = draft_path if draft_path.endswith(DRAFT_FILE) else os.path.join(draft_path, DRAFT_FILE)
+    report: Dict[str, Any] = {"path": os.path.dirname(os.path.abspath(draft_content)), "errors": []}
+    errors: List[str] = report["errors"]
+    if not os.path.exists(draft_content):
+        errors.append("缺少 draft_content.json")
+        report["ok"] = False
+        return report
+
+    try:
+        # 经由解析缓存读取：渲染后紧接着校验时直接命中；校验本身不写入缓存，避免整库校验挤占缓存
+        draft = load_draft(draft_content, populate=False)
+    except (OSError, ValueError) as e:
+        errors.append(f"无法解析 draft_content.json: {e}")
+        report["ok"] = False
+        return report
+    return inspect_loaded(draft, report)
+
+
+def inspect_loaded(draft: Dict[str, Any], report: Dict[str, Any]) -> Dict[str, Any]:
+    """校验已解析的草稿（如常驻服务缓存中的），把结果补充进 report（需含 path 与 errors）。"""
+    errors: List[str] = report["errors"]
+    tracks = [t for t in draft.get("tracks") or [] if isinstance(t, dict)]
+    if len(tracks) < 2:
+        errors.append("轨道数量过少，期望至少包含视频与音频/文本")
+
+    index = DraftIndex(draft)
+    material_ids = index.material_ids()
+    stats = [track_stats(t, material_ids, index.timeline(t)) for t in tracks]
+
+    # 估算视频轨与音频/文本轨的时长一致性
+    video_end = max((s["end"] for s in stats if str(s["type"]).lower() in {"video", "sticker"}), default=0)
+    audio_end = max((s["end"] for s in stats if str(s["type"]).lower() in {"audio", "text", "subtitle"}), default=0)
+    if video_end and audio_end:
+        if abs(_duration_seconds(video_end - audio_end)) > 0.5:
+            errors.append("音画时长差异超过 0.5 秒，请检查时间线对齐")
+
+    missing = [ref for s in stats for ref in s["missing_refs"]]
+    if missing:
+        errors.append(f"{len(missing)} 处素材引用无法解析，例如: {', '.join(missing[:MAX_EXAMPLES])}")
+    overlaps = [(s["id"], o) for s in stats for o in s["overlaps"]]
+    if overlaps:
+        examples = "; ".join(f"轨道 {tid}: {a} 与 {b} 重叠 {sec:.3f}s" for tid, (a, b, sec) in overlaps[:MAX_EXAMPLES])
+        errors.append(f"{len(overlaps)} 处同轨片段重叠，例如: {examples}")
+
+    report.update(
+        {
+            "ok": not errors,
+            "tracks": len(tracks),
+            "segments": sum(s["segments"] for s in stats),
+            "duration_s": _duration_seconds(max((s["end"] for s in stats), default=0)),
+            "missing_refs": len(missing),
+            "overlaps": len(overlaps),
+            "track_stats": [
+                {
+                    "id": s["id"],
+                    "type": s["type"],
+                    "segments": s["segments"],
+                    "end_s": _duration_seconds(s["end"]),
+                    "covered_s": _duration_seconds(s["covered"]),
+                    "missing_refs": len(s["missing_refs"]),
+                    "overlaps": len(s["overlaps"]),
+                }
+                for s in stats
+            ],
+        }
+    )
+    return report
+
+
+def validate_draft(draft_path: str) -> List[str]:
+    return inspect_draft(draft_path)["errors"]
+
+
+def collect_drafts(path: str, reindex: bool = False) -> List[str]:
+    """path 本身是草稿（目录含 draft_content.json 或即该文件）时只返回它，否则视为草稿根目录。"""
+    path = os.path.abspath(path)
+    if path.endswith(DRAFT_FILE) or os.path.isfile(os.path.join(path, DRAFT_FILE)):
+        return [path]
+    locator = DraftLocator(path)
+    locator.refresh(reindex=reindex)
+    return [os.path.dirname(p) for p in locator.drafts()]
+
+
+def validate_many(paths: Iterable[str], workers: Optional[int] = None) -> List[Dict[str, Any]]:
+    """用进程池并行校验多个草稿，结果顺序与输入一致。"""
+    paths = list(paths)
+    if len(paths) <= 1 or workers == 1:
+        return [inspect_draft(p) for p in paths]
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        # 草稿多为中小文件，分批派发以降低进程间通信开销
+        chunksize = max(1, len(paths) // ((workers or os.cpu_count() or 1) * 8))
+        return list(pool.map(inspect_draft, paths, chunksize=chunksize))
+
+
+def write_report(reports: List[Dict[str, Any]], path: str) -> None:
+    """按扩展名输出 JSON（含逐轨统计）或 CSV（每个草稿一行）。"""
+    if path.lower().endswith(".csv"):
+        with open(path, "w", encoding="utf-8-sig", newline="") as f:
+            writer = csv.DictWriter(f, fieldnames=CSV_FIELDS, extrasaction="ignore")
+            writer.writeheader()
+            for r in reports:
+                writer.writerow(dict(r, errors=" | ".join(r["errors"])))
+        return
+    summary = {
+        "total": len(reports),
+        "passed": sum(1 for r in reports if r["ok"]),
+        "failed": sum(1 for r in reports if not r["ok"]),
+        "drafts": reports,
+    }
+    with open(path, "w", encoding="utf-8") as f:
+        json.dump(summary, f, ensure_ascii=False, indent=2)
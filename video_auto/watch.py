@@ -0,0 +1,309 @@
+import os
+import time
+from typing import Any, Callable, Dict, Iterable, Iterator, List, Optional, Sequence, Set, Tuple
+
+from . import draftcache, draftio, sync
+from .api import apply_manifest, derive_draft, render_target, write_rendered_draft
+from .backup import run_backup
+from .compact import format_summary
+from .config import Manifest, load_manifest
+from .ids import IdAllocator
+from .locator import DRAFT_FILE
+from .lock import draft_lock
+from .model import compile_templates
+from .profiling import span
+from .statcache import file_identity
+
+DEFAULT_INTERVAL = 1.0
+DEFAULT_DEBOUNCE = 0.5
+
+# 路径 -> (大小, 修改时间 ns)；文件不存在时为 None
+Signature = Dict[str, Optional[Tuple[int, int]]]
+
+
+def stat_signature(paths: Iterable[str]) -> Signature:
+    return {p: file_identity(p) for p in paths}
+
+
+def dir_signature(folder: str) -> Signature:
+    """目录本身与其中各文件的 stat 签名（一次 scandir，不递归）。"""
+    sig: Signature = {folder: file_identity(folder)}
+    try:
+        with os.scandir(folder) as it:
+            for entry in it:
+                try:
+                    if entry.is_file():
+                        st = entry.stat()
+                        sig[entry.path] = (st.st_size, st.st_mtime_ns)
+                except OSError:
+                    continue
+    except OSError:
+        pass
+    return sig
+
+
+def tree_signature(folder: str, recursive: bool = False) -> Signature:
+    """dir_signature；recursive=True 时合并所有子目录（不跟随目录符号链接）。"""
+    sig = dir_signature(folder)
+    if recursive:
+        for root, dirs, _ in os.walk(folder):
+            dirs[:] = [d for d in dirs if not d.startswith(".")]
+            for d in dirs:
+                sig.update(dir_signature(os.path.join(root, d)))
+    return sig
+
+
+def changed_paths(old: Signature, new: Signature) -> Set[str]:
+    return {p for p in old.keys() | new.keys() if old.get(p) != new.get(p)}
+
+
+class Watcher:
+    """按 stat 轮询一组路径，合并短时间内的连续变化（debounce）后再报告。
+
+    probe 返回当前签名（可随 manifest 变化而改变要监听的路径集合）。
+    """
+
+    def __init__(
+        self,
+        probe: Callable[[], Signature],
+        interval: float = DEFAULT_INTERVAL,
+        debounce: float = DEFAULT_DEBOUNCE,
+        sleep: Callable[[float], None] = time.sleep,
+    ) -> None:
+        self.probe = probe
+        self.interval = interval
+        self.debounce = debounce
+        self.sleep = sleep
+        self.baseline: Signature = probe()
+
+    def accept(self, path: str, identity: Optional[Tuple[int, int]]) -> None:
+        """登记本工具自己造成的变化（如写回草稿），避免被当作外部修改再次触发。"""
+        self.baseline[path] = identity
+
+    def wait(self) -> Set[str]:
+        """阻塞直到出现变化且安静 debounce 秒，返回相对上次基线发生变化的路径。"""
+        while True:
+            self.sleep(self.interval)
+            current = self.probe()
+            if not changed_paths(self.baseline, current):
+                continue
+            # 变化仍在持续（如正在拷贝一批图片）时继续等待
+            step = min(self.interval, self.debounce) if self.debounce > 0 else 0
+            while self.debounce > 0:
+                self.sleep(step)
+                latest = self.probe()
+                if latest == current:
+                    break
+                current = latest
+            changed = changed_paths(self.baseline, current)
+            self.baseline = current
+            if changed:
+                return changed
+
+    def changes(self) -> Iterator[Set[str]]:
+        while True:
+            yield self.wait()
+
+
+class DraftSession:
+    """常驻内存的草稿：记录读入时的文件状态，写回前据此发现外部（剪映）修改。"""
+
+    def __init__(self, draft_content: str) -> None:
+        self.path = draft_content
+        self.folder = os.path.dirname(draft_content)
+        self.draft: Dict[str, Any] = {}
+        self.identity: Optional[Tuple[int, int]] = None
+        self.reload()
+
+    def reload(self) -> None:
+        with span("load_draft") as sp:
+            self.identity = file_identity(self.path)
+            self.draft = draftcache.load_draft(self.path)
+            sp.count("bytes", os.path.getsize(self.path))
+
+    def changed_externally(self) -> bool:
+        return file_identity(self.path) != self.identity
+
+    def sync(self, apply: Callable[[Dict[str, Any]], bool], max_attempts: int = 3) -> int:
+        """在草稿锁内应用变更并写回，返回写入字节数（内容未变化时为 0）。
+
+        应用前后都检查文件是否被外部修改：是则重新读取并重做，不覆盖外部修改。
+        """
+        with draft_lock(self.folder):
+            for _ in range(max_attempts):
+                if self.changed_externally():
+                    print(f"检测到草稿被外部修改，重新读取: {self.path}")
+                    self.reload()
+                mark = None if sync.has_owned_tracks(self.draft) else draftio.AppendMark(self.path, self.draft)
+                if apply(self.draft):
+                    mark = None
+                if self.changed_externally():
+                    continue
+                written = write_rendered_draft(self.path, self.draft, mark)
+                self.identity = file_identity(self.path)
+                return written
+        raise RuntimeError(f"草稿在同步期间被反复修改，已放弃写回: {self.path}")
+
+
+def _draft_saved_externally(changed: Set[str], session: DraftSession, watcher: Watcher) -> bool:
+    """只有草稿文件本身变化（通常是剪映保存）时重新读入并更新基线，返回 True。
+
+    此时不重新渲染、不写回：素材与 manifest 都没变，写回只会覆盖用户刚在剪映里的编辑；
+    下次素材变化时在新读入的草稿上增量同步。
+    """
+    if changed != {session.path}:
+        return False
+    session.reload()
+    watcher.accept(session.path, session.identity)
+    print(f"[{time.strftime('%H:%M:%S')}] 草稿已在外部保存，重新读取（未写回）: {session.folder}")
+    return True
+
+
+def _report(changed: Set[str], written: int, folder: str, compacted: Optional[Dict[str, int]] = None) -> None:
+    names = ", ".join(sorted(os.path.basename(p) or p for p in changed)[:5])
+    more = f" 等 {len(changed)} 项" if len(changed) > 5 else ""
+    cause = f"{names}{more} 变化" if changed else "初始同步"
+    state = f"写入 {written} 字节" if written else "内容未变化，未写回"
+    print(f"[{time.strftime('%H:%M:%S')}] {cause} -> {state}: {folder}")
+    if written and compacted:
+        print(f"  {format_summary(compacted, written)}")
+
+
+def watch_manifest(
+    manifest_path: str,
+    preset_name: Optional[str] = None,
+    reindex: bool = False,
+    seed: Optional[int] = None,
+    interval: float = DEFAULT_INTERVAL,
+    debounce: float = DEFAULT_DEBOUNCE,
+    compact: Optional[bool] = None,
+    output_dir: Optional[str] = None,
+) -> None:
+    """监听 manifest、其引用的素材文件及目标草稿，变化后把增量同步进常驻内存的草稿。
+
+    草稿只查找、解析一次；manifest 的 draft_path 改变时切换到新草稿。目标草稿与 render_video 相同
+    （见 api.render_target）：给出 output_dir 时同步进 <output_dir>/<源草稿名>，源草稿不被修改。按 Ctrl+C 退出。
+    """
+    manifest_path = os.path.abspath(manifest_path)
+    compile_templates(preset_name)
+    # 整个监听期间使用同一个分配器：重建的片段 id 保持稳定
+    ids = IdAllocator(seed, scope=manifest_path)
+    state: Dict[str, Any] = {}
+
+    def open_manifest() -> Manifest:
+        mf = load_manifest(manifest_path)
+        source_folder, folder = render_target(mf.get_draft_settings(), reindex, output_dir)
+        draft_content = os.path.join(folder, DRAFT_FILE)
+        if folder != source_folder and not os.path.isfile(draft_content):
+            # 派生草稿尚不存在：先从源草稿复制，随后的同步在其基础上增量进行
+            with draft_lock(folder):
+                write_rendered_draft(draft_content, derive_draft(source_folder, folder, preset_name), None)
+        if state.get("session") is None or state["session"].path != draft_content:
+            state["session"] = DraftSession(draft_content)
+        state["mf"] = mf
+        return mf
+
+    def watched_paths() -> List[str]:
+        paths = [manifest_path, state["session"].path]
+        mf: Manifest = state["mf"]
+        assets = mf.get_assets()
+        for key in ("images", "audio", "bgm"):
+            paths.extend(assets.get(key, []))
+        bgm = mf.get_bgm()
+        if bgm:
+            paths.append(bgm["path"])
+        subtitles = mf.get_subtitles()
+        if subtitles:
+            paths.append(subtitles["path"])
+        return paths
+
+    def render() -> int:
+        mf: Manifest = state["mf"]
+        session: DraftSession = state["session"]
+        backup = mf.get_draft_settings().get("backup", {})
+        # 每次真正的同步只备份一次：放在 sync 的重试循环之外
+        if backup.get("enable") and backup.get("location"):
+            run_backup(session.folder, backup)
+
+        def apply(draft: Dict[str, Any]) -> bool:
+            applied = apply_manifest(mf, draft, preset_name, ids, compact)
+            state["compact"] = applied["compact"]
+            return applied["rewritten"]
+
+        return session.sync(apply)
+
+    open_manifest()
+    _report(set(), render(), state["session"].folder, state["compact"])
+    watcher = Watcher(lambda: stat_signature(watched_paths()), interval, debounce)
+    print(f"正在监听 {manifest_path}（Ctrl+C 退出）")
+    try:
+        for changed in watcher.changes():
+            try:
+                if _draft_saved_externally(changed, state["session"], watcher):
+                    continue
+                if manifest_path in changed:
+                    open_manifest()
+                written = render()
+            except Exception as e:
+                # manifest 编辑到一半等情况：提示后继续监听
+                print(f"同步失败: {e}")
+                continue
+            session: DraftSession = state["session"]
+            watcher.accept(session.path, session.identity)
+            _report(changed, written, session.folder, state["compact"])
+    except KeyboardInterrupt:
+        print("已停止监听")
+
+
+def watch_images(
+    images_dir: Optional[str] = None,
+    reindex: bool = False,
+    seed: Optional[int] = None,
+    interval: float = DEFAULT_INTERVAL,
+    debounce: float = DEFAULT_DEBOUNCE,
+    subtitle_file: Optional[str] = None,
+    text_track: bool = False,
+    compact: bool = False,
+    recursive: bool = False,
+    include: Optional[Sequence[str]] = None,
+    exclude: Optional[Sequence[str]] = None,
+) -> None:
+    """python -m video_auto --watch：监听图片目录、字幕文件与最新草稿，变化后增量同步。按 Ctrl+C 退出。"""
+    images_dir = images_dir or sync.DEFAULT_IMAGES_DIR
+    session = DraftSession(os.path.join(sync.get_latest_draft_folder(reindex=reindex), "draft_content.json"))
+    ids = IdAllocator(seed, scope=os.path.abspath(session.path))
+    compacted: Dict[str, Any] = {}
+
+    def apply(draft: Dict[str, Any]) -> bool:
+        sync.sync_images_with_subtitles_in_draft(
+            draft,
+            images_dir,
+            ids=ids,
+            subtitle_file=subtitle_file,
+            text_track=text_track,
+            recursive=recursive,
+            include=include,
+            exclude=exclude,
+        )
+        # 压缩放在这里而不是交给 sync_images_with_subtitles_in_draft，以便取得统计用于输出
+        if compact:
+            compacted["stats"] = sync.compact_generated(draft)
+        return compact
+
+    _report(set(), session.sync(apply), session.folder, compacted.get("stats"))
+    files = [session.path] + ([subtitle_file] if subtitle_file else [])
+    watcher = Watcher(lambda: dict(tree_signature(images_dir, recursive), **stat_signature(files)), interval, debounce)
+    print(f"正在监听 {images_dir}（Ctrl+C 退出）")
+    try:
+        for changed in watcher.changes():
+            try:
+                if _draft_saved_externally(changed, session, watcher):
+                    continue
+                written = session.sync(apply)
+            except Exception as e:
+                print(f"同步失败: {e}")
+                continue
+            watcher.accept(session.path, session.identity)
+            _report(changed, written, session.folder, compacted.get("stats"))
+    except KeyboardInterrupt:
+        print("已停止监听")